@@ -0,0 +1,115 @@
+"""Bounded run queue that limits how many full pipelines execute at once"""
+import math
+import threading
+import time
+from collections import deque
+
+import metrics
+
+pipelines_running = metrics.gauge("pipelines_running", "Full pipeline runs currently executing")
+pipelines_queued = metrics.gauge("pipelines_queued", "Full pipeline runs waiting for a slot")
+pipelines_shed_total = metrics.counter("pipelines_shed_total", "Pipeline runs rejected because the queue was full")
+
+
+class Ticket:
+    """A place in the run queue; admitted once it reaches the head and a slot is free"""
+
+    def __init__(self, queue):
+        self._queue = queue
+        self.admitted = False
+        self.admitted_at = None
+        self.released = False
+
+    def position(self):
+        """0 once running, otherwise 1-based position among waiting runs"""
+        return self._queue._position(self)
+
+    def wait(self, timeout=None):
+        """Block until admitted or `timeout` elapses; returns whether we are admitted"""
+        return self._queue._wait(self, timeout)
+
+    def release(self):
+        self._queue._release(self)
+
+
+class RunQueue:
+    def __init__(self, max_concurrent=2, max_queued=10):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self._cond = threading.Condition()
+        self._waiting = deque()
+        self._running = 0
+        self._avg_duration = 60.0  # seconds, EWMA of completed runs
+
+    def is_full(self):
+        with self._cond:
+            return self._running >= self.max_concurrent and len(self._waiting) >= self.max_queued
+
+    def enqueue(self):
+        """Join the queue, or return None (load shed) if it is full"""
+        with self._cond:
+            if self._running >= self.max_concurrent and len(self._waiting) >= self.max_queued:
+                pipelines_shed_total.inc()
+                return None
+            ticket = Ticket(self)
+            self._waiting.append(ticket)
+            self._admit()
+            return ticket
+
+    def retry_after(self):
+        """Rough seconds until a slot frees up, for Retry-After headers"""
+        with self._cond:
+            backlog = len(self._waiting) + 1
+            return max(5, math.ceil(self._avg_duration * backlog / self.max_concurrent))
+
+    def stats(self):
+        with self._cond:
+            return {
+                "running": self._running,
+                "queued": len(self._waiting),
+                "max_concurrent": self.max_concurrent,
+                "max_queued": self.max_queued
+            }
+
+    def _admit(self):
+        # Caller holds self._cond
+        while self._waiting and self._running < self.max_concurrent:
+            ticket = self._waiting.popleft()
+            ticket.admitted = True
+            ticket.admitted_at = time.monotonic()
+            self._running += 1
+        pipelines_running.set(self._running)
+        pipelines_queued.set(len(self._waiting))
+        self._cond.notify_all()
+
+    def _position(self, ticket):
+        with self._cond:
+            if ticket.admitted:
+                return 0
+            try:
+                return self._waiting.index(ticket) + 1
+            except ValueError:
+                return 0
+
+    def _wait(self, ticket, timeout):
+        with self._cond:
+            if not ticket.admitted:
+                self._cond.wait(timeout)
+            return ticket.admitted
+
+    def _release(self, ticket):
+        with self._cond:
+            if ticket.released:
+                return
+            ticket.released = True
+            if ticket.admitted:
+                self._running -= 1
+                duration = time.monotonic() - ticket.admitted_at
+                self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+            else:
+                # Client went away while still queued
+                try:
+                    self._waiting.remove(ticket)
+                except ValueError:
+                    pass
+            self._admit()
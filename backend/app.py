@@ -2,35 +2,58 @@
 import os
 import sys
 import json
+import contextlib
+import hashlib
+import hmac
 import tempfile
 import logging
+import time
 import traceback
 from io import StringIO
 from datetime import date, datetime, timedelta, timezone
 from dateutil import parser
 
-# Third-party imports
-import nltk
-import praw
-import finnhub
-import openai
+# Third-party imports. Heavy libraries (nltk, spaCy, praw, finnhub, openai,
+# yfinance, newspaper) are imported on first use so workers boot quickly.
 import pandas as pd
 import pymysql
 import requests
-import matplotlib.pyplot as plt
-import seaborn as sns
 from dotenv import load_dotenv
 from flask import Flask, request, jsonify, make_response, Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from sqlalchemy import create_engine, text
-from sqlalchemy.dialects.mysql import LONGTEXT
-from curl_cffi import requests as curl_requests
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-import yfinance as yf
+from sqlalchemy import inspect, text
 
-# Load environment variables
+# Load environment variables before local modules read them into Config
 load_dotenv()  # This will load variables from a .env file if present
 
+# Local imports
+import article_cache
+import debug_log
+import metrics
+import news_store
+import score_history
+from config import Config
+from market_data import MarketDataStore
+from price_stream import PriceStreamHub
+from jobs import JobManager
+from admission import RunQueue
+from persistence import WriteBehindQueue
+from cache import create_cache, refresh_hit_ratios
+from http_cache import conditional_json, make_etag
+from scoring import SCORE_NAMES, SCORING_VERSION, ScoringInputs, score_batch
+from result_views import DEFAULT_PAGE_SIZE, as_list, bars_list, compact_post, paginate, parse_fields, section, select_fields
+from profiling import ProfileSession, ProfileStore
+from payloads import LazyPayload, compress_columns, is_encoded, resolve
+from storage import add_missing_columns, create_mysql_engine, create_sqlite_engine, ensure_all_indexes, is_sqlite, longtext_dtype_map, table_exists
+from clients import clients
+from rate_limit import RateLimiter, RateLimitExceeded, BATCH, request_priority, is_alpha_vantage_throttled
+from resilience import (
+    BreakerRegistry, CircuitOpenError, Deadline, StagePoolSaturated, StageTimeout,
+    configure_stage_pool, run_with_timeout, stage_pool_stats, stage_timeouts_total,
+)
+from nlp_resources import ensure_nltk_data, get_nlp, get_sentiment_analyzer
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -40,38 +63,94 @@ logging.basicConfig(
     ]
 )
 logger = logging.getLogger(__name__)
+debug_log.configure(Config.LOG_LEVELS, Config.LOG_SAMPLE_RATES, default_level=Config.LOG_LEVEL_DEFAULT)
+# Large payload dumps only get formatted when their category is at DEBUG (and sampled in)
+financial_log = debug_log.get("financial")
+news_log = debug_log.get("news")
+upstream_log = debug_log.get("upstream")
+
+# Latest quote and recent bars per symbol, shared by /api/price and the pipeline
+market_data = MarketDataStore(max_symbols=Config.MARKET_DATA_MAX_SYMBOLS)
+# Shared across workers/instances when CACHE_URL points at Redis
+shared_cache = create_cache(
+    Config.CACHE_URL, max_entries=Config.MEMORY_CACHE_MAX_ENTRIES, max_bytes=Config.MEMORY_CACHE_MAX_BYTES
+)
+# Finished opt-in request profiles, readable from /admin/profiles on any worker
+profile_store = ProfileStore(Config.PROFILE_MAX_STORED, cache=shared_cache, ttl=Config.PROFILE_TTL)
+
+# Bounds how many full pipelines (spaCy, scraping) run at once in this worker
+run_queue = RunQueue(max_concurrent=Config.MAX_CONCURRENT_PIPELINES, max_queued=Config.MAX_QUEUED_PIPELINES)
+
+# One limiter and one circuit breaker per upstream provider, shared by every call site in this
+# worker; the limiter's buckets are shared by every worker too when the cache is Redis
+rate_limiter = RateLimiter(Config.RATE_LIMITS, cache=shared_cache, processes=Config.WEB_CONCURRENCY)
+breakers = BreakerRegistry(Config.BREAKER_FAILURE_THRESHOLD, Config.BREAKER_RESET_TIMEOUT)
+configure_stage_pool(Config.STAGE_POOL_SIZE, Config.MAX_ABANDONED_STAGES)
+
+# Pipeline and upstream timings, exported with everything else on /metrics
+stage_seconds = metrics.histogram("pipeline_stage_seconds", "Wall time of each analysis pipeline stage")
+pipeline_seconds = metrics.histogram(
+    "pipeline_duration_seconds",
+    "Wall time of full analysis pipeline runs (steps 1-6)",
+    buckets=(1, 2.5, 5, 10, 20, 30, 45, 60, 90, 120, 180),
+)
+pipelines_in_flight = metrics.gauge("pipelines_in_flight", "Analysis pipelines currently running steps 1-6")
+upstream_seconds = metrics.histogram("upstream_request_seconds", "Latency of upstream API calls by provider")
+upstream_errors_total = metrics.counter("upstream_errors_total", "Failed upstream API calls by provider and reason")
+analysis_requests_total = metrics.counter("analysis_requests_total", "Analysis requests by where the result came from")
 
-# Configure NLTK data directory for serverless environment
-nltk_data_dir = os.getenv('NLTK_DATA', tempfile.gettempdir())
-nltk.data.path.append(nltk_data_dir)
+def acquire_upstream(provider, check_breaker=True):
+    """
+    Fail fast if `provider`'s circuit is open, otherwise wait for a rate-limit token.
+    Follow-up calls within one admitted call pass check_breaker=False, so they
+    don't find their own half-open probe in flight and give up.
+    """
+    breaker = breakers.get(provider)
+    if check_breaker and not breaker.allow():
+        raise CircuitOpenError(f"{provider} circuit is open; skipping call")
+    try:
+        rate_limiter.acquire(provider, timeout=Config.RATE_LIMIT_MAX_WAIT)
+    except BaseException:
+        # Nothing reached the provider, so a half-open probe proved nothing either way
+        breaker.release_trial()
+        raise
 
-# Download NLTK data if not present
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt', download_dir=nltk_data_dir)
-try:
-    nltk.data.find('sentiment/vader_lexicon')
-except LookupError:
-    nltk.download('vader_lexicon', download_dir=nltk_data_dir)
-try:
-    nltk.data.find('taggers/averaged_perceptron_tagger')
-except LookupError:
-    nltk.download('averaged_perceptron_tagger', download_dir=nltk_data_dir)
-try:
-    nltk.data.find('chunkers/maxent_ne_chunker')
-except LookupError:
-    nltk.download('maxent_ne_chunker', download_dir=nltk_data_dir)
-try:
-    nltk.data.find('corpora/words')
-except LookupError:
-    nltk.download('words', download_dir=nltk_data_dir)
+def note_upstream_success(provider):
+    breakers.get(provider).record_success()
+
+def note_upstream_error(provider, e):
+    """Count a failed call against the breaker; feed 429s back into the limiter"""
+    if isinstance(e, CircuitOpenError):
+        upstream_errors_total.inc(provider=provider, reason="circuit_open")
+        return
+    if isinstance(e, RateLimitExceeded):
+        upstream_errors_total.inc(provider=provider, reason="rate_limited")
+        return
+    status = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+    if type(e).__name__ == "YFRateLimitError":
+        status = 429  # yfinance raises its own error for Yahoo's 429s
+    upstream_errors_total.inc(provider=provider, reason=str(status) if status else type(e).__name__)
+    if status == 429:
+        rate_limiter.throttled(provider)
+    breakers.get(provider).record_failure()
+
+@contextlib.contextmanager
+def upstream_call(provider):
+    """Rate-limit, circuit-break, time and account for a single upstream call"""
+    acquire_upstream(provider)
+    try:
+        # Timed after acquiring so rate-limit waits aren't counted as upstream latency
+        with upstream_seconds.time(provider=provider):
+            yield
+    except Exception as e:
+        note_upstream_error(provider, e)
+        raise
+    note_upstream_success(provider)
 
 # Configure PyMySQL
 pymysql.install_as_MySQLdb()
 
-# Initialize API clients and keys
-finnhub_client = finnhub.Client(os.environ.get("FINNHUB_API_KEY"))
+# Initialize API keys (clients are built on first use by the `clients` registry)
 api_key = os.environ.get("NEWS_API_KEY")
 openai_api_key = os.environ.get("OPENAI_API_KEY")
 reddit_client_id = os.environ.get("REDDIT_CLIENT_ID")
@@ -85,51 +164,48 @@ sql_port = os.environ.get("SQL_PORT", "3306")
 sql_db = os.environ.get("SQL_DATABASE")
 database_url = os.environ.get("DATABASE_URL") or os.environ.get("MYSQL_URL") or os.environ.get("MYSQL_PUBLIC_URL")
 
+# The engine connects lazily; connectivity is verified by ensure_database_ready()
+# during readiness instead of at import time in every worker.
 try:
-    # Prefer DATABASE_URL (Railway provides this), fallback to parts.
-    if database_url:
-        conn_string = database_url
+    if Config.STORAGE_BACKEND == "sqlite":
+        engine = create_sqlite_engine(Config.SQLITE_PATH)
+    elif not database_url and not sql_host:
+        if Config.STORAGE_BACKEND == "mysql":
+            raise ValueError("Set DATABASE_URL or SQL_HOST")
+        # Single-node default: embedded SQLite, no external service needed
+        engine = create_sqlite_engine(Config.SQLITE_PATH)
     else:
-        conn_string = (
-            "mysql+pymysql://{user}:{password}@{host}:{port}/{db}?charset=utf8mb4"
-        ).format(
-            user=sql_user,
-            password=sql_password,
-            host=sql_host,
-            port=int(sql_port),
-            db=sql_db,
-        )
-    engine = create_engine(conn_string, pool_recycle=3600)
-
-    # Test the connection
-    with engine.connect() as connection:
-        connection.execute(text("SELECT 1"))
-        logger.info("Database connection successful!")
+        # Prefer DATABASE_URL (Railway provides this), fallback to parts.
+        if database_url:
+            conn_string = database_url
+        else:
+            conn_string = (
+                "mysql+pymysql://{user}:{password}@{host}:{port}/{db}?charset=utf8mb4"
+            ).format(
+                user=sql_user,
+                password=sql_password,
+                host=sql_host,
+                port=int(sql_port),
+                db=sql_db,
+            )
+        engine = create_mysql_engine(conn_string)
 except Exception as e:
-    logger.error(f"Error connecting to database: {e}")
-    engine = None  # Set engine to None if connection fails
+    logger.error(f"Error configuring database: {e}")
+    engine = None  # Set engine to None if the database isn't configured
 
-import finnhub
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import time
 
-# Initialize Finnhub client
-finnhub_client = finnhub.Client(os.environ.get("FINNHUB_API_KEY"))
-api_key = os.environ.get("NEWS_API_KEY")
-openai_api_key = os.environ.get("OPENAI_API_KEY")
-reddit_client_id = os.environ.get("REDDIT_CLIENT_ID")
-reddit_client_secret = os.environ.get("REDDIT_CLIENT_SECRET")
-reddit_user_agent = os.environ.get("REDDIT_USER_AGENT")
-
 def get_company_info(ticker_symbol):
     """
     Get basic company info from the ticker symbol using Finnhub
     """
     try:
         # Get company profile
-        profile = finnhub_client.company_profile2(symbol=ticker_symbol)
+        with upstream_call("finnhub"):
+            profile = clients.finnhub().company_profile2(symbol=ticker_symbol)
 
         # Basic error checking
         if not profile or not profile.get("name"):
@@ -186,7 +262,8 @@ def get_company_news(ticker_symbol, from_days=7):
         to_date = end_date.strftime('%Y-%m-%d')
 
         # Get company news
-        news = finnhub_client.company_news(ticker_symbol, _from=from_date, to=to_date)
+        with upstream_call("finnhub"):
+            news = clients.finnhub().company_news(ticker_symbol, _from=from_date, to=to_date)
 
         # Process news
         processed_news = []
@@ -208,48 +285,87 @@ def get_company_news(ticker_symbol, from_days=7):
 
 """# Yahoo Finance"""
 
-import yfinance as yf
 import pandas as pd
 
 
+def financial_data_from_bars(ticker_symbol, historical_data, description):
+    """Build the get_financial_data payload from stored daily bars"""
+    hist = pd.DataFrame.from_dict(historical_data, orient='index').sort_index()
+    latest = hist.iloc[-1]
+    prev_day = hist.iloc[-2]
+    returns = hist['Close'].pct_change()
+    volatility = returns.std() * (256 ** 0.5) # annualized
+
+    return {
+        "ticker": ticker_symbol,
+        "current_price": float(latest['Close']),
+        "opening_price": float(latest['Open']),
+        "daily_high": float(latest['High']),
+        "daily_low": float(latest['Low']),
+        "price_change": float(((latest["Close"] - prev_day['Close']) / prev_day['Close']) * 100),
+        "trading_volume": float(latest["Volume"]),
+        "volatility": float(volatility),
+        "historical_data": historical_data,
+        "description": description
+    }
+
+def bars_from_history(hist):
+    """Convert a yfinance history DataFrame to {YYYY-MM-DD (US/Eastern): OHLCV}"""
+    historical_data = {}
+    for date, row in hist.iterrows():
+        # Handle timezone-aware timestamps
+        if date.tzinfo is not None:
+            # If timestamp is timezone-aware, convert to EST
+            est_date = date.tz_convert('US/Eastern')
+        else:
+            # If timestamp is naive, assume UTC and convert to EST
+            est_date = date.tz_localize('UTC').tz_convert('US/Eastern')
+
+        date_str = est_date.strftime('%Y-%m-%d')
+        historical_data[date_str] = {
+            'Open': float(row['Open']),
+            'High': float(row['High']),
+            'Low': float(row['Low']),
+            'Close': float(row['Close']),
+            'Volume': float(row['Volume'])
+        }
+    return historical_data
+
 def get_financial_data(ticker_symbol, period="1mo"):
     """
     Fetching financial data of a company
     """
     try:
-        # Create a session with Chrome impersonation using curl_requests
-        session = curl_requests.Session(
-            impersonate="chrome110",
-            timeout=30,
-            verify=True
-        )
-        
-        # Configure headers to mimic a real browser
-        session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Connection': 'keep-alive',
-        })
+        # Serve from the market-data store if another request fetched these bars recently
+        bars, details = market_data.recent_bars(ticker_symbol, Config.BARS_MAX_AGE)
+        if bars and len(bars) >= 2 and "description" in details:
+            financial_log.debug("Using stored bars for %s", ticker_symbol)
+            return financial_data_from_bars(ticker_symbol, bars, details["description"])
 
-        print("DEBUG: Creating Ticker with session")
+        # Reuse this thread's Chrome-impersonating session (keeps Yahoo connections warm)
+        session = clients.yahoo()
+
+        import yfinance as yf
+
+        financial_log.debug("Creating Ticker with session")
         company = yf.Ticker(ticker_symbol, session=session)
         
         # Get company description
-        stock = yf.Ticker(ticker_symbol, session=session)
-        description = stock.info.get('longBusinessSummary', 'No description available')
+        with upstream_call("yahoo"):
+            description = company.info.get('longBusinessSummary', 'No description available')
         
-        print("DEBUG: Fetching historical data")
+        financial_log.debug("Fetching historical data")
         # Use a longer period to ensure we have enough data
-        hist = company.history(period="2mo", interval="1d")
-        print("DEBUG: Historical data shape:", hist.shape)
-        print("DEBUG: Historical data columns:", hist.columns)
-        print("DEBUG: Historical data index:", hist.index)
-        print("DEBUG: Historical data sample:", hist.head())
-        print("DEBUG: Last 5 dates:", hist.index[-5:])
+        with upstream_call("yahoo"):
+            hist = company.history(period="2mo", interval="1d")
+        financial_log.debug(
+            "Historical data for %s: shape %s, columns %s, last 5 dates %s\n%s",
+            ticker_symbol, hist.shape, debug_log.Lazy(lambda: list(hist.columns)),
+            debug_log.Lazy(lambda: list(hist.index[-5:])), debug_log.Lazy(hist.head)
+        )
 
         if hist.empty:
-            print(f"No historical data found for {ticker_symbol}")
+            financial_log.warning("No historical data found for %s", ticker_symbol)
             return {
                 "ticker": ticker_symbol,
                 "error": f"No historical data found for {ticker_symbol}"
@@ -263,27 +379,10 @@ def get_financial_data(ticker_symbol, period="1mo"):
         returns = hist['Close'].pct_change()
         volatility = returns.std() * (256 ** 0.5) # annualized
 
-        # Convert historical data to dictionary format with proper date formatting
-        historical_data = {}
-        for date, row in hist.iterrows():
-            # Handle timezone-aware timestamps
-            if date.tzinfo is not None:
-                # If timestamp is timezone-aware, convert to EST
-                est_date = date.tz_convert('US/Eastern')
-            else:
-                # If timestamp is naive, assume UTC and convert to EST
-                est_date = date.tz_localize('UTC').tz_convert('US/Eastern')
-            
-            date_str = est_date.strftime('%Y-%m-%d')
-            historical_data[date_str] = {
-                'Open': float(row['Open']),
-                'High': float(row['High']),
-                'Low': float(row['Low']),
-                'Close': float(row['Close']),
-                'Volume': float(row['Volume'])
-            }
+        historical_data = bars_from_history(hist)
 
-        print("DEBUG: Processed historical data keys:", list(historical_data.keys())[-5:])  # Show last 5 dates
+        financial_log.debug("Processed historical data keys: %s", debug_log.Lazy(lambda: list(historical_data)[-5:]))
+        market_data.update_bars(ticker_symbol, historical_data, source="yahoo", description=description)
 
         data = {
             "ticker": ticker_symbol,
@@ -298,15 +397,10 @@ def get_financial_data(ticker_symbol, period="1mo"):
             "description": description
         }
 
-        print("DEBUG: Financial data structure:", json.dumps(data, indent=2))
+        financial_log.debug("Financial data structure: %s", debug_log.lazy_json(data, indent=2))
         return data
     except Exception as e:
-        import traceback
-        print(f"Error retrieving financial data: {e}")
-        print(f"Error type: {type(e)}")
-        print(f"Error details: {str(e)}")
-        print("Full traceback:")
-        print(traceback.format_exc())
+        financial_log.error("Error retrieving financial data for %s: %r", ticker_symbol, e, exc_info=True)
         return {
             "ticker": ticker_symbol,
             "error": f"Error retrieving financial data: {str(e)}"
@@ -314,7 +408,7 @@ def get_financial_data(ticker_symbol, period="1mo"):
 
 """# NewsAPI"""
 
-def get_news_and_extract_keywords(company_name, ticker_symbol=None, days=2, max_articles=10):
+def get_news_and_extract_keywords(company_name, ticker_symbol=None, days=2, max_articles=10, deadline=None):
     """
     Scrape news articles from multiple sources and extract keywords
 
@@ -323,20 +417,20 @@ def get_news_and_extract_keywords(company_name, ticker_symbol=None, days=2, max_
         ticker_symbol (str): Stock ticker for Finnhub API, defaults to None
         days (int): Number of days to look back
         max_articles (int): Maximum number of articles to process
+        deadline (Deadline): Stop processing further articles once this expires
+
+    Articles are processed once per subject (the ticker, else the company
+    name): each run asks the providers only for news since the newest
+    article it already has, skips URLs it has processed, and merges the new
+    articles with the stored, already-scored ones still inside the window.
     """
-    import requests
     from datetime import datetime, timedelta
-    import spacy
-    import nltk
-    import finnhub
-    from nltk.sentiment import SentimentIntensityAnalyzer
     from newspaper import Article
-    import nltk
-
 
-    # Load NLP models
-    nlp = spacy.load("en_core_web_lg")
-    sia = SentimentIntensityAnalyzer()
+    # Shared NLP models (loaded once per worker); newspaper's nlp() needs punkt
+    ensure_nltk_data()
+    nlp = get_nlp()
+    sia = get_sentiment_analyzer()
 
     # Calculate date range
     end_date = datetime.now()
@@ -346,37 +440,64 @@ def get_news_and_extract_keywords(company_name, ticker_symbol=None, days=2, max_
     from_date = start_date.strftime('%Y-%m-%d')
     to_date = end_date.strftime('%Y-%m-%d')
 
-    articles_data = []
-    all_keywords = []
-    all_entities = []
+    # Already-processed articles in the window, and per-provider watermarks over them
+    subject = ticker_symbol or company_name
+    window_start = datetime.now(timezone.utc) - timedelta(days=days)
+    stored = []
+    if ensure_database_ready():
+        try:
+            with engine.connect() as conn:
+                stored = news_store.load_recent(conn, subject, window_start)
+        except Exception as e:
+            logger.error(f"Error loading stored news for {subject}: {e}")
+    marks = news_store.watermarks(stored)
+    newsapi_mark = marks.get("newsapi", news_store.Watermark())
+    finnhub_mark = marks.get("finnhub", news_store.Watermark())
+    news_log.debug("Stored articles for %s: %d, watermarks %s", subject, len(stored),
+                   debug_log.Lazy(lambda: {provider: mark.latest for provider, mark in marks.items()}))
+
+    processed = []  # (article_data, all keywords) for articles new to this run
 
     # Define the process_article function inside to have access to Article
-    def process_article(article, articles_data, all_keywords, all_entities, nlp, sia):
+    def process_article(article, provider, nlp, sia):
         """Helper function to process individual articles"""
         try:
             article_url = article["url"]
-            news_article = Article(article_url)  # Now Article is in scope
-            news_article.download()
-            news_article.parse()
-            news_article.nlp()  # This extracts keywords
-
-            # Extract entities using spaCy
-            doc = nlp(news_article.text[:5000])  # Limit text size for processing
-
-            # Get named entities
-            entities = [(ent.text, ent.label_) for ent in doc.ents]
-
-            # Extract keywords (nouns and proper nouns)
-            keywords = [token.text.lower() for token in doc if token.pos_ in ("NOUN", "PROPN")]
-
-            # Add newspaper3k keywords
-            if news_article.keywords:
-                keywords.extend(news_article.keywords)
+            # The same story is often linked for several tickers and runs: reuse its extraction
+            content = article_contents.get(article_url)
+            if content is None:
+                news_article = Article(article_url)  # Now Article is in scope
+                # Fetch through the pooled session so repeat hosts reuse connections
+                page = clients.http("articles").get(
+                    article_url, headers={"User-Agent": news_article.config.browser_user_agent}
+                )
+                page.raise_for_status()
+                news_article.download(input_html=page.text)
+                news_article.parse()
+                news_article.nlp()  # This extracts keywords
+
+                # Extract entities using spaCy
+                article_text = news_article.text[:Config.ARTICLE_TEXT_MAX_CHARS]  # Limit text size for processing
+                doc = nlp(article_text)
+
+                # Extract keywords (nouns and proper nouns)
+                keywords = [token.text.lower() for token in doc if token.pos_ in ("NOUN", "PROPN")]
+
+                # Add newspaper3k keywords
+                if news_article.keywords:
+                    keywords.extend(news_article.keywords)
+
+                content = {
+                    "text": article_text,
+                    "keywords": list(set(keywords)),  # Remove duplicates
+                    "entities": [(ent.text, ent.label_) for ent in doc.ents],  # Named entities
+                }
+                article_contents.put(article_url, content)
 
-            # Remove duplicates
-            keywords = list(set(keywords))
+            keywords = content["keywords"]
+            entities = [tuple(entity) for entity in content["entities"]]
 
-            # Get sentiment
+            # Get sentiment (of this listing's title and summary, which differ by provider, so never cached)
             sentiment = sia.polarity_scores(article["title"] + " " + article.get("description", ""))
 
             article_data = {
@@ -391,26 +512,18 @@ def get_news_and_extract_keywords(company_name, ticker_symbol=None, days=2, max_
                 "sentiment": sentiment
 
             }
-
-            articles_data.append(article_data)
-            df_articles = pd.DataFrame([{
-                "title": article_data["title"],
-                "ticker": ticker_symbol,
-                "company_name": company_name,
-                "url": article_data["url"],
-                "published_at": article_data["published_at"],
-                "source": article_data["source"],
-                "sentiment_neg": article_data["sentiment"]["neg"],
-                "sentiment_neu": article_data["sentiment"]["neu"],
-                "sentiment_pos": article_data["sentiment"]["pos"],
-                "sentiment_compound": article_data["sentiment"]["compound"]
-            }])
-            df_articles.to_sql("news_articles", con=engine, if_exists="append", index=False)
-            all_keywords.extend(keywords)
-            all_entities.extend([e[0] for e in entities])
+            processed.append((article_data, keywords))
 
         except Exception as e:
             print(f"Error processing article {article.get('url')}: {e}")
+            return
+
+        try:
+            with engine.begin() as conn:
+                news_store.save(conn, subject, provider, article_data, keywords)
+        except Exception as e:
+            # Still used for this run; it just gets processed again next time
+            logger.error(f"Error storing article {article_data['url']}: {e}")
 
     # 1. Get news from NewsAPI (general news sources)
     if company_name:
@@ -418,30 +531,64 @@ def get_news_and_extract_keywords(company_name, ticker_symbol=None, days=2, max_
             # Free API key from NewsAPI (limited usage)
             api_key = os.environ.get('NEWS_API_KEY')
 
-            # Make request to NewsAPI
-            url = f"https://newsapi.org/v2/everything?q={company_name}&from={from_date}&to={to_date}&sortBy=popularity&apiKey={api_key}"
+            # Only news since the newest article already processed (NewsAPI takes full ISO times)
+            newsapi_from = from_date
+            if newsapi_mark.latest is not None:
+                newsapi_from = max(newsapi_mark.latest, window_start).strftime('%Y-%m-%dT%H:%M:%S')
+
+            # Make request to NewsAPI. The first fetch takes the most popular
+            # articles; later ones must see everything past the watermark, by date
+            sort_by = "publishedAt" if newsapi_mark.latest is not None else "popularity"
+            url = f"https://newsapi.org/v2/everything?q={company_name}&from={newsapi_from}&to={to_date}&sortBy={sort_by}&apiKey={api_key}"
 
-            response = requests.get(url)
+            with upstream_call("newsapi"):
+                response = clients.http("newsapi").get(url)
+            rate_limiter.observe_response("newsapi", response)
             news_data = response.json()
+            if news_data.get("code") == "rateLimited":
+                rate_limiter.throttled("newsapi")
+
+            # Half the max articles from each source
+            new_articles = news_store.select_new(
+                news_data.get("articles", []), newsapi_mark, max_articles // 2,
+                url_of=lambda article: article.get("url"),
+                published_of=lambda article: news_store.parse_published(article.get("publishedAt")),
+            )
 
             # Process each article from NewsAPI
-            for article in news_data.get("articles", [])[:max_articles//2]:  # Use half the max articles from each source
-                process_article(article, articles_data, all_keywords, all_entities, nlp, sia)
+            for article in new_articles:
+                if deadline is not None and deadline.expired():
+                    print("News deadline reached, keeping articles processed so far")
+                    break
+                process_article(article, "newsapi", nlp, sia)
 
         except Exception as e:
             print(f"Error fetching news from NewsAPI: {e}")
 
     # 2. Get news from Finnhub API if ticker is provided
-    if ticker_symbol:
+    if ticker_symbol and not (deadline is not None and deadline.expired()):
         try:
-            # Initialize Finnhub client
-            finnhub_client = finnhub.Client(api_key=os.environ.get('FINNHUB_API_KEY'))
+            # Finnhub only filters by day, so the watermark's day is refetched and deduplicated by URL
+            finnhub_from = from_date
+            if finnhub_mark.latest is not None:
+                finnhub_from = max(finnhub_mark.latest.astimezone(), window_start.astimezone()).strftime('%Y-%m-%d')
 
             # Get company news from Finnhub
-            finnhub_news = finnhub_client.company_news(ticker_symbol, _from=from_date, to=to_date)
+            with upstream_call("finnhub"):
+                finnhub_news = clients.finnhub().company_news(ticker_symbol, _from=finnhub_from, to=to_date)
+
+            # Half the max articles from each source
+            new_articles = news_store.select_new(
+                finnhub_news, finnhub_mark, max_articles // 2,
+                url_of=lambda article: article.get("url"),
+                published_of=lambda article: news_store.parse_published(datetime.fromtimestamp(article.get("datetime", 0))),
+            )
 
             # Process each article from Finnhub
-            for article in finnhub_news[:max_articles//2]:  # Use half the max articles from each source
+            for article in new_articles:
+                if deadline is not None and deadline.expired():
+                    print("News deadline reached, keeping articles processed so far")
+                    break
                 finnhub_article = {
                     "title": article.get("headline", ""),
                     "url": article.get("url", ""),
@@ -449,10 +596,21 @@ def get_news_and_extract_keywords(company_name, ticker_symbol=None, days=2, max_
                     "description": article.get("summary", ""),
                     "source": {"name": article.get("source", "Finnhub")}
                 }
-                process_article(finnhub_article, articles_data, all_keywords, all_entities, nlp, sia)
+                process_article(finnhub_article, "finnhub", nlp, sia)
 
         except Exception as e:
-            print(f"Error fetching news from Finnhub: {e}")
+                print(f"Error fetching news from Finnhub: {e}")
+
+    # New articles first, then stored ones still in the window (already newest first), up to max_articles
+    processed.sort(key=lambda item: news_store.parse_published(item[0]["published_at"]) or window_start, reverse=True)
+    fresh_urls = {article_data["url"] for article_data, _ in processed}
+    merged = processed + [(article, keywords) for _, article, keywords in stored if article["url"] not in fresh_urls]
+    merged = merged[:max(max_articles, len(processed))]
+    news_log.debug("News for %s: %d new, %d merged from storage", subject, len(processed), len(merged) - len(processed))
+
+    articles_data = [article_data for article_data, _ in merged]
+    all_keywords = [keyword for _, keywords in merged for keyword in keywords]
+    all_entities = [entity[0] for article_data, _ in merged for entity in article_data["entities"]]
 
     # Get most common keywords and entities
     from collections import Counter
@@ -467,146 +625,19 @@ def get_news_and_extract_keywords(company_name, ticker_symbol=None, days=2, max_
 
 """# Scoring"""
 
-import numpy as np
-from datetime import datetime, timezone
-from dateutil.tz import tzutc
-import pandas as pd
-
-def calculate_metrics(financial_data, news_data, social_data):
-    """Calculate metrics based on financial, news, and social data"""
-    scores = {}
-
-    # 1. Financial momentum score (0-100)
-    try:
-        # Convert historical data to DataFrame for calculations
-        hist_df = pd.DataFrame.from_dict(financial_data["historical_data"], orient='index')
-        hist_df.index = pd.to_datetime(hist_df.index)
-        hist_df = hist_df.sort_index()
-
-        # Price momentum (recent performance vs historical)
-        price_change_5d = hist_df['Close'].pct_change(5).iloc[-1] * 100
-        price_change_20d = hist_df['Close'].pct_change(20).iloc[-1] * 100
-
-        # Volume momentum (recent volume vs average)
-        volume_ratio = hist_df['Volume'].iloc[-1] / hist_df['Volume'].iloc[-20:].mean()
-
-        # Volatility adjustment
-        volatility = financial_data.get("volatility", 0.01)
-        volatility_score = min(50, (1/volatility) * 10)
-
-        # Combine into financial momentum (0-100)
-        financial_momentum = min(100, max(0, (
-            (price_change_5d * 3) +
-            (price_change_20d * 2) +
-            (volume_ratio * 10) +
-            volatility_score
-        )))
-
-        scores["financial_momentum"] = financial_momentum
-    except Exception as e:
-        print(f"Error calculating financial momentum: {e}")
-        print(f"Error type: {type(e)}")
-        print(f"Error details: {str(e)}")
-        print(f"Financial data structure: {json.dumps(financial_data, indent=2, default=json_serial)}")
-        if 'historical_data' in financial_data:
-            print(f"Historical data type: {type(financial_data['historical_data'])}")
-            print(f"Historical data sample: {json.dumps(dict(list(financial_data['historical_data'].items())[:2]), indent=2, default=json_serial)}")
-        scores["financial_momentum"] = 50
-
-    # 2. News sentiment score (0-100)
-    try:
-        if news_data.get("articles"):
-            # Average sentiment across all articles
-            sentiment_values = [article["sentiment"]["compound"] for article in news_data["articles"]]
-            avg_sentiment = sum(sentiment_values) / len(sentiment_values)
-
-            # Scale from -1,1 to 0,100
-            news_sentiment = (avg_sentiment + 1) * 50
-
-            # Adjust by article count
-            article_count_factor = min(1.5, max(0.5, len(news_data["articles"]) / 10))
-            news_sentiment = min(100, max(0, news_sentiment * article_count_factor))
-
-            scores["news_sentiment"] = news_sentiment
-        else:
-            scores["news_sentiment"] = 50
-    except Exception as e:
-        print(f"Error calculating news sentiment: {e}")
-        scores["news_sentiment"] = 50
-
-    # 3. Social media buzz score (0-100)
-    try:
-        if social_data.get("posts"):
-            # Basic social sentiment
-            social_sentiment = (social_data["avg_sentiment"] + 1) * 50
-
-            # Volume factor
-            post_volume = min(2.0, max(0.5, social_data["total_posts"] / 50))
-
-            # Recent post ratio
-            now = datetime.now(timezone.utc)
-
-
-            recent_posts = [p for p in social_data["posts"]
-                if isinstance(p.get("created_at"), (datetime, np.datetime64)) and
-                  p["created_at"].replace(tzinfo=tzutc()) > (now - timedelta(hours=24))
-            ]
-            recency_factor = min(1.5, max(0.5, len(recent_posts) / max(1, len(social_data["posts"])) * 3))
-
-            # Engagement factor
-            engagements = [p.get("engagement", 0) for p in social_data["posts"]]
-            avg_engagement = sum(engagements) / max(1, len(engagements))
-            engagement_factor = min(2.0, max(0.5, avg_engagement / 10))
-
-            # Combined social buzz score
-            social_buzz = min(100, max(0, social_sentiment * post_volume * recency_factor * engagement_factor))
-
-            scores["social_buzz"] = social_buzz
-        else:
-            scores["social_buzz"] = 0
-    except Exception as e:
-        print(f"Error calculating social buzz: {e}")
-        scores["social_buzz"] = 0
-
-    # 4. Combined "Hype Index"
-    try:
-        # Adjusted weights to give more importance to financial momentum
-        hype_index = (
-            (scores["financial_momentum"] * 0.6) +  
-            (scores["news_sentiment"] * 0.2) +     
-            (scores["social_buzz"] * 0.2)           
-        )
-
-        scores["hype_index"] = hype_index
-    except Exception as e:
-        print(f"Error calculating hype index: {e}")
-        scores["hype_index"] = 50
-
-    # 5. Sentiment-Price Divergence
-    try:
-        # Use the same DataFrame we created for financial momentum
-        price_change_3d = hist_df['Close'].pct_change(3).iloc[-1] * 100
-        combined_sentiment = (scores["news_sentiment"] + scores["social_buzz"]) / 2
-
-        # Normalize price change to 0-100 scale
-        norm_price = min(100, max(0, (price_change_3d + 10) * 5))
-
-        # Calculate divergence (price - sentiment)
-        # Positive means price is higher than sentiment (bearish divergence)
-        # Negative means price is lower than sentiment (bullish divergence)
-        sentiment_price_divergence = norm_price - combined_sentiment
-        scores["sentiment_price_divergence"] = sentiment_price_divergence
-    except Exception as e:
-        print(f"Error calculating sentiment-price divergence: {e}")
-        print(f"Error type: {type(e)}")
-        print(f"Error details: {str(e)}")
-        scores["sentiment_price_divergence"] = 0
+def calculate_metrics(financial_data, news_data, social_data, now=None):
+    """
+    Calculate metrics based on financial, news, and social data, as of `now`
+    (the run's last_run; defaults to the current time).
 
-    return scores
+    One ticker is a batch of one for the vectorized engine in scoring.py,
+    so live results, leaderboards and rescoring all use the same formulas.
+    """
+    inputs = ScoringInputs.stack([(financial_data, news_data, social_data)], now=now)
+    return score_batch(inputs).row(0)
 
 """# Expand Keywords"""
 
-import openai
 import json
 
 def expand_keywords_and_generate_queries(keywords, company_name, industry):
@@ -633,25 +664,35 @@ def expand_keywords_and_generate_queries(keywords, company_name, industry):
     }}
     """
 
+    cache_key = "openai:expand:" + hashlib.sha256(
+        json.dumps([keywords[:10], company_name, industry]).encode("utf-8")
+    ).hexdigest()
+    cached = shared_cache.get_json(cache_key)
+    if cached is not None:
+        return cached
+
     try:
-        client = openai.OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that expands keywords and generates search queries."},
-                {"role": "user", "content": prompt.strip()}
-            ],
-            temperature=0.7,
-            max_tokens=800
-        )
+        client = clients.openai()
+        with upstream_call("openai"):
+            response = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant that expands keywords and generates search queries."},
+                    {"role": "user", "content": prompt.strip()}
+                ],
+                temperature=0.7,
+                max_tokens=800
+            )
 
         content = response.choices[0].message.content
         result = json.loads(content)
 
-        return {
+        expansion = {
             "expanded_keywords": result.get("expanded_keywords", []),
             "search_queries": result.get("search_queries", [])
         }
+        shared_cache.set_json(cache_key, expansion, ttl=Config.EXPANSION_CACHE_TTL)
+        return expansion
 
     except Exception as e:
         print(f"Error with OpenAI keyword expansion: {e}")
@@ -663,14 +704,12 @@ def expand_keywords_and_generate_queries(keywords, company_name, industry):
 """# Reddit and Bluesky"""
 
 import requests
-import praw
 import pandas as pd
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
 from configparser import ConfigParser
 import asyncio
 import time
 
-def fetch_bluesky_posts_and_analyze(company_name, search_queries, analyzer, max_results=100):
+def fetch_bluesky_posts_and_analyze(company_name, search_queries, analyzer, max_results=100, deadline=None):
     logger.info(f"Starting Bluesky post fetch for {company_name}")
     BLUESKY_API = "https://bsky.social/xrpc"
     identifier = "tradevision.bsky.social"
@@ -678,11 +717,13 @@ def fetch_bluesky_posts_and_analyze(company_name, search_queries, analyzer, max_
 
     try:
         logger.info("Attempting Bluesky authentication")
-        auth_response = requests.post(
-            f"{BLUESKY_API}/com.atproto.server.createSession",
-            json={"identifier": identifier, "password": password},
-        )
-        auth_response.raise_for_status()
+        with upstream_call("bluesky"):
+            auth_response = clients.http("bluesky").post(
+                f"{BLUESKY_API}/com.atproto.server.createSession",
+                json={"identifier": identifier, "password": password},
+            )
+            rate_limiter.observe_response("bluesky", auth_response)
+            auth_response.raise_for_status()
         access_token = auth_response.json()["accessJwt"]
         logger.info("Successfully authenticated with Bluesky")
     except Exception as e:
@@ -693,14 +734,19 @@ def fetch_bluesky_posts_and_analyze(company_name, search_queries, analyzer, max_
     all_posts = []
 
     for query in search_queries:
+        if deadline is not None and deadline.expired():
+            logger.info("Social deadline reached, keeping Bluesky posts collected so far")
+            break
         try:
             logger.info(f"Searching Bluesky for query: {query}")
-            response = requests.get(
-                f"{BLUESKY_API}/app.bsky.feed.searchPosts",
-                headers=headers,
-                params={"q": query, "limit": max_results},
-            )
-            response.raise_for_status()
+            with upstream_call("bluesky"):
+                response = clients.http("bluesky").get(
+                    f"{BLUESKY_API}/app.bsky.feed.searchPosts",
+                    headers=headers,
+                    params={"q": query, "limit": max_results},
+                )
+                rate_limiter.observe_response("bluesky", response)
+                response.raise_for_status()
             posts = response.json().get("posts", [])
             logger.info(f"Found {len(posts)} posts for query: {query}")
 
@@ -727,13 +773,13 @@ def fetch_bluesky_posts_and_analyze(company_name, search_queries, analyzer, max_
     logger.info(f"Total Bluesky posts collected: {len(all_posts)}")
     return all_posts
 
-def scrape_social_media(company_name, search_queries, max_results=100):
+def scrape_social_media(company_name, search_queries, max_results=100, deadline=None):
     """
     Scrape Reddit for company mentions using the search queries generated by the LLM
     """
 
     # Initialize sentiment analyzer
-    analyzer = SentimentIntensityAnalyzer()
+    analyzer = get_sentiment_analyzer()
     all_posts = []
 
     # Function to filter and score posts using VADER (no API costs)
@@ -746,16 +792,8 @@ def scrape_social_media(company_name, search_queries, max_results=100):
 
     # Reddit scraping using PRAW
     try:
-        reddit_client_id = os.environ.get("REDDIT_CLIENT_ID")
-        reddit_client_secret = os.environ.get("REDDIT_CLIENT_SECRET")
-        reddit_user_agent = os.environ.get("REDDIT_USER_AGENT")
-
-        # Initialize Reddit API
-        reddit = praw.Reddit(
-            client_id=reddit_client_id,
-            client_secret=reddit_client_secret,
-            user_agent=reddit_user_agent
-        )
+        # Per-thread Reddit client backed by a pooled session
+        reddit = clients.reddit()
 
         reddit_posts = []
         min_posts_target = 20
@@ -770,7 +808,8 @@ def scrape_social_media(company_name, search_queries, max_results=100):
         try:
             company_subreddit = reddit.subreddit(company_name.lower())
             # Check if subreddit exists with a quick check
-            _ = company_subreddit.created_utc
+            with upstream_call("reddit"):
+                _ = company_subreddit.created_utc
             subreddits.append(company_name.lower())
         except Exception as e:
             print(f"Company subreddit doesn't exist or is inaccessible: {e}")
@@ -786,6 +825,7 @@ def scrape_social_media(company_name, search_queries, max_results=100):
             recent_posts = []
             try:
                 # First try with search
+                acquire_upstream("reddit")
                 for submission in subreddit_obj.search(query, sort="new", time_filter="week", limit=limit):
                     # Skip if post is too old
                     if submission.created_utc < one_week_ago:
@@ -815,6 +855,7 @@ def scrape_social_media(company_name, search_queries, max_results=100):
                     ]
 
                     for method, method_limit in browse_methods:
+                        acquire_upstream("reddit", check_breaker=False)
                         for submission in method(limit=method_limit):
                             # Skip if post is too old
                             if submission.created_utc < one_week_ago:
@@ -843,7 +884,9 @@ def scrape_social_media(company_name, search_queries, max_results=100):
                             # to avoid duplicates
                             if not any(existing["url"] == post["url"] for existing in recent_posts):
                                 recent_posts.append(post)
+                note_upstream_success("reddit")
             except Exception as e:
+                note_upstream_error("reddit", e)
                 print(f"Error getting posts from subreddit {subreddit_obj.display_name}: {e}")
 
             return recent_posts
@@ -852,6 +895,9 @@ def scrape_social_media(company_name, search_queries, max_results=100):
         for subreddit_name in subreddits:
             if len(reddit_posts) >= min_posts_target:
                 break
+            if deadline is not None and deadline.expired():
+                print("Social deadline reached, keeping Reddit posts collected so far")
+                break
 
             try:
                 subreddit = reddit.subreddit(subreddit_name)
@@ -869,12 +915,14 @@ def scrape_social_media(company_name, search_queries, max_results=100):
 
                     if len(reddit_posts) >= min_posts_target:
                         break
+                    if deadline is not None and deadline.expired():
+                        break
             except Exception as e:
                 print(f"Error accessing subreddit {subreddit_name}: {e}")
                 continue
 
         print(f"Collected a total of {len(reddit_posts)} Reddit posts")
-        bluesky_posts = fetch_bluesky_posts_and_analyze(company_name, search_queries, analyzer)
+        bluesky_posts = fetch_bluesky_posts_and_analyze(company_name, search_queries, analyzer, deadline=deadline)
         all_posts.extend(bluesky_posts)
         all_posts.extend(reddit_posts)
     except Exception as e:
@@ -924,15 +972,18 @@ def get_alpha_vantage_trending():
     url = f"https://www.alphavantage.co/query?function=TOP_GAINERS_LOSERS&apikey={alpha_vantage_api_key}"
 
     try:
-        response = requests.get(url, timeout=10)
+        with upstream_call("alpha_vantage"):
+            response = clients.http("alpha_vantage").get(url, timeout=10)
         data = response.json()
+        if is_alpha_vantage_throttled(data):
+            rate_limiter.throttled("alpha_vantage")
 
 
         trending = [
             f"{stock['ticker']} ({stock['price']})"
             for stock in data.get('top_gainers', [])
         ]
-        print(trending[0:10])
+        upstream_log.debug("Alpha Vantage top gainers: %s", trending[:10])
         return trending[:10]
 
     except Exception as e:
@@ -948,6 +999,8 @@ def json_serial(obj):
     """JSON serializer for objects not serializable by default json code"""
     if isinstance(obj, (datetime, date)):
         return obj.isoformat()
+    if isinstance(obj, LazyPayload):
+        return obj.value()
     raise TypeError("Type %s not serializable" % type(obj))
 
 def flatten_nested_dict(d, parent_key='', sep='.'):
@@ -957,6 +1010,8 @@ def flatten_nested_dict(d, parent_key='', sep='.'):
     items = []
     for k, v in d.items():
         new_key = f"{parent_key}{sep}{k}" if parent_key else k
+        # Values carried over from a cached row may still be packed
+        v = resolve(v)
         if isinstance(v, dict):
             # Special handling for historical_data to store as JSON
             if k == 'historical_data':
@@ -974,6 +1029,62 @@ def flatten_nested_dict(d, parent_key='', sep='.'):
             items.append((new_key, v))
     return dict(items)
 
+def reconstruct_cached_result(recent_data_dict):
+    """Rebuild the nested result from a flattened `data` row (inverse of flatten_nested_dict)"""
+    logger.info("Reconstructing data structure")
+    reconstructed_data = {}
+
+    for key, value in recent_data_dict.items():
+        if is_encoded(value):
+            # Compressed column: only unpacked if the value is actually used
+            value = LazyPayload(value)
+        if '.' in key:
+            parts = key.split('.')
+            current = reconstructed_data
+            for part in parts[:-1]:
+                if part not in current:
+                    current[part] = {}
+                current = current[part]
+            current[parts[-1]] = value
+        else:
+            reconstructed_data[key] = value
+
+    if 'financial_data' in reconstructed_data:
+        historical_data = reconstructed_data['financial_data'].get('historical_data')
+        if isinstance(historical_data, LazyPayload):
+            reconstructed_data['financial_data']['historical_data'] = LazyPayload(historical_data.encoded, as_json=True)
+        elif historical_data is not None:
+            try:
+                historical_data = json.loads(historical_data)
+                reconstructed_data['financial_data']['historical_data'] = historical_data
+                logger.info("Successfully parsed historical_data")
+            except json.JSONDecodeError as e:
+                logger.error(f"Error parsing historical_data: {e}")
+
+    # Parse news_data.articles if it exists
+    if 'news_data' in reconstructed_data:
+        try:
+            if isinstance(reconstructed_data['news_data'], str):
+                news_data = json.loads(reconstructed_data['news_data'])
+                reconstructed_data['news_data'] = news_data
+                logger.info("Successfully parsed news_data from string")
+            else:
+                logger.info("news_data is already a dictionary, no parsing needed")
+        except json.JSONDecodeError as e:
+            logger.error(f"Error parsing news_data: {e}")
+
+    # Stages that overran their budget when this result was produced
+    degraded = resolve(reconstructed_data.get('degraded'))
+    if isinstance(degraded, str):
+        try:
+            reconstructed_data['degraded'] = json.loads(degraded)
+        except json.JSONDecodeError:
+            reconstructed_data['degraded'] = []
+    elif degraded is None:
+        reconstructed_data['degraded'] = []
+
+    return reconstructed_data
+
 def parse_timestamp(timestamp_str):
     """Helper function to parse timestamps from database"""
     if not timestamp_str:
@@ -1009,24 +1120,299 @@ def parse_timestamp(timestamp_str):
                 logger.error(f"Could not parse timestamp: {timestamp_str}")
                 return None
 
-def table_exists(conn, table_name):
-    """Check if a table exists in the current database"""
-    result = conn.execute(
-        text(
-            """
-            SELECT COUNT(*)
-            FROM information_schema.tables
-            WHERE table_schema = DATABASE()
-            AND table_name = :table_name
-            """
-        ),
-        {"table_name": table_name},
-    ).scalar()
-    return bool(result)
-
-def longtext_dtype_map(df):
-    """Map object columns to LONGTEXT for MySQL JSON/text payloads."""
-    return {col: LONGTEXT() for col in df.columns if df[col].dtype == object}
+def save_analyses(batch, history=None):
+    """
+    Replace the cached `data` rows for a batch of (ticker, result) pairs in one
+    transaction, appending `history` (score_history entries; by default one
+    per result) in the same transaction
+    """
+    # Large JSON columns (bars, articles, posts) are stored compressed
+    frames = [
+        (ticker, pd.DataFrame([compress_columns(flatten_nested_dict(res), Config.PAYLOAD_COMPRESS_MIN_SIZE, Config.PAYLOAD_CODEC)]))
+        for ticker, res in batch
+    ]
+
+    with engine.begin() as conn:
+        created = False
+        for ticker, df_flat in frames:
+            if table_exists(conn, "data"):
+                add_missing_columns(conn, "data", df_flat)
+                conn.execute(text("DELETE FROM data WHERE `company_info.ticker` = :ticker"), {"ticker": ticker})
+            else:
+                created = True
+            df_flat.to_sql("data", con=conn, if_exists="append", index=False, dtype=longtext_dtype_map(conn, df_flat))
+        # `data` keeps only the latest run per ticker; the history keeps every run's scores
+        if history is None:
+            history = [history_entry(ticker, res) for ticker, res in batch]
+        score_history.append(conn, history)
+        if created:
+            # First result on a fresh database: the pipeline has just created the other tables too
+            ensure_all_indexes(conn)
+
+def history_entry(ticker, res):
+    return (ticker, res.get("last_run"), res.get("scores"), res.get("scoring_version"))
+
+# Write-behind keys: a ticker for its latest result, which a newer run
+# replaces in the queue, and history:<ticker>:<last_run> for each run's
+# scores, which nothing replaces, so every run reaches score_history
+HISTORY_KEY_PREFIX = "history:"
+
+def write_queued(batch):
+    """Write-behind writer: results replace `data` rows, history entries are appended"""
+    history = [tuple(payload) for key, payload in batch if key.startswith(HISTORY_KEY_PREFIX)]
+    results = [(key, payload) for key, payload in batch if not key.startswith(HISTORY_KEY_PREFIX)]
+    save_analyses(results, history=history)
+
+def persist_analysis(ticker, res):
+    """Queue a fresh result and its score_history entry for writing"""
+    write_behind.submit(f"{HISTORY_KEY_PREFIX}{ticker}:{res.get('last_run')}", list(history_entry(ticker, res)))
+    write_behind.submit(ticker, res)
+
+# Fresh results go to the client first; this persists them in the background
+write_behind = WriteBehindQueue(
+    write_queued,
+    spool_dir=Config.WRITE_BEHIND_SPOOL_DIR,
+    batch_size=Config.WRITE_BEHIND_BATCH_SIZE,
+    flush_interval=Config.WRITE_BEHIND_FLUSH_INTERVAL,
+    max_retries=Config.WRITE_BEHIND_MAX_RETRIES,
+    json_default=json_serial
+)
+
+# Extracted article content, shared across tickers, runs and workers (see article_cache.py)
+article_contents = article_cache.ArticleContentCache(
+    lambda: engine if ensure_database_ready() else None,
+    memory_max_bytes=Config.ARTICLE_CACHE_MEMORY_BYTES,
+    max_rows=Config.ARTICLE_CACHE_MAX_ROWS,
+    max_age=Config.ARTICLE_CACHE_MAX_AGE,
+    codec=Config.PAYLOAD_CODEC
+)
+
+# Rescores bump a counter in the database, from whichever process runs them
+# (the CLI, any worker). It is part of the analysis and leaderboard cache
+# keys, so a bump retires those entries in every worker, whatever the cache
+# backend; each worker re-reads it every SCORE_GENERATION_CHECK_INTERVAL.
+_score_generation = {"value": 0, "checked_at": None}
+
+def ensure_score_generation_table(conn):
+    if not table_exists(conn, "score_generation"):
+        logger.info("Creating score_generation table")
+        conn.execute(text("CREATE TABLE score_generation (id INT NOT NULL PRIMARY KEY, generation INT NOT NULL)"))
+
+def score_generation():
+    """The current rescore generation, as last read from the database"""
+    now = time.monotonic()
+    checked_at = _score_generation["checked_at"]
+    if not _database_ready or (checked_at is not None and now - checked_at < Config.SCORE_GENERATION_CHECK_INTERVAL):
+        return _score_generation["value"]
+    _score_generation["checked_at"] = now
+    try:
+        with engine.connect() as conn:
+            value = conn.execute(text("SELECT generation FROM score_generation WHERE id = 1")).scalar()
+    except Exception as e:
+        logger.warning(f"Reading the score generation failed: {e}")
+        return _score_generation["value"]
+    _score_generation["value"] = value or 0
+    return _score_generation["value"]
+
+def bump_score_generation():
+    with engine.begin() as conn:
+        ensure_score_generation_table(conn)
+        if not conn.execute(text("UPDATE score_generation SET generation = generation + 1 WHERE id = 1")).rowcount:
+            conn.execute(text("INSERT INTO score_generation (id, generation) VALUES (1, 1)"))
+    _score_generation["checked_at"] = None
+
+def analysis_key(ticker):
+    return f"analysis:{score_generation()}:{ticker}"
+
+def leaderboard_key():
+    return f"leaderboard:{score_generation()}:all"
+
+def cache_analysis(ticker, res, ttl=timedelta(hours=1)):
+    """Share a result with other workers for the rest of its 1-hour cache window"""
+    if ttl.total_seconds() > 0:
+        shared_cache.set_json(analysis_key(ticker), res, ttl=ttl.total_seconds(), default=json_serial)
+
+def pending_result(ticker, now_utc):
+    """A result still waiting in the write-behind queue, if inside the 1-hour cache window"""
+    res = write_behind.pending(ticker)
+    last_run_time = parse_timestamp(res.get("last_run")) if res else None
+    if last_run_time is None:
+        return None
+    return res if now_utc - last_run_time < timedelta(hours=1) else None
+
+def as_sse(events):
+    """Format each event dict as an SSE message, passing through the generator's return value"""
+    while True:
+        try:
+            event = next(events)
+        except StopIteration as stop:
+            return stop.value
+        yield send_sse_message(event)
+
+def run_stage(name, deadline, fn, *args, fallback=None, cooperative=False, **kwargs):
+    """
+    Run one pipeline stage within its budget.
+
+    Returns (result, degraded_reason). On overrun the stage's fallback is
+    returned instead; cooperative stages also get a soft Deadline so they can
+    stop early and hand back what they have collected so far.
+    """
+    budget = deadline.budget(Config.STAGE_BUDGETS.get(name, deadline.remaining()))
+    if budget <= 0:
+        return fallback, "skipped: analysis deadline exhausted"
+
+    soft_deadline = None
+    if cooperative:
+        # Leave headroom for the in-flight article/query to finish before the hard cut-off
+        soft_deadline = Deadline(budget * 0.85)
+        kwargs["deadline"] = soft_deadline
+
+    try:
+        result = run_with_timeout(fn, budget, *args, **kwargs)
+    except StagePoolSaturated as e:
+        logger.warning(f"Stage {name} skipped: {e}")
+        return fallback, "skipped: stage pool busy with timed-out stages"
+    except StageTimeout:
+        stage_timeouts_total.inc(stage=name)
+        logger.warning(f"Stage {name} exceeded its {budget:.0f}s budget; continuing without it")
+        return fallback, f"timed out after {budget:.0f}s"
+
+    if soft_deadline is not None and soft_deadline.expired():
+        return result, "partial results: stage budget reached"
+    return result, None
+
+def run_analysis_stages(ticker, now_utc, deadline=None, profile=None):
+    """
+    Run pipeline steps 1-6 under an end-to-end deadline, yielding progress events.
+
+    Returns the result dict, or None if the ticker could not be resolved.
+    Stages that overrun are reported with status "degraded" and listed in the
+    result's `degraded` field; calculate_metrics then scores them with its
+    neutral defaults. Every terminal stage event carries the stage's wall time
+    as `duration_ms`; the same spans feed pipeline_stage_seconds on /metrics.
+    With a ProfileSession, each stage is also sampled and memory-traced.
+    """
+    pipelines_in_flight.inc()
+    started = time.perf_counter()
+    try:
+        return (yield from _analysis_steps(ticker, now_utc, deadline, profile))
+    finally:
+        pipelines_in_flight.dec()
+        pipeline_seconds.observe(time.perf_counter() - started)
+
+def _analysis_steps(ticker, now_utc, deadline=None, profile=None):
+    """Body of run_analysis_stages, which accounts for it as one in-flight pipeline"""
+    deadline = deadline or Deadline(Config.ANALYZE_DEADLINE)
+    degraded = []
+    durations = {}
+
+    def timed_stage(name, fn, *args, **kwargs):
+        with stage_seconds.time(stage=name) as span:
+            outcome = run_stage(name, deadline, fn if profile is None else profile.wrap(name, fn), *args, **kwargs)
+        durations[name] = round(span["seconds"] * 1000, 1)
+        return outcome
+
+    def stage_done(step, reason, success_message):
+        if reason:
+            degraded.append({"stage": step, "reason": reason})
+            logger.warning(f"Stage {step} degraded: {reason}")
+            return {"step": step, "status": "degraded", "message": f"{success_message} ({reason})", "duration_ms": durations.get(step)}
+        logger.info(f"{success_message} in {durations.get(step)} ms")
+        return {"step": step, "status": "success", "message": success_message, "duration_ms": durations.get(step)}
+
+    # Step 1: Company info
+    logger.info("Starting company info fetch")
+    yield {"step": "company_info", "status": "started", "message": "Fetching company info"}
+    company_info, reason = timed_stage(
+        "company_info", get_company_info, ticker,
+        fallback={"error": f"Timed out retrieving data for {ticker}", "name": ticker, "ticker": ticker}
+    )
+
+    if "error" in company_info:
+        logger.error(f"Error in company info: {company_info['error']}")
+        yield {"step": "company_info", "status": "error", "message": company_info["error"], "duration_ms": durations["company_info"]}
+        return None
+
+    logger.info(f"Got company info for {company_info['name']}")
+    yield {"step": "company_info", "status": "success", "message": f"Got data for {company_info['name']}", "duration_ms": durations["company_info"]}
+
+    # Step 2: Get financial data
+    logger.info("Starting financial data fetch")
+    yield {"step": "financial_data", "status": "started", "message": "Fetching financial data"}
+    financial_data, reason = timed_stage(
+        "financial_data", get_financial_data, ticker, period="1mo",
+        fallback={"ticker": ticker, "historical_data": {}}
+    )
+
+    if "error" in financial_data:
+        logger.error(f"Error in financial data: {financial_data['error']}")
+        yield {"step": "financial_data", "status": "error", "message": financial_data["error"], "duration_ms": durations["financial_data"]}
+        return None
+
+    yield stage_done("financial_data", reason, "Got financial data")
+
+    # Step 3: News data
+    logger.info("Starting news analysis")
+    yield {"step": "news", "status": "started", "message": "Analyzing news"}
+    news_data, reason = timed_stage(
+        "news", get_news_and_extract_keywords, company_info['name'], ticker_symbol=ticker, days=2,
+        fallback={"articles": [], "top_keywords": [], "top_entities": []}, cooperative=True
+    )
+    news_log.debug("News data structure: %s", debug_log.lazy_json(news_data, indent=2, default=json_serial))
+    yield stage_done("news", reason, f"Found {len(news_data['articles'])} articles")
+
+    # Step 4: Expand keywords with AI
+    logger.info("Starting keyword expansion")
+    yield {"step": "keywords", "status": "started", "message": "Expanding keywords"}
+    top_keywords = [k[0] for k in news_data['top_keywords'][:10]]
+    expanded_data, reason = timed_stage(
+        "keywords", expand_keywords_and_generate_queries,
+        top_keywords, company_info['name'], company_info.get('industry', 'N/A'),
+        fallback={
+            "expanded_keywords": top_keywords,
+            "search_queries": [f"{company_info['name']} {kw}" for kw in top_keywords[:5]] or [company_info['name']]
+        }
+    )
+    yield stage_done("keywords", reason, "Generated search queries")
+
+    # Step 5: Scraping social media
+    logger.info("Starting social media analysis")
+    yield {"step": "social", "status": "started", "message": "Analyzing social media"}
+    social_data, reason = timed_stage(
+        "social", scrape_social_media, company_info['name'], expanded_data['search_queries'],
+        fallback={
+            "posts": [],
+            "top_posts": [],
+            "total_posts": 0,
+            "avg_sentiment": 0,
+            "sentiment_distribution": {"positive": 0, "neutral": 0, "negative": 0}
+        },
+        cooperative=True
+    )
+    yield stage_done("social", reason, f"Analyzed {social_data['total_posts']} posts")
+
+    # Step 6: Calculate metrics
+    logger.info("Starting metrics calculation")
+    yield {"step": "metrics", "status": "started", "message": "Calculating metrics"}
+    with stage_seconds.time(stage="metrics") as span:
+        score = calculate_metrics if profile is None else profile.wrap("metrics", calculate_metrics)
+        # As of last_run, which is what stored results are rescored against
+        scores = score(financial_data, news_data, social_data, now=now_utc)
+    durations["metrics"] = round(span["seconds"] * 1000, 1)
+    yield stage_done("metrics", None, "Calculated all scores")
+
+    return {
+        "company_info": company_info,
+        "financial_data": financial_data,
+        "news_data": news_data,
+        "expanded_data": expanded_data,
+        "social_data": social_data,
+        "scores": scores,
+        # Lets rescore_cached find results scored by older formulas
+        "scoring_version": SCORING_VERSION,
+        "degraded": degraded,
+        "last_run": now_utc.isoformat()
+    }
 
 def run_pipeline(ticker, force_refresh=False):
 
@@ -1034,7 +1420,7 @@ def run_pipeline(ticker, force_refresh=False):
     now_utc = datetime.now(timezone.utc)
 
     # Step 0: Check last run from `data` table
-    if engine is None:
+    if not ensure_database_ready():
         logger.error("Database engine unavailable; cannot run pipeline.")
         yield send_sse_message({
             "step": "database",
@@ -1086,43 +1472,7 @@ def run_pipeline(ticker, force_refresh=False):
                 logger.info(f"Found cached data: {bool(recent_data)}")
 
                 if recent_data:
-                    recent_data_dict = dict(recent_data)
-                    logger.info("Reconstructing data structure")
-                    reconstructed_data = {}
-                    
-                    for key, value in recent_data_dict.items():
-                        if '.' in key:
-                            parts = key.split('.')
-                            current = reconstructed_data
-                            for part in parts[:-1]:
-                                if part not in current:
-                                    current[part] = {}
-                                current = current[part]
-                            current[parts[-1]] = value
-                        else:
-                            reconstructed_data[key] = value
-                    
-                    if 'financial_data' in reconstructed_data:
-                        if 'historical_data' in reconstructed_data['financial_data']:
-                            try:
-                                historical_data = json.loads(reconstructed_data['financial_data']['historical_data'])
-                                reconstructed_data['financial_data']['historical_data'] = historical_data
-                                logger.info("Successfully parsed historical_data")
-                            except json.JSONDecodeError as e:
-                                logger.error(f"Error parsing historical_data: {e}")
-                    
-                    # Parse news_data.articles if it exists
-                    if 'news_data' in reconstructed_data:
-                        try:
-                            if isinstance(reconstructed_data['news_data'], str):
-                                news_data = json.loads(reconstructed_data['news_data'])
-                                reconstructed_data['news_data'] = news_data
-                                logger.info("Successfully parsed news_data from string")
-                            else:
-                                logger.info("news_data is already a dictionary, no parsing needed")
-                        except json.JSONDecodeError as e:
-                            logger.error(f"Error parsing news_data: {e}")
-                    
+                    reconstructed_data = reconstruct_cached_result(dict(recent_data))
                     reconstructed_data['last_run'] = last_run_time.isoformat()
                     logger.info("Successfully reconstructed cached data")
                     yield send_sse_message({"step": "complete", "status": "success", "data": reconstructed_data})
@@ -1136,91 +1486,37 @@ def run_pipeline(ticker, force_refresh=False):
         else:
             print("Force refresh requested, running pipeline")
 
-    # Step 1: Financial data
-    print("Fetching company info")
-    company_info = get_company_info(ticker)
-    
-    # Check for error in company info
-    if "error" in company_info:
-        return {
-            "company_info": company_info,
-            "error": company_info["error"]
-        }
-
-    print(f"Got data for {company_info['name']}")
-
-    # Step 2: Get financial data
-    print("Fetching financial data")
-    financial_data = get_financial_data(ticker, period="1mo")
-    
-    # Check for error in financial data
-    if "error" in financial_data:
-        return {
-            "company_info": company_info,
-            "financial_data": financial_data,
-            "error": financial_data["error"]
-        }
-        
-    print("Got financial data")
-
-    # Step 3: News data
-    print("Analyzing news")
-    news_data = get_news_and_extract_keywords(company_info['name'], days=2)
-    print(f"Found {len(news_data['articles'])} articles")
-    print(f"DEBUG: News data structure: {json.dumps(news_data, indent=2, default=json_serial)}")
-
-    # Step 4: Expand keywords with AI
-    print("Expanding keywords")
-    top_keywords = [k[0] for k in news_data['top_keywords'][:10]]
-    expanded_data = expand_keywords_and_generate_queries(company_info['name'], top_keywords, company_info.get('industry', 'N/A'))
-    print("Generated search queries")
-
-    # Step 5: Scraping social media
-    print("Analyzing social media")
-    social_data = scrape_social_media(company_info['name'], expanded_data['search_queries'])
-    print(f"Analyzed {social_data['total_posts']} posts")
-
-    # Step 6: Calculate metrics
-    print("Calculating metrics")
-    scores = calculate_metrics(financial_data, news_data, social_data)
+    # Steps 1-6 share the budgeted stage runner with /analyze
+    print("Running pipeline stages")
+    stages = run_analysis_stages(ticker, now_utc)
+    res = yield from as_sse(stages)
+    if res is None:
+        return
     print("Calculated all scores")
 
-    # Prepare the response structure
-    res = {
-        "company_info": company_info,
-        "financial_data": financial_data,
-        "news_data": news_data,
-        "expanded_data": expanded_data,
-        "social_data": social_data,
-        "scores": scores,
-        "last_run": now_utc.isoformat()
-    }
-
-    try:
-        flattened = flatten_nested_dict(res)
-        df_flat = pd.DataFrame([flattened])
-
-        with engine.begin() as conn:
-            # Delete old data for this ticker
-            if table_exists(conn, "data"):
-                conn.execute(text("DELETE FROM data WHERE `company_info.ticker` = :ticker"), {"ticker": ticker})
-            # Insert new data
-            df_flat.to_sql("data", con=conn, if_exists="append", index=False, dtype=longtext_dtype_map(df_flat))
-            # Return the original res object instead of querying the database again
-            return res
-    except Exception as e:
-        print(f"DEBUG: Error in data processing: {e}")
-        print(f"DEBUG: Error type: {type(e)}")
-        print(f"DEBUG: Error details: {str(e)}")
-        raise
+    persist_analysis(ticker, res)
+    # Return the original res object instead of querying the database again
+    return res
 
 def get_current_price(ticker_symbol):
     """
     Get current stock price using Finnhub
     """
     try:
+        # A quote fetched moments ago (by Finnhub or Yahoo bars) is as good as a new one
+        stored = market_data.latest_quote(ticker_symbol, Config.QUOTE_MAX_AGE)
+        if stored:
+            return stored
+
+        # ...including one fetched by another worker
+        shared = shared_cache.get_json(f"quote:{ticker_symbol}")
+        if shared:
+            market_data.update_quote(ticker_symbol, shared, source="shared_cache")
+            return shared
+
         # Get quote data from Finnhub
-        quote = finnhub_client.quote(ticker_symbol)
+        with upstream_call("finnhub"):
+            quote = clients.finnhub().quote(ticker_symbol)
         
         if not quote or 'c' not in quote:
             return {
@@ -1228,7 +1524,7 @@ def get_current_price(ticker_symbol):
                 "ticker": ticker_symbol
             }
             
-        return {
+        price = {
             "ticker": ticker_symbol,
             "current_price": float(quote['c']),
             "change": float(quote['dp']),  # Daily percentage change
@@ -1237,6 +1533,9 @@ def get_current_price(ticker_symbol):
             "open": float(quote['o']),     # Opening price
             "previous_close": float(quote['pc'])  # Previous closing price
         }
+        market_data.update_quote(ticker_symbol, price, source="finnhub")
+        shared_cache.set_json(f"quote:{ticker_symbol}", price, ttl=Config.QUOTE_MAX_AGE)
+        return price
     except Exception as e:
         print(f"Error retrieving current price: {e}")
         return {
@@ -1244,16 +1543,34 @@ def get_current_price(ticker_symbol):
             "ticker": ticker_symbol
         }
 
+def poll_current_price(ticker_symbol):
+    """Background quote fetch for the price stream; yields to interactive calls"""
+    with request_priority(BATCH):
+        return get_current_price(ticker_symbol)
+
+# Shared pollers for /api/price/<ticker>/stream
+price_stream_hub = PriceStreamHub(poll_current_price, interval=Config.PRICE_STREAM_INTERVAL)
+
+class AppJSONProvider(DefaultJSONProvider):
+    """jsonify() that also unpacks lazily decompressed payloads"""
+
+    @staticmethod
+    def default(obj):
+        if isinstance(obj, LazyPayload):
+            return obj.value()
+        return DefaultJSONProvider.default(obj)
+
 app = Flask(__name__)
+app.json = AppJSONProvider(app)
 
 # Configure CORS
 CORS(app, 
      resources={r"/*": {
          "origins": ["https://tradevision-nyu.vercel.app", "http://localhost:3000", "https://tradevision-production.up.railway.app"],
          "methods": ["GET", "POST", "OPTIONS"],
-         "allow_headers": ["Content-Type", "Authorization", "Accept"],
+         "allow_headers": ["Content-Type", "Authorization", "Accept", "Last-Event-ID", "If-None-Match", "X-Admin-Token", "X-Profile"],
          "supports_credentials": True,
-         "expose_headers": ["Content-Type", "Authorization"],
+         "expose_headers": ["Content-Type", "Authorization", "Retry-After", "ETag", "X-Profile-Id"],
          "max_age": 3600,
          "send_wildcard": False,
          "vary_header": True,
@@ -1265,7 +1582,7 @@ CORS(app,
 @app.after_request
 def after_request(response):
     response.headers.add('Access-Control-Allow-Credentials', 'true')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,Accept')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,Accept,Last-Event-ID')
     response.headers.add('Access-Control-Allow-Methods', 'GET,POST,OPTIONS')
     # Update to allow both localhost and Railway
     origin = request.headers.get('Origin')
@@ -1279,6 +1596,7 @@ def health_check():
     try:
         # Check database connection
         db_status = "healthy" if engine is not None else "unhealthy"
+        db_backend = engine.dialect.name if engine is not None else None
         
         # Check environment variables
         env_vars = {
@@ -1293,7 +1611,18 @@ def health_check():
         return jsonify({
             "status": "healthy",
             "database": db_status,
-            "environment_variables": env_vars
+            "database_backend": db_backend,
+            "environment_variables": env_vars,
+            "rate_limits": rate_limiter.remaining(),
+            "rate_limit_mode": rate_limiter.mode,
+            "connection_pools": clients.pool_stats(),
+            "market_data": market_data.stats(),
+            "price_streams": price_stream_hub.stats(),
+            "run_queue": run_queue.stats(),
+            "stage_pool": stage_pool_stats(),
+            "write_behind": write_behind.stats(),
+            "shared_cache": shared_cache.stats(),
+            "article_cache": article_contents.stats()
         })
     except Exception as e:
         logger.error(f"Health check failed: {e}")
@@ -1302,6 +1631,12 @@ def health_check():
             "error": str(e)
         }), 500
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint: stage/upstream latency, cache hit ratios, errors, pipelines in flight"""
+    refresh_hit_ratios()
+    return Response(metrics.render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.route('/test', methods=['GET'])
 def test():
     return jsonify({"status": "ok", "message": "Backend is working"})
@@ -1309,21 +1644,313 @@ def test():
 @app.route('/test/yf/<ticker>', methods=['GET'])
 def test_yf(ticker):
     """Test endpoint for Yahoo Finance data"""
+    profile = requested_profile(f"GET /test/yf/{ticker}")
+    headers = {"X-Profile-Id": profile.id} if profile else {}
     try:
-        data = get_financial_data(ticker, period="1mo")
+        with profiled(profile):
+            fetch = get_financial_data if profile is None else profile.wrap("financial_data", get_financial_data)
+            data = fetch(ticker, period="1mo")
         return jsonify({
             "status": "success",
             "data": data
-        })
+        }), 200, headers
     except Exception as e:
         return jsonify({
             "status": "error",
             "error": str(e)
-        }), 500
+        }), 500, headers
+
+def is_admin_request():
+    """True if the request carries the configured X-Admin-Token (never, when ADMIN_TOKEN is unset)"""
+    token = request.headers.get("X-Admin-Token")
+    return bool(Config.ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, Config.ADMIN_TOKEN)
+
+def requested_profile(label):
+    """A ProfileSession if this admin request opted in with ?profile=1 or X-Profile: 1, else None"""
+    if request.args.get("profile") != "1" and request.headers.get("X-Profile") != "1":
+        return None
+    if not is_admin_request():
+        logger.warning(f"Ignoring profile request for {label} without a valid admin token")
+        return None
+    return ProfileSession(label, interval=Config.PROFILE_SAMPLE_INTERVAL)
 
-def send_sse_message(message, event_type="message"):
+@contextlib.contextmanager
+def profiled(profile):
+    """Sample the calling thread under `profile` (if any) and store the profile when the block ends"""
+    if profile is None:
+        yield
+        return
+    profile.start()
+    profile.attach_request()
+    try:
+        yield
+    finally:
+        profile.finish()
+        profile_store.add(profile)
+
+@app.route('/admin/rescore', methods=['POST'])
+def admin_rescore():
+    """Bring every cached ticker's scores up to SCORING_VERSION; ?force=1 rescores all of them"""
+    if not is_admin_request():
+        return jsonify({"status": "error", "error": "Forbidden"}), 403
+    try:
+        summary = rescore_cached(force=request.args.get("force") == "1")
+    except Exception as e:
+        logger.error(f"Rescore failed: {e}")
+        return jsonify({"status": "error", "error": str(e)}), 500
+    return jsonify({"status": "success", **summary})
+
+@app.route('/admin/profiles', methods=['GET'])
+def list_profiles():
+    if not is_admin_request():
+        return jsonify({"status": "error", "error": "Forbidden"}), 403
+    return jsonify({"profiles": profile_store.recent()})
+
+@app.route('/admin/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """One stored profile; ?format=collapsed returns the stacks as text for flamegraph.pl / speedscope"""
+    if not is_admin_request():
+        return jsonify({"status": "error", "error": "Forbidden"}), 403
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        return jsonify({"status": "error", "error": f"Unknown profile {profile_id}"}), 404
+    if request.args.get("format") == "collapsed":
+        return Response(profile["collapsed"], content_type="text/plain; charset=utf-8")
+    return jsonify(profile)
+
+def send_sse_message(message, event_type="message", event_id=None):
     """Helper function to format SSE messages"""
-    return f"event: {event_type}\ndata: {json.dumps(message, default=json_serial)}\n\n"
+    id_line = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{id_line}event: {event_type}\ndata: {json.dumps(message, default=json_serial)}\n\n"
+
+def analysis_events(ticker, force_refresh=False, profile=None):
+    """
+    Cache check plus full pipeline for one ticker, as a stream of progress events.
+
+    Shared by the /analyze SSE endpoint and background jobs; the final event
+    is {"step": "complete", ...} carrying the result on success.
+    """
+    if not ensure_database_ready():
+        logger.error("Database engine unavailable; skipping cache and pipeline.")
+        yield {
+            "step": "database",
+            "status": "error",
+            "message": "Database not configured. Set DATABASE_URL and retry."
+        }
+        return
+
+    # Check cache first
+    now_utc = datetime.now(timezone.utc)
+    logger.info(f"Current UTC time: {now_utc.isoformat()}")
+
+    # A result not yet written to `data` is still a cache hit
+    pending = None if force_refresh else pending_result(ticker, now_utc)
+    if pending is not None:
+        logger.info(f"Using result for {ticker} still pending in the write-behind queue")
+        analysis_requests_total.inc(source="pending")
+        yield {"step": "cache", "status": "success", "message": "Using cached data (age: 0.00 hours)"}
+        yield {"step": "complete", "status": "success", "data": pending}
+        return
+
+    # Then the shared cache, which any worker may have filled
+    shared = None if force_refresh else shared_cache.get_json(analysis_key(ticker))
+    shared_run_time = parse_timestamp(shared.get("last_run")) if shared else None
+    if shared_run_time is not None:
+        cache_age_hours = (now_utc - shared_run_time).total_seconds() / 3600
+        logger.info(f"Using shared-cache result for {ticker} (age: {cache_age_hours:.2f} hours)")
+        analysis_requests_total.inc(source="shared_cache")
+        yield {"step": "cache", "status": "success", "message": f"Using cached data (age: {cache_age_hours:.2f} hours)"}
+        yield {"step": "complete", "status": "success", "data": shared}
+        return
+
+    with engine.connect() as conn:
+        result = None
+        if table_exists(conn, "data"):
+            # Debug: Print the SQL query
+            query = text("SELECT last_run FROM data WHERE `company_info.ticker` = :ticker ORDER BY last_run DESC LIMIT 1")
+            logger.info(f"Executing cache check query for ticker: {ticker}")
+
+            result = conn.execute(query, {"ticker": ticker}).fetchone()
+            logger.info(f"Cache check result: {result}")
+        else:
+            logger.info("Cache table missing; running pipeline without cache.")
+            yield {
+                "step": "cache",
+                "status": "info",
+                "message": "Cache table missing, running pipeline."
+            }
+
+        # If force refresh is requested, skip cache check and run pipeline
+        if force_refresh:
+            logger.info("Force refresh requested, running pipeline")
+            yield {"step": "cache", "status": "info", "message": "Force refresh requested, running pipeline"}
+        elif result and result[0]:
+            logger.info(f"Found cache entry with last_run: {result[0]}")
+            last_run_time = parse_timestamp(result[0])
+
+            if last_run_time is None:
+                logger.error(f"Invalid timestamp format in database: {result[0]}")
+                yield {"step": "cache", "status": "error", "message": "Invalid timestamp format in database"}
+                return
+
+            if last_run_time.tzinfo is None:
+                logger.info("Adding UTC timezone to last_run_time")
+                last_run_time = last_run_time.replace(tzinfo=timezone.utc)
+
+            # Check if cache is still valid (less than 1 hour old)
+            cache_age = now_utc - last_run_time
+            cache_age_hours = cache_age.total_seconds() / 3600
+            logger.info(f"Current time (UTC): {now_utc.isoformat()}")
+            logger.info(f"Last run time (UTC): {last_run_time.isoformat()}")
+            logger.info(f"Cache age: {cache_age_hours:.2f} hours")
+
+            if cache_age < timedelta(hours=1):
+                logger.info(f"Using cached data (age: {cache_age_hours:.2f} hours)")
+                yield {"step": "cache", "status": "success", "message": f"Using cached data (age: {cache_age_hours:.2f} hours)"}
+
+                # Debug: Print the data query
+                data_query = text("SELECT * FROM data WHERE `company_info.ticker` = :ticker ORDER BY last_run DESC LIMIT 1")
+                logger.info(f"Executing data fetch query for ticker: {ticker}")
+
+                recent_data = conn.execute(data_query, {"ticker": ticker}).mappings().fetchone()
+                logger.info(f"Found cached data: {bool(recent_data)}")
+
+                if recent_data:
+                    reconstructed_data = reconstruct_cached_result(dict(recent_data))
+                    reconstructed_data['last_run'] = last_run_time.isoformat()
+                    cached_financials = reconstructed_data.get('financial_data', {})
+                    cached_bars = resolve(cached_financials.get('historical_data'))
+                    if isinstance(cached_bars, dict):
+                        # Only takes effect if the store has nothing newer
+                        market_data.update_bars(
+                            ticker, cached_bars, source="cache",
+                            fetched_at=last_run_time.timestamp(),
+                            # Long summaries come back compressed; the store feeds fresh results, so keep it plain
+                            description=resolve(cached_financials.get('description'))
+                        )
+                    logger.info("Successfully reconstructed cached data")
+                    cache_analysis(ticker, reconstructed_data, ttl=timedelta(hours=1) - cache_age)
+                    analysis_requests_total.inc(source="database")
+                    yield {"step": "complete", "status": "success", "data": reconstructed_data}
+                    return
+                else:
+                    logger.info("No cached data found in database")
+                    yield {"step": "cache", "status": "error", "message": "No cached data found"}
+            else:
+                logger.info(f"Cache expired (age: {cache_age_hours:.2f} hours), running pipeline")
+                yield {"step": "cache", "status": "info", "message": f"Cache expired (age: {cache_age_hours:.2f} hours), running pipeline"}
+        else:
+            logger.info("No cache found, running pipeline")
+            yield {"step": "cache", "status": "info", "message": "No cache found, running pipeline"}
+
+    # Only run pipeline if cache is expired or no cache exists
+    if force_refresh or not result or not result[0] or cache_age >= timedelta(hours=1):
+        # Cache hits returned above; only full pipeline runs take a slot
+        ticket = run_queue.enqueue()
+        if ticket is None:
+            retry_after = run_queue.retry_after()
+            logger.warning(f"Run queue full; shedding analysis for {ticker}")
+            analysis_requests_total.inc(source="shed")
+            yield {"step": "queued", "status": "error", "message": f"Server busy, retry in {retry_after}s", "retry_after": retry_after}
+            return
+
+        try:
+            while not ticket.admitted:
+                position = ticket.position()
+                yield {"step": "queued", "status": "info", "position": position, "message": f"Waiting for a pipeline slot (position {position})"}
+                ticket.wait(timeout=Config.QUEUE_UPDATE_INTERVAL)
+
+            started = time.perf_counter()
+            res = yield from run_analysis_stages(ticker, now_utc, profile=profile)
+            if res is None:
+                analysis_requests_total.inc(source="pipeline_error")
+                return
+            analysis_requests_total.inc(source="pipeline")
+
+            # Persisted in the background; a slow or failing write doesn't hold up the result
+            persist_analysis(ticker, res)
+            cache_analysis(ticker, res)
+            duration_ms = round((time.perf_counter() - started) * 1000, 1)
+            yield {"step": "complete", "status": "success", "data": res, "duration_ms": duration_ms}
+        finally:
+            ticket.release()
+
+def has_fresh_cache(ticker):
+    """True if `data` holds a result for ticker inside the 1-hour cache window"""
+    if engine is None:
+        return False
+    if pending_result(ticker, datetime.now(timezone.utc)) is not None:
+        return True
+    if shared_cache.get(analysis_key(ticker)) is not None:
+        return True
+    try:
+        with engine.connect() as conn:
+            if not table_exists(conn, "data"):
+                return False
+            row = conn.execute(
+                text("SELECT last_run FROM data WHERE `company_info.ticker` = :ticker ORDER BY last_run DESC LIMIT 1"),
+                {"ticker": ticker}
+            ).fetchone()
+    except Exception as e:
+        logger.error(f"Error checking cache for {ticker}: {e}")
+        return False
+    last_run_time = parse_timestamp(row[0]) if row else None
+    return last_run_time is not None and datetime.now(timezone.utc) - last_run_time < timedelta(hours=1)
+
+def find_cached_result(ticker):
+    """
+    Locate the newest stored result for ticker, whatever its age.
+
+    Returns (last_run_time, load, scores) where load() fetches the full
+    result, or (None, None, None). Only last_run and the scores are read
+    from `data` up front, so callers can answer conditional requests without
+    loading the row; the scores change without last_run on a rescore.
+    """
+    res = write_behind.pending(ticker) or shared_cache.get_json(analysis_key(ticker))
+    last_run_time = parse_timestamp(res.get("last_run")) if res else None
+    if last_run_time is not None:
+        return last_run_time, lambda: res, res.get("scores")
+
+    if not ensure_database_ready():
+        return None, None, None
+    score_columns = ", ".join(f"`scores.{name}`" for name in SCORE_NAMES)
+    with engine.connect() as conn:
+        if not table_exists(conn, "data"):
+            return None, None, None
+        row = conn.execute(
+            text(f"SELECT last_run, {score_columns} FROM data WHERE `company_info.ticker` = :ticker ORDER BY last_run DESC LIMIT 1"),
+            {"ticker": ticker}
+        ).fetchone()
+    last_run_time = parse_timestamp(row[0]) if row else None
+    if last_run_time is None:
+        return None, None, None
+    scores = dict(zip(SCORE_NAMES, row[1:]))
+
+    def load():
+        with engine.connect() as conn:
+            recent_data = conn.execute(
+                text("SELECT * FROM data WHERE `company_info.ticker` = :ticker ORDER BY last_run DESC LIMIT 1"),
+                {"ticker": ticker}
+            ).mappings().fetchone()
+        if not recent_data:
+            return None
+        reconstructed_data = reconstruct_cached_result(dict(recent_data))
+        reconstructed_data['last_run'] = last_run_time.isoformat()
+        return reconstructed_data
+
+    return last_run_time, load, scores
+
+def server_busy_response():
+    """503 with Retry-After for when the run queue is full"""
+    retry_after = run_queue.retry_after()
+    response = jsonify({
+        "error": "Too many analyses in progress, please retry later",
+        "status": "error",
+        "retry_after": retry_after
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(retry_after)
+    return response
 
 @app.route('/analyze', methods=['POST'])
 def analyze():
@@ -1346,210 +1973,24 @@ def analyze():
             }), 400
 
         force_refresh = data.get('force_refresh', False)
+        # Optional dotted paths to keep in the result, e.g. ["scores", "company_info"]; default is everything
+        fields = parse_fields(data.get('fields', request.args.get('fields')))
+
+        # Shed load up front when every slot and queue place is taken; cache hits still go through
+        if run_queue.is_full() and (force_refresh or not has_fresh_cache(ticker)):
+            logger.warning(f"Run queue full; rejecting analysis for {ticker}")
+            return server_busy_response()
+
         logger.info(f"Starting analysis for {ticker} (force_refresh={force_refresh})")
+        profile = requested_profile(f"POST /analyze {ticker}")
 
         def generate():
             try:
-                if engine is None:
-                    logger.error("Database engine unavailable; skipping cache and pipeline.")
-                    yield send_sse_message({
-                        "step": "database",
-                        "status": "error",
-                        "message": "Database not configured. Set DATABASE_URL and retry."
-                    })
-                    return
-
-                # Check cache first
-                now_utc = datetime.now(timezone.utc)
-                logger.info(f"Current UTC time: {now_utc.isoformat()}")
-                
-                with engine.connect() as conn:
-                    result = None
-                    if table_exists(conn, "data"):
-                        # Debug: Print the SQL query
-                        query = text("SELECT last_run FROM data WHERE `company_info.ticker` = :ticker ORDER BY last_run DESC LIMIT 1")
-                        logger.info(f"Executing cache check query for ticker: {ticker}")
-                        
-                        result = conn.execute(query, {"ticker": ticker}).fetchone()
-                        logger.info(f"Cache check result: {result}")
-                    else:
-                        logger.info("Cache table missing; running pipeline without cache.")
-                        yield send_sse_message({
-                            "step": "cache",
-                            "status": "info",
-                            "message": "Cache table missing, running pipeline."
-                        })
-
-                    # If force refresh is requested, skip cache check and run pipeline
-                    if force_refresh:
-                        logger.info("Force refresh requested, running pipeline")
-                        yield send_sse_message({"step": "cache", "status": "info", "message": "Force refresh requested, running pipeline"})
-                    elif result and result[0]:
-                        logger.info(f"Found cache entry with last_run: {result[0]}")
-                        last_run_time = parse_timestamp(result[0])
-                        
-                        if last_run_time is None:
-                            logger.error(f"Invalid timestamp format in database: {result[0]}")
-                            yield send_sse_message({"step": "cache", "status": "error", "message": "Invalid timestamp format in database"})
-                            return
-                            
-                        if last_run_time.tzinfo is None:
-                            logger.info("Adding UTC timezone to last_run_time")
-                            last_run_time = last_run_time.replace(tzinfo=timezone.utc)
-                        
-                        # Check if cache is still valid (less than 1 hour old)
-                        cache_age = now_utc - last_run_time
-                        cache_age_hours = cache_age.total_seconds() / 3600
-                        logger.info(f"Current time (UTC): {now_utc.isoformat()}")
-                        logger.info(f"Last run time (UTC): {last_run_time.isoformat()}")
-                        logger.info(f"Cache age: {cache_age_hours:.2f} hours")
-                        
-                        if cache_age < timedelta(hours=1):
-                            logger.info(f"Using cached data (age: {cache_age_hours:.2f} hours)")
-                            yield send_sse_message({"step": "cache", "status": "success", "message": f"Using cached data (age: {cache_age_hours:.2f} hours)"})
-                            
-                            # Debug: Print the data query
-                            data_query = text("SELECT * FROM data WHERE `company_info.ticker` = :ticker ORDER BY last_run DESC LIMIT 1")
-                            logger.info(f"Executing data fetch query for ticker: {ticker}")
-                            
-                            recent_data = conn.execute(data_query, {"ticker": ticker}).mappings().fetchone()
-                            logger.info(f"Found cached data: {bool(recent_data)}")
-
-                            if recent_data:
-                                recent_data_dict = dict(recent_data)
-                                logger.info("Reconstructing data structure")
-                                reconstructed_data = {}
-                                
-                                for key, value in recent_data_dict.items():
-                                    if '.' in key:
-                                        parts = key.split('.')
-                                        current = reconstructed_data
-                                        for part in parts[:-1]:
-                                            if part not in current:
-                                                current[part] = {}
-                                            current = current[part]
-                                        current[parts[-1]] = value
-                                    else:
-                                        reconstructed_data[key] = value
-                                
-                                if 'financial_data' in reconstructed_data:
-                                    if 'historical_data' in reconstructed_data['financial_data']:
-                                        try:
-                                            historical_data = json.loads(reconstructed_data['financial_data']['historical_data'])
-                                            reconstructed_data['financial_data']['historical_data'] = historical_data
-                                            logger.info("Successfully parsed historical_data")
-                                        except json.JSONDecodeError as e:
-                                            logger.error(f"Error parsing historical_data: {e}")
-                                
-                                # Parse news_data.articles if it exists
-                                if 'news_data' in reconstructed_data:
-                                    try:
-                                        if isinstance(reconstructed_data['news_data'], str):
-                                            news_data = json.loads(reconstructed_data['news_data'])
-                                            reconstructed_data['news_data'] = news_data
-                                            logger.info("Successfully parsed news_data from string")
-                                        else:
-                                            logger.info("news_data is already a dictionary, no parsing needed")
-                                    except json.JSONDecodeError as e:
-                                        logger.error(f"Error parsing news_data: {e}")
-                                
-                                reconstructed_data['last_run'] = last_run_time.isoformat()
-                                logger.info("Successfully reconstructed cached data")
-                                yield send_sse_message({"step": "complete", "status": "success", "data": reconstructed_data})
-                                return
-                            else:
-                                logger.info("No cached data found in database")
-                                yield send_sse_message({"step": "cache", "status": "error", "message": "No cached data found"})
-                        else:
-                            logger.info(f"Cache expired (age: {cache_age_hours:.2f} hours), running pipeline")
-                            yield send_sse_message({"step": "cache", "status": "info", "message": f"Cache expired (age: {cache_age_hours:.2f} hours), running pipeline"})
-                    else:
-                        logger.info("No cache found, running pipeline")
-                        yield send_sse_message({"step": "cache", "status": "info", "message": "No cache found, running pipeline"})
-
-                # Only run pipeline if cache is expired or no cache exists
-                if force_refresh or not result or not result[0] or cache_age >= timedelta(hours=1):
-                    # Step 1: Financial data
-                    logger.info("Starting company info fetch")
-                    yield send_sse_message({"step": "company_info", "status": "started", "message": "Fetching company info"})
-                    company_info = get_company_info(ticker)
-                    
-                    if "error" in company_info:
-                        logger.error(f"Error in company info: {company_info['error']}")
-                        yield send_sse_message({"step": "company_info", "status": "error", "message": company_info["error"]})
-                        return
-
-                    logger.info(f"Got company info for {company_info['name']}")
-                    yield send_sse_message({"step": "company_info", "status": "success", "message": f"Got data for {company_info['name']}"})
-
-                    # Step 2: Get financial data
-                    logger.info("Starting financial data fetch")
-                    yield send_sse_message({"step": "financial_data", "status": "started", "message": "Fetching financial data"})
-                    financial_data = get_financial_data(ticker, period="1mo")
-                    
-                    if "error" in financial_data:
-                        logger.error(f"Error in financial data: {financial_data['error']}")
-                        yield send_sse_message({"step": "financial_data", "status": "error", "message": financial_data["error"]})
-                        return
-                        
-                    logger.info("Got financial data")
-                    yield send_sse_message({"step": "financial_data", "status": "success", "message": "Got financial data"})
-
-                    # Step 3: News data
-                    logger.info("Starting news analysis")
-                    yield send_sse_message({"step": "news", "status": "started", "message": "Analyzing news"})
-                    news_data = get_news_and_extract_keywords(company_info['name'], days=2)
-                    logger.info(f"Found {len(news_data['articles'])} articles")
-                    yield send_sse_message({"step": "news", "status": "success", "message": f"Found {len(news_data['articles'])} articles"})
-
-                    # Step 4: Expand keywords with AI
-                    logger.info("Starting keyword expansion")
-                    yield send_sse_message({"step": "keywords", "status": "started", "message": "Expanding keywords"})
-                    top_keywords = [k[0] for k in news_data['top_keywords'][:10]]
-                    expanded_data = expand_keywords_and_generate_queries(company_info['name'], top_keywords, company_info.get('industry', 'N/A'))
-                    logger.info("Generated search queries")
-                    yield send_sse_message({"step": "keywords", "status": "success", "message": "Generated search queries"})
-
-                    # Step 5: Scraping social media
-                    logger.info("Starting social media analysis")
-                    yield send_sse_message({"step": "social", "status": "started", "message": "Analyzing social media"})
-                    social_data = scrape_social_media(company_info['name'], expanded_data['search_queries'])
-                    logger.info(f"Analyzed {social_data['total_posts']} posts")
-                    yield send_sse_message({"step": "social", "status": "success", "message": f"Analyzed {social_data['total_posts']} posts"})
-
-                    # Step 6: Calculate metrics
-                    logger.info("Starting metrics calculation")
-                    yield send_sse_message({"step": "metrics", "status": "started", "message": "Calculating metrics"})
-                    scores = calculate_metrics(financial_data, news_data, social_data)
-                    logger.info("Calculated all scores")
-                    yield send_sse_message({"step": "metrics", "status": "success", "message": "Calculated all scores"})
-
-                    # Prepare the response structure
-                    res = {
-                        "company_info": company_info,
-                        "financial_data": financial_data,
-                        "news_data": news_data,
-                        "expanded_data": expanded_data,
-                        "social_data": social_data,
-                        "scores": scores,
-                        "last_run": now_utc.isoformat()
-                    }
-
-                    try:
-                        flattened = flatten_nested_dict(res)
-                        df_flat = pd.DataFrame([flattened])
-
-                        with engine.begin() as conn:
-                            if table_exists(conn, "data"):
-                                conn.execute(text("DELETE FROM data WHERE `company_info.ticker` = :ticker"), {"ticker": ticker})
-                            df_flat.to_sql("data", con=conn, if_exists="append", index=False, dtype=longtext_dtype_map(df_flat))
-                            yield send_sse_message({"step": "complete", "status": "success", "data": res})
-                    except Exception as e:
-                        error_msg = f"Error in data processing: {str(e)}"
-                        logger.error(error_msg)
-                        yield send_sse_message({"step": "complete", "status": "error", "message": error_msg})
-                        raise
-
+                with profiled(profile):
+                    for event in analysis_events(ticker, force_refresh, profile=profile):
+                        if fields and event.get("step") == "complete" and "data" in event:
+                            event = {**event, "data": select_fields(event["data"], fields)}
+                        yield send_sse_message(event, event_type="queued" if event.get("step") == "queued" else "message")
             except Exception as e:
                 error_msg = f"Error in pipeline: {str(e)}"
                 logger.error(error_msg)
@@ -1562,7 +2003,8 @@ def analyze():
             headers={
                 'Cache-Control': 'no-cache',
                 'Connection': 'keep-alive',
-                'X-Accel-Buffering': 'no'
+                'X-Accel-Buffering': 'no',
+                **({'X-Profile-Id': profile.id} if profile else {})
             }
         )
 
@@ -1573,6 +2015,363 @@ def analyze():
             "status": "error"
         }), 500
 
+# Analyses submitted via POST /jobs run here, detached from any client connection
+job_manager = JobManager(
+    analysis_events,
+    max_workers=Config.JOB_WORKERS,
+    buffer_size=Config.JOB_EVENT_BUFFER,
+    retention_seconds=Config.JOB_RETENTION
+)
+
+def lookup_cached_analysis(ticker):
+    """(last_run_time, load, scores, None) for a stored analysis, or (None, None, None, error response)"""
+    try:
+        last_run_time, load, scores = find_cached_result(ticker)
+    except Exception as e:
+        logger.error(f"Error loading cached analysis for {ticker}: {e}")
+        return None, None, None, (jsonify({"error": str(e), "status": "error"}), 500)
+    if last_run_time is None:
+        return None, None, None, (jsonify({
+            "error": f"No analysis stored for {ticker}; POST /analyze to run one",
+            "status": "error"
+        }), 404)
+    return last_run_time, load, scores, None
+
+@app.route('/api/analysis/<ticker>', methods=['GET'])
+def get_cached_analysis(ticker):
+    """Latest stored analysis for a ticker (never runs the pipeline), with ETag revalidation"""
+    ticker = ticker.upper()
+    last_run_time, load, scores, error = lookup_cached_analysis(ticker)
+    if error:
+        return error
+
+    fields = parse_fields(request.args.get('fields'))
+    cache_age = datetime.now(timezone.utc) - last_run_time
+    # Scores included because a forced rescore changes them without touching last_run
+    # (rounded, so the cache's JSON floats and the database's agree)
+    score_values = [
+        None if scores.get(name) is None else round(float(scores[name]), 6) for name in SCORE_NAMES
+    ] if isinstance(scores, dict) else None
+    etag = make_etag(
+        "analysis", ticker, last_run_time.isoformat(), Config.RESULT_SCHEMA_VERSION, SCORING_VERSION, score_values, fields
+    )
+    return conditional_json(
+        lambda: {
+            "status": "success",
+            "data": select_fields(load(), fields),
+            "last_run": last_run_time.isoformat(),
+            "stale": cache_age >= timedelta(hours=1)
+        },
+        etag,
+        default=json_serial
+    )
+
+@app.route('/api/analysis/<ticker>/<resource>', methods=['GET'])
+def get_analysis_sub_resource(ticker, resource):
+    """One page of a heavy section of the latest stored analysis: posts, articles or bars"""
+    ticker = ticker.upper()
+    if resource not in ("posts", "articles", "bars"):
+        return jsonify({"error": "Not found"}), 404
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers", "status": "error"}), 400
+    # Bars only: inclusive YYYY-MM-DD bounds
+    start, end = request.args.get('from'), request.args.get('to')
+
+    last_run_time, load, _, error = lookup_cached_analysis(ticker)
+    if error:
+        return error
+
+    def build_page():
+        res = load() or {}
+        if resource == "posts":
+            items = [compact_post(post) for post in as_list(section(res, "social_data.posts"))]
+        elif resource == "articles":
+            items = as_list(section(res, "news_data.articles"))
+        else:
+            items = bars_list(section(res, "financial_data.historical_data"), start, end)
+        return {"status": "success", "ticker": ticker, "last_run": last_run_time.isoformat(), **paginate(items, offset, limit)}
+
+    etag = make_etag(resource, ticker, last_run_time.isoformat(), Config.RESULT_SCHEMA_VERSION, offset, limit, start, end)
+    return conditional_json(build_page, etag, default=json_serial)
+
+# The parts of a `data` row the scoring engine reads; text-heavy columns stay in the database
+SCORING_COLUMNS = (
+    "company_info.ticker", "company_info.name", "company_info.sector", "company_info.industry",
+    "financial_data.historical_data", "financial_data.volatility",
+    "news_data.articles", "social_data.posts", "social_data.total_posts", "social_data.avg_sentiment",
+    "scoring_version", "last_run",
+    *(f"scores.{name}" for name in SCORE_NAMES),
+)
+
+def load_scoring_rows():
+    """Every cached ticker's scoring inputs from `data`, nested by section; compressed columns stay lazy"""
+    if not ensure_database_ready():
+        return []
+    with engine.connect() as conn:
+        if not table_exists(conn, "data"):
+            return []
+        available = {column["name"] for column in inspect(conn).get_columns("data")}
+        columns = [column for column in SCORING_COLUMNS if column in available]
+        if "company_info.ticker" not in columns:
+            return []
+        rows = conn.execute(text(f"SELECT {', '.join(f'`{column}`' for column in columns)} FROM data")).mappings().fetchall()
+
+    nested_rows = []
+    for row in rows:
+        nested = {}
+        for key, value in row.items():
+            part, _, field = key.partition(".")
+            value = LazyPayload(value) if is_encoded(value) else value
+            if field:
+                nested.setdefault(part, {})[field] = value
+            else:
+                nested[part] = value
+        nested_rows.append(nested)
+    return nested_rows
+
+def build_leaderboard():
+    """Score every cached ticker in one vectorized pass"""
+    rows = load_scoring_rows()
+    batch = score_batch(ScoringInputs.stack(
+        [(row.get("financial_data"), row.get("news_data"), row.get("social_data")) for row in rows],
+        now=[parse_timestamp(row.get("last_run")) for row in rows],
+    ))
+    entries = []
+    for i, row in enumerate(rows):
+        info = row.get("company_info", {})
+        entries.append({
+            "ticker": info.get("ticker"),
+            "name": info.get("name"),
+            "sector": info.get("sector"),
+            "industry": info.get("industry"),
+            "last_run": row.get("last_run"),
+            "scores": batch.row(i),
+        })
+    logger.info(f"Scored {len(entries)} cached tickers for the leaderboard")
+    return entries
+
+def rescore_cached(batch_size=None, force=False):
+    """
+    Recompute `scores` for every cached ticker from its stored financial, news
+    and social data, with no upstream calls.
+
+    Rows already at SCORING_VERSION are skipped unless `force`. Tickers are
+    scored and updated `batch_size` at a time, one transaction per batch;
+    a row whose last_run changed since it was read (a fresh run landed) is
+    left alone. Scores that change are also appended to score_history,
+    recorded at the time of the rescore with the new scoring_version.
+    Finally the score generation is bumped, which retires every worker's
+    cached results and leaderboard.
+    """
+    batch_size = batch_size or Config.RESCORE_BATCH_SIZE
+    started = time.perf_counter()
+    rows = load_scoring_rows()
+    stale = [row for row in rows if force or row.get("scoring_version") != SCORING_VERSION]
+    if not stale:
+        return {"scanned": len(rows), "rescored": 0, "skipped": 0, "scoring_version": SCORING_VERSION, "seconds": 0.0}
+
+    assignments = ", ".join(f"`scores.{name}` = :{name}" for name in SCORE_NAMES)
+    # Only the row that was read: a result written since then keeps its own, fresher scores
+    update = text(
+        f"UPDATE data SET {assignments}, `scoring_version` = :scoring_version "
+        "WHERE `company_info.ticker` = :ticker AND last_run = :last_run"
+    )
+    with engine.begin() as conn:
+        # Rows written before scoring versions existed lack the column
+        add_missing_columns(conn, "data", pd.DataFrame([{"scoring_version": SCORING_VERSION}]))
+
+    rescored = 0
+    for start in range(0, len(stale), batch_size):
+        chunk = stale[start:start + batch_size]
+        batch = score_batch(ScoringInputs.stack(
+            [(row.get("financial_data"), row.get("news_data"), row.get("social_data")) for row in chunk],
+            now=[parse_timestamp(row.get("last_run")) for row in chunk],
+        ))
+        params = [
+            {"ticker": row["company_info"]["ticker"], "last_run": row.get("last_run"),
+             "scoring_version": SCORING_VERSION, **batch.row(i)}
+            for i, row in enumerate(chunk)
+        ]
+        rescored_at = datetime.now(timezone.utc)
+        with engine.begin() as conn:
+            updated = [(row, param) for row, param in zip(chunk, params) if conn.execute(update, param).rowcount]
+            changed = [
+                (param["ticker"], rescored_at, {name: param[name] for name in SCORE_NAMES}, SCORING_VERSION)
+                for row, param in updated
+                if row.get("scoring_version") != SCORING_VERSION or any(
+                    not isinstance((row.get("scores") or {}).get(name), (int, float))
+                    or abs(row["scores"][name] - param[name]) > 1e-9
+                    for name in SCORE_NAMES
+                )
+            ]
+            score_history.append(conn, changed)
+        rescored += len(updated)
+        logger.info(f"Rescored {start + len(chunk)}/{len(stale)} cached tickers ({len(chunk) - len(updated)} rewritten meanwhile)")
+
+    # Every worker's cached results and leaderboard now carry stale scores
+    bump_score_generation()
+    return {
+        "scanned": len(rows),
+        "rescored": rescored,
+        "skipped": len(stale) - rescored,
+        "scoring_version": SCORING_VERSION,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+def leaderboard_entries():
+    entries = shared_cache.get_json(leaderboard_key())
+    if entries is None:
+        entries = build_leaderboard()
+        shared_cache.set_json(leaderboard_key(), entries, ttl=Config.LEADERBOARD_CACHE_TTL, default=json_serial)
+    return entries
+
+@app.route('/api/leaderboard', methods=['GET'])
+def get_leaderboard():
+    """Cached tickers ranked by a score (hype_index by default), optionally within one sector"""
+    sector = request.args.get('sector')
+    sort_by = request.args.get('sort', 'hype_index')
+    if sort_by not in SCORE_NAMES:
+        return jsonify({"error": f"sort must be one of {', '.join(SCORE_NAMES)}", "status": "error"}), 400
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers", "status": "error"}), 400
+
+    try:
+        entries = leaderboard_entries()
+    except Exception as e:
+        logger.error(f"Error building leaderboard: {e}")
+        return jsonify({"error": "Leaderboard unavailable", "status": "error"}), 500
+
+    if sector:
+        entries = [entry for entry in entries if (entry.get("sector") or "").lower() == sector.lower()]
+    ranked = sorted(entries, key=lambda entry: entry["scores"][sort_by], reverse=True)
+    return jsonify({"status": "success", "sector": sector, "sort": sort_by, **paginate(ranked, offset, limit)})
+
+@app.route('/api/scores/<ticker>/history', methods=['GET'])
+def get_score_history(ticker):
+    """
+    A ticker's scores over time, averaged server-side into hour/day/week
+    buckets (or every run with resolution=raw). `from`/`to` are ISO dates or
+    datetimes, `to` inclusive for a bare date; the default is the last 90 days
+    at a resolution picked to stay under score_history.MAX_POINTS points.
+    Every point carries its scoring_version and buckets never average across
+    versions; ?scoring_version=N keeps only runs scored by version N.
+    """
+    ticker = ticker.upper()
+    now_utc = datetime.now(timezone.utc)
+    raw_from, raw_to = request.args.get('from'), request.args.get('to')
+    end = parse_timestamp(raw_to) if raw_to else now_utc
+    start = parse_timestamp(raw_from) if raw_from else (end or now_utc) - timedelta(days=90)
+    if start is None or end is None:
+        return jsonify({"error": "from and to must be ISO dates or datetimes", "status": "error"}), 400
+    if raw_to and len(raw_to) == 10:
+        end += timedelta(days=1)
+    if start >= end:
+        return jsonify({"error": "from must be before to", "status": "error"}), 400
+
+    resolution = request.args.get('resolution', 'auto')
+    if resolution == 'auto':
+        resolution = score_history.pick_resolution(start, end)
+    elif resolution not in score_history.RESOLUTIONS:
+        return jsonify({"error": f"resolution must be auto or one of {', '.join(score_history.RESOLUTIONS)}", "status": "error"}), 400
+
+    scoring_version = request.args.get('scoring_version')
+    if scoring_version is not None:
+        try:
+            scoring_version = int(scoring_version)
+        except ValueError:
+            return jsonify({"error": "scoring_version must be an integer", "status": "error"}), 400
+
+    if not ensure_database_ready():
+        return jsonify({"error": "Database not configured", "status": "error"}), 503
+    try:
+        with engine.connect() as conn:
+            rows = score_history.fetch(conn, ticker, start, end, scoring_version)
+    except Exception as e:
+        logger.error(f"Error reading score history for {ticker}: {e}")
+        return jsonify({"error": "Score history is unavailable", "status": "error"}), 500
+
+    return jsonify({
+        "status": "success",
+        "ticker": ticker,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "resolution": resolution,
+        "scoring_version": scoring_version,
+        "points": score_history.downsample(rows, resolution),
+    })
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Submit an analysis job; progress is read from /jobs/<id>/events"""
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "No JSON data received", "status": "error"}), 400
+
+    ticker = data.get('symbol', '').upper()
+    if not ticker:
+        return jsonify({"error": "No symbol provided", "status": "error"}), 400
+
+    force_refresh = data.get('force_refresh', False)
+    if run_queue.is_full() and (force_refresh or not has_fresh_cache(ticker)):
+        return server_busy_response()
+
+    job, created = job_manager.submit(ticker, force_refresh=force_refresh)
+    logger.info(f"{'Submitted' if created else 'Joined existing'} job {job.id} for {ticker}")
+    body = job.summary()
+    body["events_url"] = f"/jobs/{job.id}/events"
+    return jsonify(body), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job status, plus the result once it has completed"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found", "status": "error"}), 404
+    body = job.summary()
+    if job.result is not None:
+        body["data"] = select_fields(job.result, parse_fields(request.args.get('fields')))
+    return jsonify(body)
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Stream a job's progress events, resuming after Last-Event-ID if given"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found", "status": "error"}), 404
+
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0)
+    except ValueError:
+        last_event_id = 0
+
+    def generate():
+        cursor = last_event_id
+        while True:
+            events = job.events_after(cursor, timeout=Config.SSE_HEARTBEAT)
+            for event_id, event in events:
+                yield send_sse_message(event, event_id=event_id)
+                cursor = event_id
+            if not events:
+                if job.finished:
+                    return
+                yield ": keep-alive\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        content_type='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'Connection': 'keep-alive',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
 @app.route('/api/price/<ticker>', methods=['GET'])
 def get_price(ticker):
     """Get current stock price endpoint"""
@@ -1588,29 +2387,59 @@ def get_price(ticker):
             "error": str(e)
         }), 500
 
+@app.route('/api/price/<ticker>/stream', methods=['GET'])
+def stream_price(ticker):
+    """Stream live price updates over SSE, sending only the fields that changed"""
+    subscription = price_stream_hub.subscribe(ticker.upper())
+
+    def generate():
+        try:
+            while True:
+                changes = subscription.get(timeout=Config.SSE_HEARTBEAT)
+                if changes is None:
+                    # SSE comment keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                yield send_sse_message(changes, event_type="price")
+        finally:
+            price_stream_hub.unsubscribe(subscription)
+
+    return Response(
+        stream_with_context(generate()),
+        content_type='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'Connection': 'keep-alive',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
 @app.route('/api/market/trending', methods=['GET'])
 def get_trending_stocks():
     """Get trending stocks from Alpha Vantage with caching"""
     try:
+        ensure_database_ready()
         # Check cache in database
         with engine.connect() as conn:
+            # A range on last_updated (not DATE(last_updated)) so the index is usable
             result = conn.execute(
-                text("SELECT * FROM market_trends WHERE DATE(last_updated) = CURDATE()")
+                text("SELECT * FROM market_trends WHERE last_updated >= :today ORDER BY last_updated DESC LIMIT 1"),
+                {"today": datetime.combine(date.today(), datetime.min.time())}
             ).fetchone()
 
             if result:
                 # Return cached data
-                return jsonify({
-                    "status": "success",
-                    "data": json.loads(result.trending_data)
-                })
+                return trending_response(result.trending_data, result.last_updated)
 
         # If no cache or cache is old, fetch new data
         url = f"https://www.alphavantage.co/query?function=TOP_GAINERS_LOSERS&apikey={alpha_vantage_api_key}"
         logger.info(f"Fetching trending stocks from Alpha Vantage")
-        response = requests.get(url, timeout=10)
+        with upstream_call("alpha_vantage"):
+            response = clients.http("alpha_vantage").get(url, timeout=10)
         data = response.json()
-        logger.info(f"Alpha Vantage response: {data}")
+        upstream_log.debug("Alpha Vantage response: %s", debug_log.lazy_json(data))
+        if is_alpha_vantage_throttled(data):
+            rate_limiter.throttled("alpha_vantage")
 
         if 'top_gainers' not in data:
             logger.error(f"No top_gainers in response: {data}")
@@ -1623,11 +2452,20 @@ def get_trending_stocks():
         for stock in data.get('top_gainers', [])[:10]:
             try:
                 # Get company overview from Alpha Vantage
-                overview_url = f"https://www.alphavantage.co/query?function=OVERVIEW&symbol={stock['ticker']}&apikey={alpha_vantage_api_key}"
-                logger.info(f"Fetching overview for {stock['ticker']}")
-                overview_response = requests.get(overview_url, timeout=10)
-                overview_data = overview_response.json()
-                logger.info(f"Overview response for {stock['ticker']}: {overview_data}")
+                # Company overviews barely change, so they're cached for a day
+                overview_key = f"overview:{stock['ticker']}"
+                overview_data = shared_cache.get_json(overview_key)
+                if overview_data is None:
+                    overview_url = f"https://www.alphavantage.co/query?function=OVERVIEW&symbol={stock['ticker']}&apikey={alpha_vantage_api_key}"
+                    logger.info(f"Fetching overview for {stock['ticker']}")
+                    with upstream_call("alpha_vantage"):
+                        overview_response = clients.http("alpha_vantage").get(overview_url, timeout=10)
+                    overview_data = overview_response.json()
+                    if is_alpha_vantage_throttled(overview_data):
+                        rate_limiter.throttled("alpha_vantage")
+                    elif overview_data:
+                        shared_cache.set_json(overview_key, overview_data, ttl=Config.OVERVIEW_CACHE_TTL)
+                    upstream_log.debug("Overview response for %s: %s", stock['ticker'], debug_log.lazy_json(overview_data))
 
                 # Handle potential missing fields
                 price = stock.get('price', '0')
@@ -1654,23 +2492,24 @@ def get_trending_stocks():
             }), 500
 
         # Cache the data in database
+        updated_at = datetime.now()
         try:
             with engine.begin() as conn:
                 # Delete old data
-                conn.execute(text("DELETE FROM market_trends WHERE DATE(last_updated) < CURDATE()"))
+                conn.execute(
+                    text("DELETE FROM market_trends WHERE last_updated < :today"),
+                    {"today": datetime.combine(date.today(), datetime.min.time())}
+                )
                 # Insert new data
                 conn.execute(
-                    text("INSERT INTO market_trends (trending_data, last_updated) VALUES (:data, NOW())"),
-                    {"data": json.dumps(trending)}
+                    text("INSERT INTO market_trends (trending_data, last_updated) VALUES (:data, :now)"),
+                    {"data": json.dumps(trending), "now": updated_at}
                 )
         except Exception as e:
             logger.error(f"Error caching market trends: {str(e)}")
             # Continue even if caching fails
 
-        return jsonify({
-            "status": "success",
-            "data": trending
-        })
+        return trending_response(json.dumps(trending), updated_at)
 
     except Exception as e:
         logger.error(f"Error in get_trending_stocks: {str(e)}")
@@ -1681,6 +2520,15 @@ def get_trending_stocks():
         }), 500
 
 
+def trending_response(trending_data, last_updated):
+    """Trending list as a conditional, compressible response keyed on when it was fetched"""
+    etag = make_etag("trending", last_updated, Config.RESULT_SCHEMA_VERSION)
+    return conditional_json(
+        lambda: {"status": "success", "data": json.loads(trending_data)},
+        etag,
+        default=json_serial
+    )
+
 def init_market_trends_table():
     """Initialize the market_trends table if it doesn't exist"""
     if engine is None:
@@ -1688,24 +2536,26 @@ def init_market_trends_table():
         return
     try:
         with engine.connect() as conn:
-            # Check if table exists
-            result = conn.execute(text("""
-                SELECT COUNT(*)
-                FROM information_schema.tables 
-                WHERE table_schema = DATABASE()
-                AND table_name = 'market_trends'
-            """)).scalar()
-            
-            if result == 0:
+            if not table_exists(conn, "market_trends"):
                 logger.info("Creating market_trends table")
-                conn.execute(text("""
-                    CREATE TABLE market_trends (
-                        id INT AUTO_INCREMENT PRIMARY KEY,
-                        trending_data JSON,
-                        last_updated DATETIME,
-                        INDEX (last_updated)
-                    )
-                """))
+                if is_sqlite(conn):
+                    conn.execute(text("""
+                        CREATE TABLE market_trends (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            trending_data TEXT,
+                            last_updated DATETIME
+                        )
+                    """))
+                    conn.execute(text("CREATE INDEX idx_market_trends_last_updated ON market_trends (last_updated)"))
+                else:
+                    conn.execute(text("""
+                        CREATE TABLE market_trends (
+                            id INT AUTO_INCREMENT PRIMARY KEY,
+                            trending_data JSON,
+                            last_updated DATETIME,
+                            INDEX (last_updated)
+                        )
+                    """))
                 conn.commit()
                 logger.info("market_trends table created successfully")
             else:
@@ -1714,8 +2564,58 @@ def init_market_trends_table():
         logger.error(f"Error initializing market_trends table: {str(e)}")
         logger.error(f"Full error details: {traceback.format_exc()}")
 
-# Call this after engine initialization
-init_market_trends_table()
+_database_ready = False
+_database_only = False
+
+def ensure_database_ready():
+    """Check connectivity and create tables once per worker; retried until it succeeds"""
+    global _database_ready, engine
+    if _database_ready:
+        return True
+    if engine is None:
+        return False
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        logger.info("Database connection successful!")
+    except Exception as e:
+        logger.error(f"Error connecting to database: {e}")
+        if not Config.SQLITE_FALLBACK or is_sqlite(engine):
+            return False
+        logger.warning("Falling back to the embedded SQLite database")
+        engine = create_sqlite_engine(Config.SQLITE_PATH)
+    init_market_trends_table()
+    try:
+        with engine.begin() as conn:
+            score_history.ensure_table(conn)
+            article_cache.ensure_table(conn)
+            ensure_score_generation_table(conn)
+            ensure_all_indexes(conn)
+    except Exception as e:
+        logger.error(f"Error creating tables and indexes: {e}")
+    # Replays results spooled by a previous process; one-shot tools never do
+    if not _database_only:
+        write_behind.start()
+    _database_ready = True
+    return True
+
+def use_database_only():
+    """
+    Connect and create tables like ensure_database_ready, but never start
+    write-behind, which would claim and replay live workers' spools. For
+    one-shot tools such as rescore.py; returns False if the database is down.
+    """
+    global _database_only
+    _database_only = True
+    return ensure_database_ready()
+
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 200 once the database is reachable and initialized"""
+    if ensure_database_ready():
+        return jsonify({"status": "ready"})
+    return jsonify({"status": "not_ready", "database": "unavailable"}), 503
+
 
 # Error handlers
 @app.errorhandler(404)
@@ -0,0 +1,194 @@
+"""Extracted article content keyed by canonical URL: a byte-bounded in-process LRU over a database table"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from sqlalchemy import text
+
+import metrics
+import payloads
+from cache import MemoryCache
+from storage import is_sqlite, table_exists
+
+logger = logging.getLogger(__name__)
+
+TABLE = "article_content"
+
+# Query parameters that only track where a click came from
+TRACKING_PREFIXES = ("utm_",)
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "mc_cid", "mc_eid", "cmpid", "ncid", "guccounter", "taid", "yptr", "soc_src", "soc_trk", "__source"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Memory-tier lookups are counted by cache_requests_total{namespace="article"}
+lookups_total = metrics.counter("article_cache_db_lookups_total", "Article content lookups that reached the database, by result")
+stored_total = metrics.counter("article_cache_stored_total", "Article contents written after a fetch and NLP pass")
+
+
+def canonical_url(url):
+    """
+    The form two links to the same article share: https, lowercase host
+    without www. or a default port, no fragment, no tracking parameters,
+    remaining parameters sorted and no trailing slash.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    if scheme == "http":
+        scheme = "https"
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name.lower() not in TRACKING_PARAMS and not name.lower().startswith(TRACKING_PREFIXES)
+    ))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def content_key(url):
+    """sha256 of the canonical URL; the primary key in both tiers"""
+    return hashlib.sha256(canonical_url(url).encode("utf-8")).hexdigest()
+
+
+def ensure_table(conn):
+    if table_exists(conn, TABLE):
+        return
+    logger.info(f"Creating {TABLE} table")
+    content_type = "TEXT" if is_sqlite(conn) else "LONGTEXT"
+    conn.execute(text(f"""
+        CREATE TABLE {TABLE} (
+            url_hash CHAR(64) NOT NULL PRIMARY KEY,
+            url {content_type} NOT NULL,
+            content {content_type} NOT NULL,
+            fetched_at DATETIME NOT NULL
+        )
+    """))
+    conn.execute(text(f"CREATE INDEX idx_{TABLE}_fetched_at ON {TABLE} (fetched_at)"))
+
+
+class ArticleContentCache:
+    """
+    Text, keywords and entities of articles already fetched and run through
+    NLP, shared by every ticker and run that links to them. Only what comes
+    from the page itself is kept: sentiment is scored from each provider's
+    own listing, which is cheap.
+
+    Lookups try this worker's LRU (bounded by `memory_max_bytes` of encoded
+    content) and then the `article_content` table, which every worker and
+    restart shares. The table keeps `max_rows` rows at most, pruned oldest
+    first every `prune_every` writes, and entries older than `max_age`
+    seconds are treated as misses. `get_engine` returns the current engine,
+    or None while the database is unavailable; the cache then runs on
+    memory alone.
+    """
+
+    def __init__(self, get_engine, memory_max_bytes=32 * 1024 * 1024, memory_max_entries=5000,
+                 max_rows=50000, max_age=30 * 86400, prune_every=200, codec="zstd"):
+        self.get_engine = get_engine
+        self.memory = MemoryCache(max_entries=memory_max_entries, max_bytes=memory_max_bytes)
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.prune_every = prune_every
+        self.codec = codec
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        """Stored content for url (or any link that canonicalizes to it), else None"""
+        key = content_key(url)
+        raw = self.memory.get(f"article:{key}")
+        if raw is not None:
+            return json.loads(raw)
+
+        engine = self.get_engine()
+        if engine is None:
+            return None
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=self.max_age)
+        try:
+            with engine.connect() as conn:
+                if not table_exists(conn, TABLE):
+                    return None
+                stored = conn.execute(
+                    text(f"SELECT content FROM {TABLE} WHERE url_hash = :key AND fetched_at >= :cutoff"),
+                    {"key": key, "cutoff": cutoff},
+                ).scalar()
+        except Exception as e:
+            logger.warning(f"Article content lookup for {url} failed: {e}")
+            return None
+        if stored is None:
+            lookups_total.inc(result="miss")
+            return None
+        lookups_total.inc(result="hit")
+        raw = payloads.decode(stored)
+        self.memory.set(f"article:{key}", raw.encode("utf-8"), ttl=self.max_age)
+        return json.loads(raw)
+
+    def put(self, url, content):
+        """Store {"text", "keywords", "entities"} for url in both tiers"""
+        key = content_key(url)
+        raw = json.dumps(content)
+        self.memory.set(f"article:{key}", raw.encode("utf-8"), ttl=self.max_age)
+        stored_total.inc()
+
+        engine = self.get_engine()
+        if engine is None:
+            return
+        row = {
+            "key": key,
+            "url": canonical_url(url),
+            "content": payloads.encode(raw, self.codec),
+            "fetched_at": datetime.now(timezone.utc).replace(tzinfo=None),
+        }
+        try:
+            with engine.begin() as conn:
+                ensure_table(conn)
+                verb = "INSERT OR REPLACE" if is_sqlite(conn) else "REPLACE"
+                conn.execute(
+                    text(f"{verb} INTO {TABLE} (url_hash, url, content, fetched_at) VALUES (:key, :url, :content, :fetched_at)"),
+                    row,
+                )
+        except Exception as e:
+            logger.warning(f"Storing article content for {url} failed: {e}")
+            return
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.prune_every == 0
+        if due:
+            self.prune()
+
+    def prune(self):
+        """Drop expired rows, then the oldest ones beyond max_rows. Returns the number removed."""
+        engine = self.get_engine()
+        if engine is None:
+            return 0
+        start = time.perf_counter()
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=self.max_age)
+        try:
+            with engine.begin() as conn:
+                if not table_exists(conn, TABLE):
+                    return 0
+                removed = conn.execute(text(f"DELETE FROM {TABLE} WHERE fetched_at < :cutoff"), {"cutoff": cutoff}).rowcount
+                # The fetched_at of the newest row past the limit; it and everything older goes
+                first_dropped = conn.execute(
+                    text(f"SELECT fetched_at FROM {TABLE} ORDER BY fetched_at DESC LIMIT 1 OFFSET :limit"),
+                    {"limit": self.max_rows},
+                ).scalar()
+                if first_dropped is not None:
+                    removed += conn.execute(
+                        text(f"DELETE FROM {TABLE} WHERE fetched_at <= :oldest"), {"oldest": first_dropped}
+                    ).rowcount
+        except Exception as e:
+            logger.warning(f"Pruning {TABLE} failed: {e}")
+            return 0
+        if removed:
+            logger.info(f"Pruned {removed} article contents in {time.perf_counter() - start:.2f}s")
+        return removed
+
+    def stats(self):
+        return {"memory": self.memory.stats(), "max_rows": self.max_rows, "max_age": self.max_age}
@@ -0,0 +1,301 @@
+"""
+Offline end-to-end pipeline benchmark.
+
+Starts the stub upstream server (stub_server.py) replaying a fixture file
+with injected latency, points the app at it (UPSTREAM_OVERRIDE, a throwaway
+SQLite database, generous rate limits), then runs N concurrent tickers
+through either run_pipeline directly or the /analyze SSE endpoint served by
+a local threaded server. Reports per-stage and end-to-end latency
+percentiles and throughput per concurrency level.
+
+For CI, compare against a stored run and fail on regressions:
+    python benchmarks/e2e/run_e2e.py --output e2e.json \\
+        --baseline benchmarks/e2e/baseline.json --max-regression 0.25
+
+Usage (from backend/):
+    python benchmarks/e2e/run_e2e.py --mode pipeline --levels 1,4,8 --latency-ms 80 --jitter-ms 40
+    python benchmarks/e2e/run_e2e.py --mode sse --levels 1,8,32 --host-latency api.openai.com=900
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+sys.path.insert(0, BACKEND_DIR)
+
+from stub_server import Latency, StubServer, parse_host_latency  # noqa: E402
+
+PROVIDERS = ("finnhub", "alpha_vantage", "newsapi", "openai", "reddit", "bluesky")
+TERMINAL_STATUSES = ("success", "degraded", "error")
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 4)
+
+
+def summarize(samples):
+    return {f"p{pct}": percentile(samples, pct) for pct in (50, 90, 95, 99)}
+
+
+def configure_environment(stub_url, workdir, max_concurrency):
+    """Everything the app reads at import time; set before `import app`"""
+    os.environ.update({
+        "UPSTREAM_OVERRIDE": stub_url,
+        "STORAGE_BACKEND": "sqlite",
+        "SQLITE_PATH": os.path.join(workdir, "bench.db"),
+        "WRITE_BEHIND_SPOOL_DIR": os.path.join(workdir, "spool"),
+        "MAX_CONCURRENT_PIPELINES": str(max_concurrency),
+        "MAX_QUEUED_PIPELINES": str(max_concurrency),
+        "FINNHUB_API_KEY": "bench",
+        "NEWS_API_KEY": "bench",
+        "OPENAI_API_KEY": "bench",
+        "ALPHA_VANTAGE_API_KEY": "bench",
+        "REDDIT_CLIENT_ID": "bench",
+        "REDDIT_CLIENT_SECRET": "bench",
+        "REDDIT_USER_AGENT": "tradevision-bench",
+    })
+    os.environ.pop("CACHE_URL", None)
+    os.environ.pop("REDIS_URL", None)
+    # Quotas would otherwise dominate anything above a couple of tickers
+    for provider in PROVIDERS:
+        os.environ[f"RATE_LIMIT_{provider.upper()}"] = "100000/10000"
+
+
+def clear_table(app_module, table):
+    from sqlalchemy import text
+    from storage import table_exists
+
+    if not app_module.ensure_database_ready():
+        return
+    with app_module.engine.begin() as conn:
+        if table_exists(conn, table):
+            conn.execute(text(f"DELETE FROM {table}"))
+
+
+def reset_caches(app_module):
+    """Fresh caches so every ticker pays for its upstream calls"""
+    from cache import create_cache
+    from market_data import MarketDataStore
+
+    app_module.shared_cache = create_cache(None)
+    app_module.market_data = MarketDataStore(max_symbols=app_module.Config.MARKET_DATA_MAX_SYMBOLS)
+    # Stored articles set the news watermarks and cached article content skips
+    # the page fetch and NLP: left in place, later levels would do neither
+    clear_table(app_module, "news_articles")
+    clear_table(app_module, "article_content")
+    app_module.article_contents = app_module.article_cache.ArticleContentCache(
+        app_module.article_contents.get_engine,
+        memory_max_bytes=app_module.Config.ARTICLE_CACHE_MEMORY_BYTES,
+        max_rows=app_module.Config.ARTICLE_CACHE_MAX_ROWS,
+        max_age=app_module.Config.ARTICLE_CACHE_MAX_AGE,
+        codec=app_module.Config.PAYLOAD_CODEC,
+    )
+
+
+class Timeline:
+    """Event arrival times for one ticker"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_event = None
+        self.stage_started = {}
+        self.stages = {}
+        self.status = "incomplete"
+        self.total = None
+        self.error = None
+
+    def observe(self, event):
+        now = time.perf_counter() - self.start
+        if self.first_event is None:
+            self.first_event = now
+        step, status = event.get("step"), event.get("status")
+        if status == "started":
+            self.stage_started[step] = now
+        elif status in TERMINAL_STATUSES and step in self.stage_started:
+            self.stages[step] = now - self.stage_started.pop(step)
+        if step == "complete":
+            self.status = status
+            self.total = now
+
+
+def parse_sse_data(chunk):
+    for line in chunk.splitlines():
+        if line.startswith("data:"):
+            return json.loads(line[5:])
+    return None
+
+
+def run_direct(app_module, ticker, timeline):
+    """Drive run_pipeline in-process (no HTTP between client and app)"""
+    try:
+        stream = app_module.run_pipeline(ticker, force_refresh=True)
+        while True:
+            try:
+                event = parse_sse_data(next(stream))
+            except StopIteration as stop:
+                if stop.value is not None and timeline.total is None:
+                    # run_pipeline returns the result instead of a complete event
+                    timeline.observe({"step": "complete", "status": "success"})
+                break
+            if event:
+                timeline.observe(event)
+    except Exception as e:
+        timeline.status, timeline.error = "error", str(e)
+
+
+def run_sse(base_url, ticker, timeline, timeout):
+    """POST /analyze on the local server and time each SSE event"""
+    body = json.dumps({"symbol": ticker, "force_refresh": True}).encode()
+    req = urllib.request.Request(
+        f"{base_url}/analyze", data=body, method="POST",
+        headers={"Content-Type": "application/json", "Accept": "text/event-stream"},
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            for raw in response:
+                line = raw.decode("utf-8", "replace").strip()
+                if line.startswith("data:"):
+                    event = json.loads(line[5:])
+                    timeline.observe(event)
+                    if event.get("step") == "complete":
+                        break
+    except Exception as e:
+        timeline.status, timeline.error = "error", str(e)
+
+
+def run_level(concurrency, level_index, runner):
+    timelines = [Timeline() for _ in range(concurrency)]
+    threads = [
+        threading.Thread(target=runner, args=(f"BM{level_index:02d}{i:03d}", timelines[i]), daemon=True)
+        for i in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread, timeline in zip(threads, timelines):
+        timeline.start = time.perf_counter()
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    succeeded = [t for t in timelines if t.status == "success"]
+    stage_names = sorted({name for t in timelines for name in t.stages})
+    return {
+        "concurrency": concurrency,
+        "succeeded": len(succeeded),
+        "failed": concurrency - len(succeeded),
+        "end_to_end_s": summarize([t.total for t in succeeded]),
+        "first_event_s": summarize([t.first_event for t in timelines if t.first_event is not None]),
+        "stages_s": {name: summarize([t.stages[name] for t in timelines if name in t.stages]) for name in stage_names},
+        "wall_s": round(wall, 3),
+        "tickers_per_s": round(len(succeeded) / wall, 4) if wall else None,
+        "errors": sorted({t.error for t in timelines if t.error})[:5],
+    }
+
+
+def compare(report, baseline, max_regression):
+    """Regressions of p95 end-to-end latency or throughput beyond max_regression, per level"""
+    previous = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    failures = []
+    for level in report["levels"]:
+        base = previous.get(level["concurrency"])
+        if base is None:
+            continue
+        p95, base_p95 = level["end_to_end_s"]["p95"], base["end_to_end_s"]["p95"]
+        if p95 is not None and base_p95 and p95 > base_p95 * (1 + max_regression):
+            failures.append(f"concurrency {level['concurrency']}: p95 {p95:.3f}s vs baseline {base_p95:.3f}s")
+        rate, base_rate = level["tickers_per_s"], base["tickers_per_s"]
+        if rate is not None and base_rate and rate < base_rate * (1 - max_regression):
+            failures.append(f"concurrency {level['concurrency']}: {rate:.3f} tickers/s vs baseline {base_rate:.3f}")
+        if level["failed"] > base["failed"]:
+            failures.append(f"concurrency {level['concurrency']}: {level['failed']} failed vs baseline {base['failed']}")
+    return failures
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--mode", choices=("pipeline", "sse"), default="pipeline")
+    arg_parser.add_argument("--levels", default="1,4,8", help="concurrent tickers per level")
+    arg_parser.add_argument("--fixtures", default=os.path.join(HERE, "fixtures", "synthetic.json"))
+    arg_parser.add_argument("--latency-ms", type=float, default=50.0, help="injected latency per upstream call")
+    arg_parser.add_argument("--jitter-ms", type=float, default=25.0)
+    arg_parser.add_argument("--host-latency", action="append", metavar="HOST=MS", help="per-host latency override")
+    arg_parser.add_argument("--seed", type=int, default=1)
+    arg_parser.add_argument("--timeout", type=float, default=600)
+    arg_parser.add_argument("--output", help="write results as JSON to this file")
+    arg_parser.add_argument("--baseline", help="previous --output to compare against")
+    arg_parser.add_argument("--max-regression", type=float, default=0.25,
+                            help="allowed fractional slowdown of p95 / drop in throughput")
+    args = arg_parser.parse_args()
+
+    levels = [int(level) for level in args.levels.split(",")]
+    latency = Latency(args.latency_ms, args.jitter_ms, parse_host_latency(args.host_latency), seed=args.seed)
+    stub = StubServer(args.fixtures, latency).start()
+    workdir = tempfile.mkdtemp(prefix="e2e-bench-")
+    configure_environment(stub.url, workdir, max(levels))
+
+    import app as app_module
+
+    server = None
+    if args.mode == "sse":
+        from werkzeug.serving import make_server
+        server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+
+        def runner(ticker, timeline):
+            run_sse(base_url, ticker, timeline, args.timeout)
+    else:
+        def runner(ticker, timeline):
+            run_direct(app_module, ticker, timeline)
+
+    # Warm-up: model loading and first connections shouldn't count against level 1
+    reset_caches(app_module)
+    run_level(1, 99, runner)
+
+    report = {
+        "mode": args.mode,
+        "fixtures": os.path.basename(args.fixtures),
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "levels": [],
+    }
+    for index, concurrency in enumerate(levels):
+        reset_caches(app_module)
+        level = run_level(concurrency, index, runner)
+        report["levels"].append(level)
+        print(json.dumps(level))
+    report["stub"] = stub.stats()
+    if report["stub"]["misses"]:
+        print(f"Requests without a fixture: {json.dumps(report['stub']['misses'])}", file=sys.stderr)
+
+    if server is not None:
+        server.shutdown()
+    stub.stop()
+    app_module.write_behind.flush(10)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = compare(report, json.load(f), args.max_regression)
+        for failure in failures:
+            print(f"REGRESSION {failure}", file=sys.stderr)
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Local stub for every upstream the pipeline calls, replaying recorded responses.
+
+The app is pointed at it with UPSTREAM_OVERRIDE=http://127.0.0.1:<port>, which
+turns https://finnhub.io/api/v1/quote?... into /finnhub.io/api/v1/quote?...
+on this server. Responses come from a fixture file:
+
+    {"responses": [
+        {"host": "finnhub.io", "path": "/api/v1/quote", "method": "GET",
+         "status": 200, "headers": {...}, "json": {...}},
+        {"host": "*", "path_pattern": "/r/[^/]+/search", "text": "..."},
+        ...
+    ]}
+
+`path` matches exactly, `path_pattern` as a full regex; the query string is
+ignored, so recordings never need API keys. Bodies are `json`, `text` or
+`base64`. In bodies, "__NOW__" / "__NOW-<seconds>__" become a Unix timestamp
+and "__ISO_NOW-<seconds>__" an ISO-8601 UTC time, so replayed posts and bars
+always look recent.
+
+Latency is injected per request (fixed + uniform jitter, per host if given).
+
+Record a fixture by proxying real traffic once:
+    python benchmarks/e2e/stub_server.py --record benchmarks/e2e/fixtures/recorded.json --port 8765
+    UPSTREAM_OVERRIDE=http://127.0.0.1:8765 python -c "import app; ..."
+"""
+import argparse
+import base64
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+_NOW = re.compile(r'"?__NOW(?:-(\d+))?__"?')
+_ISO_NOW = re.compile(r'__ISO_NOW(?:-(\d+))?__')
+
+# Headers that must not be replayed verbatim
+_HOP_HEADERS = {"content-length", "content-encoding", "transfer-encoding", "connection", "keep-alive"}
+
+
+def render_body(entry):
+    if "base64" in entry:
+        return base64.b64decode(entry["base64"])
+    text = json.dumps(entry["json"]) if "json" in entry else entry.get("text", "")
+    now = time.time()
+    text = _ISO_NOW.sub(
+        lambda m: datetime.fromtimestamp(now - int(m.group(1) or 0), timezone.utc).isoformat().replace("+00:00", "Z"),
+        text,
+    )
+    text = _NOW.sub(lambda m: str(int(now - int(m.group(1) or 0))), text)
+    return text.encode("utf-8")
+
+
+class Latency:
+    def __init__(self, fixed_ms=0.0, jitter_ms=0.0, per_host=None, seed=None):
+        self.fixed_ms = fixed_ms
+        self.jitter_ms = jitter_ms
+        self.per_host = per_host or {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self, host):
+        with self._lock:
+            jitter = self._rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        return (self.per_host.get(host, self.fixed_ms) + jitter) / 1000
+
+
+class StubServer:
+    """Threaded HTTP server replaying (or recording) upstream responses"""
+
+    def __init__(self, fixture_path=None, latency=None, host="127.0.0.1", port=0, record_path=None):
+        self.latency = latency or Latency()
+        self.record_path = record_path
+        self.entries = []
+        self.recorded = []
+        self.hits = {}
+        self.misses = {}
+        self._lock = threading.Lock()
+        if fixture_path:
+            with open(fixture_path) as f:
+                self.entries = json.load(f)["responses"]
+        for entry in self.entries:
+            if "path_pattern" in entry:
+                entry["_regex"] = re.compile(entry["path_pattern"])
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self.record_path:
+            with open(self.record_path, "w") as f:
+                json.dump({"responses": self.recorded}, f, indent=2)
+
+    def match(self, method, host, path):
+        for entry in self.entries:
+            if entry.get("method", "GET") not in (method, "*"):
+                continue
+            if entry.get("host", "*") not in (host, "*"):
+                continue
+            if "_regex" in entry:
+                if entry["_regex"].fullmatch(path):
+                    return entry
+            elif entry.get("path") == path:
+                return entry
+        return None
+
+    def _count(self, counts, key):
+        with self._lock:
+            counts[key] = counts.get(key, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return {"hits": dict(self.hits), "misses": dict(self.misses)}
+
+    def _record(self, method, host, path, query, body, headers):
+        import requests  # only needed in record mode
+
+        url = f"https://{host}{path}" + (f"?{query}" if query else "")
+        upstream = requests.request(method, url, data=body or None, headers=headers, timeout=60)
+        entry = {"host": host, "path": path, "method": method, "status": upstream.status_code,
+                 "headers": {k: v for k, v in upstream.headers.items() if k.lower() not in _HOP_HEADERS}}
+        try:
+            entry["json"] = upstream.json()
+        except ValueError:
+            try:
+                entry["text"] = upstream.content.decode("utf-8")
+            except UnicodeDecodeError:
+                entry["base64"] = base64.b64encode(upstream.content).decode("ascii")
+        with self._lock:
+            self.recorded.append(entry)
+        return entry
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                parts = urlsplit(self.path)
+                host, _, path = parts.path.lstrip("/").partition("/")
+                path = "/" + path
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+
+                if stub.record_path:
+                    headers = {k: v for k, v in self.headers.items() if k.lower() not in _HOP_HEADERS | {"host"}}
+                    entry = stub._record(self.command, host, path, parts.query, body, headers)
+                else:
+                    entry = stub.match(self.command, host, path)
+
+                time.sleep(stub.latency.delay(host))
+                if entry is None:
+                    stub._count(stub.misses, f"{self.command} {host}{path}")
+                    payload = json.dumps({"error": f"no fixture for {self.command} {host}{path}"}).encode()
+                    status, headers = 404, {"Content-Type": "application/json"}
+                else:
+                    stub._count(stub.hits, f"{host}")
+                    payload = render_body(entry)
+                    status = entry.get("status", 200)
+                    headers = dict(entry.get("headers") or {})
+                    headers.setdefault("Content-Type", "application/json" if "json" in entry else "text/html; charset=utf-8")
+
+                self.send_response(status)
+                for key, value in headers.items():
+                    if key.lower() not in _HOP_HEADERS:
+                        self.send_header(key, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+        return Handler
+
+
+def parse_host_latency(values):
+    per_host = {}
+    for value in values or []:
+        host, _, ms = value.partition("=")
+        per_host[host] = float(ms)
+    return per_host
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--fixtures", help="fixture file to replay")
+    arg_parser.add_argument("--record", help="proxy to the real upstreams and write a fixture file on exit")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--latency-ms", type=float, default=0.0)
+    arg_parser.add_argument("--jitter-ms", type=float, default=0.0)
+    arg_parser.add_argument("--host-latency", action="append", metavar="HOST=MS")
+    args = arg_parser.parse_args()
+
+    latency = Latency(args.latency_ms, args.jitter_ms, parse_host_latency(args.host_latency))
+    server = StubServer(args.fixtures, latency, port=args.port, record_path=args.record).start()
+    print(f"Stub server on {server.url} (UPSTREAM_OVERRIDE={server.url}); Ctrl-C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+        print(json.dumps(server.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
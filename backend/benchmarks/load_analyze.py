@@ -0,0 +1,124 @@
+"""
+Concurrent /analyze SSE load benchmark.
+
+Opens N simultaneous /analyze streams against a running server (one gunicorn
+worker, ideally with upstreams stubbed; see benchmarks/e2e) at increasing
+concurrency levels, and reports how many streams one worker holds before
+time-to-first-event or completion degrades.
+
+Usage (from backend/):
+    gunicorn -c gunicorn.conf.py app:app &
+    python benchmarks/load_analyze.py --url http://localhost:5001 --levels 1,10,50,100 \\
+        --symbols AAPL,MSFT,NVDA --force-refresh
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.request
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 3)
+
+
+def run_stream(url, symbol, force_refresh, timeout, result):
+    """POST /analyze and read SSE events until `complete` (or failure)"""
+    body = json.dumps({"symbol": symbol, "force_refresh": force_refresh}).encode()
+    req = urllib.request.Request(
+        f"{url}/analyze",
+        data=body,
+        headers={"Content-Type": "application/json", "Accept": "text/event-stream"},
+        method="POST",
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            for raw in response:
+                line = raw.decode("utf-8", "replace").strip()
+                if not line.startswith("data:"):
+                    continue
+                if "first_event" not in result:
+                    result["first_event"] = time.perf_counter() - start
+                event = json.loads(line[5:])
+                if event.get("step") == "complete":
+                    result["status"] = event.get("status")
+                    break
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+    result["total"] = time.perf_counter() - start
+    result.setdefault("status", "incomplete")
+
+
+def run_level(url, concurrency, symbols, force_refresh, timeout):
+    results = [{} for _ in range(concurrency)]
+    threads = [
+        threading.Thread(
+            target=run_stream,
+            args=(url, symbols[i % len(symbols)], force_refresh, timeout, results[i]),
+            daemon=True,
+        )
+        for i in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    first_events = [r["first_event"] for r in results if "first_event" in r]
+    totals = [r["total"] for r in results if r["status"] == "success"]
+    return {
+        "concurrency": concurrency,
+        "succeeded": sum(1 for r in results if r["status"] == "success"),
+        "failed": sum(1 for r in results if r["status"] != "success"),
+        "first_event_p50_s": percentile(first_events, 50),
+        "first_event_p95_s": percentile(first_events, 95),
+        "total_p50_s": percentile(totals, 50),
+        "total_p95_s": percentile(totals, 95),
+        "wall_s": round(wall, 3),
+        "streams_per_s": round(len(totals) / wall, 3) if wall else None,
+        "errors": sorted({r["error"] for r in results if "error" in r})[:5],
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--url", default="http://localhost:5001")
+    arg_parser.add_argument("--levels", default="1,5,10,25,50")
+    arg_parser.add_argument("--symbols", default="AAPL")
+    arg_parser.add_argument("--force-refresh", action="store_true", help="bypass the cache so every stream runs the pipeline")
+    arg_parser.add_argument("--timeout", type=float, default=600)
+    arg_parser.add_argument("--max-first-event", type=float, default=5.0,
+                            help="a level 'holds' only if p95 time-to-first-event stays under this")
+    arg_parser.add_argument("--output", help="write results as JSON to this file")
+    args = arg_parser.parse_args()
+
+    symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+    levels = [int(level) for level in args.levels.split(",")]
+
+    report = {"url": args.url, "levels": []}
+    held = 0
+    for concurrency in levels:
+        level = run_level(args.url, concurrency, symbols, args.force_refresh, args.timeout)
+        report["levels"].append(level)
+        print(json.dumps(level))
+        p95 = level["first_event_p95_s"]
+        if level["failed"] == 0 and p95 is not None and p95 <= args.max_first_event:
+            held = concurrency
+    report["max_concurrent_streams_held"] = held
+
+    print(json.dumps({"max_concurrent_streams_held": held}))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Micro-benchmarks for the CPU-bound helpers every analysis request runs.
+
+Each benchmark is timed pytest-benchmark style (calibrated iterations per
+round, several rounds, min/median/stdev per call) on synthetic payloads at a
+realistic size and at 10x (more bars, articles and posts). Medians can be
+saved as a baseline and later runs compared against it; a benchmark slower
+than baseline * (1 + threshold) fails the run.
+
+Usage (from backend/):
+    python benchmarks/micro.py                          # run, compare to the stored baseline if any
+    python benchmarks/micro.py --save-baseline          # record benchmarks/baselines/micro.json
+    python benchmarks/micro.py --filter flatten --threshold 0.1
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+DEFAULT_BASELINE = os.path.join(BACKEND_DIR, "benchmarks", "baselines", "micro.json")
+
+# Per-ticker volumes seen in practice: 2 months of daily bars, ~20 processed
+# articles, ~150 Reddit + Bluesky posts
+SIZES = {
+    "realistic": {"bars": 42, "articles": 20, "posts": 150},
+    "10x": {"bars": 420, "articles": 200, "posts": 1500},
+}
+
+WORDS = ("revenue guidance growth margin chips cloud demand outlook shares analysts "
+         "upgrade quarter datacenter buyback dividend earnings").split()
+
+
+def synthetic_result(bars, articles, posts, seed=3):
+    """An analysis result shaped like run_analysis_stages' output"""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+
+    def sentence(n):
+        return " ".join(rng.choice(WORDS) for _ in range(n))
+
+    price = 150.0
+    historical_data = {}
+    for i in range(bars, 0, -1):
+        price *= 1 + rng.uniform(-0.02, 0.02)
+        historical_data[(now - timedelta(days=i)).strftime("%Y-%m-%d")] = {
+            "Open": price * 0.99, "High": price * 1.01, "Low": price * 0.98, "Close": price,
+            "Volume": float(rng.randint(10_000_000, 90_000_000)),
+        }
+
+    article_list = [{
+        "title": sentence(10),
+        "url": f"https://news.example.com/{i}",
+        "published_at": (now - timedelta(hours=i)).isoformat(),
+        "source": rng.choice(["Reuters", "Bloomberg", "CNBC"]),
+        "keywords": [rng.choice(WORDS) for _ in range(10)],
+        "entities": [(rng.choice(WORDS).title(), "ORG") for _ in range(8)],
+        "sentiment": {"neg": 0.1, "neu": 0.7, "pos": 0.2, "compound": rng.uniform(-1, 1)},
+    } for i in range(articles)]
+
+    post_list = []
+    for i in range(posts):
+        title, body = sentence(10), sentence(40)
+        post_list.append({
+            "platform": rng.choice(["Reddit", "Bluesky"]),
+            "title": title,
+            "description": body,
+            "text": f"{title} {body}",
+            "created_at": now - timedelta(minutes=37 * i),
+            "username": f"user{i}",
+            "likes": rng.randint(0, 2000),
+            "comments": rng.randint(0, 300),
+            "engagement": rng.randint(0, 2300),
+            "url": f"https://www.reddit.com/r/stocks/comments/{i}/",
+            "subreddit": "stocks",
+            "sentiment_score": rng.uniform(-1, 1),
+            "sentiment_category": "neutral",
+        })
+
+    return {
+        "company_info": {"name": "Example Corp", "ticker": "EXMP", "sector": "Technology", "industry": "Technology",
+                         "country": "US", "exchange": "NASDAQ"},
+        "financial_data": {"ticker": "EXMP", "current_price": price, "opening_price": price * 0.99,
+                           "daily_high": price * 1.01, "daily_low": price * 0.98, "price_change": 0.4,
+                           "trading_volume": 5e7, "volatility": 0.27, "historical_data": historical_data,
+                           "description": sentence(120)},
+        "news_data": {"articles": article_list, "top_keywords": [(w, 3) for w in WORDS],
+                      "top_entities": [(w.title(), 2) for w in WORDS[:10]]},
+        "expanded_data": {"expanded_keywords": WORDS, "search_queries": [f"Example Corp {w}" for w in WORDS[:5]]},
+        "social_data": {"posts": post_list, "total_posts": len(post_list),
+                        "avg_sentiment": statistics.fmean(p["sentiment_score"] for p in post_list) if post_list else 0,
+                        "sentiment_distribution": {"positive": 0.4, "neutral": 0.3, "negative": 0.3},
+                        "most_engaging_posts": post_list[:10]},
+        "scores": {"financial_momentum": 60.0, "news_sentiment": 55.0, "social_buzz": 40.0, "hype_index": 55.0,
+                   "sentiment_price_divergence": 3.0},
+        "degraded": [],
+        "last_run": now.isoformat(),
+    }
+
+
+def build_cases(app, size):
+    """(name, zero-argument callable) pairs for one payload size"""
+    import pandas as pd
+    from scoring import ScoringInputs, score_batch
+
+    counts = SIZES[size]
+    result = synthetic_result(counts["bars"], counts["articles"], counts["posts"])
+    flat_row = app.flatten_nested_dict(result)
+    event = {"step": "complete", "status": "success", "data": result}
+    # A leaderboard's worth of tickers, scored in one vectorized pass
+    leaderboard = [(result["financial_data"], result["news_data"], result["social_data"])] * 100
+
+    history = pd.DataFrame.from_dict(result["financial_data"]["historical_data"], orient="index")
+    history.index = pd.to_datetime(history.index).tz_localize("America/New_York")
+
+    now = datetime.now(timezone.utc)
+    timestamps = []
+    for i in range(counts["articles"] * 5):
+        moment = now - timedelta(minutes=i)
+        timestamps += [moment.isoformat(), moment.strftime("%Y-%m-%d %H:%M:%S"), moment]
+
+    return [
+        ("calculate_metrics", lambda: app.calculate_metrics(result["financial_data"], result["news_data"], result["social_data"])),
+        ("score_batch_100", lambda: score_batch(ScoringInputs.stack(leaderboard))),
+        ("flatten_nested_dict", lambda: app.flatten_nested_dict(result)),
+        ("reconstruct_cached_result", lambda: app.reconstruct_cached_result(dict(flat_row))),
+        ("parse_timestamp", lambda: [app.parse_timestamp(value) for value in timestamps]),
+        ("send_sse_message", lambda: app.send_sse_message(event)),
+        ("bars_from_history", lambda: app.bars_from_history(history)),
+    ]
+
+
+def measure(fn, rounds, min_round_time):
+    """Per-call seconds for each round, with iterations calibrated so a round lasts min_round_time"""
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round_time or iterations >= 1 << 20:
+            break
+        iterations *= 2 if elapsed <= 0 else max(2, min(10, int(min_round_time / elapsed) + 1))
+
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        samples.append((time.perf_counter() - start) / iterations)
+    return iterations, samples
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--rounds", type=int, default=7)
+    arg_parser.add_argument("--min-round-time", type=float, default=0.05, help="seconds")
+    arg_parser.add_argument("--sizes", default=",".join(SIZES))
+    arg_parser.add_argument("--filter", help="only benchmarks whose name contains this")
+    arg_parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    arg_parser.add_argument("--save-baseline", action="store_true", help="write medians to --baseline")
+    arg_parser.add_argument("--threshold", type=float, default=0.20,
+                            help="allowed fractional slowdown of the median vs baseline")
+    arg_parser.add_argument("--output", help="write results as JSON to this file")
+    args = arg_parser.parse_args()
+
+    # The helpers log and print on the hot path; keep that out of the timings
+    import logging
+    logging.disable(logging.CRITICAL)
+    import app
+
+    results = {}
+    for size in args.sizes.split(","):
+        for name, fn in build_cases(app, size):
+            if args.filter and args.filter not in name:
+                continue
+            with open(os.devnull, "w") as devnull:
+                stdout, sys.stdout = sys.stdout, devnull
+                try:
+                    iterations, samples = measure(fn, args.rounds, args.min_round_time)
+                finally:
+                    sys.stdout = stdout
+            key = f"{name}[{size}]"
+            results[key] = {
+                "iterations": iterations,
+                "min_us": round(min(samples) * 1e6, 2),
+                "median_us": round(statistics.median(samples) * 1e6, 2),
+                "stdev_us": round(statistics.stdev(samples) * 1e6, 2) if len(samples) > 1 else 0.0,
+            }
+            print(f"{key:<40} median {results[key]['median_us']:>12.2f} us  "
+                  f"min {results[key]['min_us']:>12.2f} us  x{iterations}")
+
+    report = {
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "processor": platform.processor()},
+        "benchmarks": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)["benchmarks"]
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous and result["median_us"] > previous["median_us"] * (1 + args.threshold):
+            regressions.append(f"{key}: {result['median_us']:.2f} us vs baseline {previous['median_us']:.2f} us "
+                               f"(+{(result['median_us'] / previous['median_us'] - 1) * 100:.0f}%)")
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
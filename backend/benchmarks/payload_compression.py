@@ -0,0 +1,121 @@
+"""
+Bytes-on-the-wire and read-latency benchmark for compressed `data` columns.
+
+Builds a synthetic analysis row shaped like flatten_nested_dict's output
+(a year of daily bars, news articles, social posts), then for plain JSON and
+each available codec reports the stored size of the large columns, the time
+to encode them, and the time to read them back: all columns (full result)
+versus only the small ones (lazy decoding leaves the rest packed).
+
+Usage (from backend/):
+    python benchmarks/payload_compression.py --articles 100 --posts 300 --repeat 50
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import payloads  # noqa: E402
+
+
+def synthetic_row(days, articles, posts, seed=7):
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=days)
+    price = 150.0
+    bars = {}
+    for i in range(days):
+        price *= 1 + rng.uniform(-0.03, 0.03)
+        bars[(start + timedelta(days=i)).isoformat()] = {
+            "Open": round(price * rng.uniform(0.98, 1.0), 4),
+            "High": round(price * rng.uniform(1.0, 1.03), 4),
+            "Low": round(price * rng.uniform(0.97, 1.0), 4),
+            "Close": round(price, 4),
+            "Volume": rng.randint(1_000_000, 90_000_000),
+        }
+    words = "revenue guidance growth margin chip cloud demand outlook shares analyst upgrade quarter".split()
+
+    def sentence(n):
+        return " ".join(rng.choice(words) for _ in range(n))
+
+    article_list = [{
+        "title": sentence(10),
+        "url": f"https://news.example.com/{i}",
+        "published_at": (start + timedelta(days=i % days)).isoformat(),
+        "source": rng.choice(["Reuters", "Bloomberg", "CNBC"]),
+        "keywords": [rng.choice(words) for _ in range(8)],
+        "sentiment": {"neg": 0.1, "neu": 0.7, "pos": 0.2, "compound": round(rng.uniform(-1, 1), 4)},
+    } for i in range(articles)]
+    post_list = [{
+        "platform": rng.choice(["reddit", "bluesky"]),
+        "text": sentence(40),
+        "score": rng.randint(0, 5000),
+        "sentiment": round(rng.uniform(-1, 1), 4),
+    } for _ in range(posts)]
+
+    return {
+        "company_info.name": "Example Corp",
+        "company_info.ticker": "EXMP",
+        "financial_data.historical_data": json.dumps(bars),
+        "news_data.articles": json.dumps(article_list),
+        "news_data.top_keywords": json.dumps(words),
+        "social_data.posts": json.dumps(post_list),
+        "scores.overall": 61.5,
+        "last_run": "2024-01-01T00:00:00+00:00",
+    }
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def read_all(row):
+    return {key: payloads.decode(value) if isinstance(value, str) else value for key, value in row.items()}
+
+
+def read_small(row):
+    # What a lazy reader touches when the caller only needs scores/company info
+    return {key: payloads.LazyPayload(value) if payloads.is_encoded(value) else value for key, value in row.items()}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--days", type=int, default=365)
+    arg_parser.add_argument("--articles", type=int, default=100)
+    arg_parser.add_argument("--posts", type=int, default=300)
+    arg_parser.add_argument("--min-size", type=int, default=1024)
+    arg_parser.add_argument("--repeat", type=int, default=50)
+    arg_parser.add_argument("--output", help="write results as JSON to this file")
+    args = arg_parser.parse_args()
+
+    row = synthetic_row(args.days, args.articles, args.posts)
+    plain_bytes = sum(len(v.encode("utf-8")) for v in row.values() if isinstance(v, str))
+
+    report = {"plain": {"stored_bytes": plain_bytes}, "codecs": {}}
+    for codec in payloads.available_codecs():
+        encoded = payloads.compress_columns(row, args.min_size, codec)
+        stored = sum(len(v) for v in encoded.values() if isinstance(v, str))
+        report["codecs"][codec] = {
+            "stored_bytes": stored,
+            "ratio": round(plain_bytes / stored, 2),
+            "encode_ms": round(timed(lambda: payloads.compress_columns(row, args.min_size, codec), args.repeat), 3),
+            "read_all_ms": round(timed(lambda: read_all(encoded), args.repeat), 3),
+            "read_lazy_ms": round(timed(lambda: read_small(encoded), args.repeat), 3),
+        }
+    report["plain"]["read_all_ms"] = round(timed(lambda: read_all(row), args.repeat), 3)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Startup-time benchmark for the Flask backend.
+
+Measures, in fresh interpreter processes:
+  - cold import of `app` (what every gunicorn worker pays before serving)
+  - time to first request (import + first GET through the WSGI app)
+
+Usage (from backend/):
+    python benchmarks/startup.py --runs 5 --output startup.json
+    python benchmarks/startup.py --importtime   # top modules by import cost
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import app
+print(time.perf_counter() - start)
+"""
+
+FIRST_REQUEST_SNIPPET = """
+import time
+start = time.perf_counter()
+import app
+client = app.app.test_client()
+response = client.get({path!r})
+elapsed = time.perf_counter() - start
+assert response.status_code < 500, response.status_code
+print(elapsed)
+"""
+
+
+def run_snippet(snippet):
+    result = subprocess.run(
+        [sys.executable, "-c", snippet],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Application logging goes to stdout too; the timing is the last line
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    return {
+        "runs": len(samples),
+        "median_s": round(statistics.median(samples), 4),
+        "min_s": round(min(samples), 4),
+        "max_s": round(max(samples), 4),
+    }
+
+
+def import_profile(limit):
+    """Top modules by cumulative import time, from `python -X importtime`"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us), name.strip()))
+    rows.sort(reverse=True)
+    return [{"module": name, "cumulative_ms": round(us / 1000, 1)} for us, name in rows[:limit]]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--runs", type=int, default=5)
+    arg_parser.add_argument("--path", default="/test", help="endpoint used for the first request")
+    arg_parser.add_argument("--importtime", action="store_true", help="also report the slowest imports")
+    arg_parser.add_argument("--output", help="write results as JSON to this file")
+    args = arg_parser.parse_args()
+
+    results = {
+        "cold_import": summarize([run_snippet(IMPORT_SNIPPET) for _ in range(args.runs)]),
+        "time_to_first_request": summarize(
+            [run_snippet(FIRST_REQUEST_SNIPPET.format(path=args.path)) for _ in range(args.runs)]
+        ),
+    }
+    if args.importtime:
+        results["slowest_imports"] = import_profile(limit=15)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
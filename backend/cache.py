@@ -0,0 +1,243 @@
+"""Shared cache backends: Redis across workers/instances, or in-process memory"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+cache_requests_total = metrics.counter("cache_requests_total", "Shared cache lookups by namespace and result")
+cache_errors_total = metrics.counter("cache_errors_total", "Shared cache operations that failed")
+cache_hit_ratio = metrics.gauge("cache_hit_ratio", "Share of shared cache lookups that hit, by namespace")
+
+
+def _namespace(key):
+    return key.split(":", 1)[0]
+
+
+def refresh_hit_ratios():
+    """Recompute cache_hit_ratio from the lookup counters; call before exporting metrics"""
+    totals = {}
+    for key, count in cache_requests_total.samples().items():
+        labels = dict(key)
+        hits, lookups = totals.get(labels["namespace"], (0, 0))
+        totals[labels["namespace"]] = (hits + (count if labels["result"] == "hit" else 0), lookups + count)
+    for namespace, (hits, lookups) in totals.items():
+        cache_hit_ratio.set(hits / lookups if lookups else 0.0, namespace=namespace)
+
+
+class CacheBackend:
+    """
+    Byte-oriented key/value cache with per-key TTLs.
+
+    Backends implement _get/_set/_delete on raw bytes. Failures are logged
+    and treated as misses so a cache outage never fails a request.
+    `shared` is True when every worker and instance sees the same entries.
+    """
+
+    name = "base"
+    shared = False
+
+    def get(self, key):
+        try:
+            value = self._get(key)
+        except Exception as e:
+            cache_errors_total.inc(backend=self.name, op="get")
+            logger.warning(f"Cache get {key} failed: {e}")
+            value = None
+        cache_requests_total.inc(namespace=_namespace(key), result="hit" if value is not None else "miss")
+        return value
+
+    def set(self, key, value, ttl=None):
+        """Store bytes under key, expiring after `ttl` seconds (None: no expiry)"""
+        try:
+            self._set(key, value, ttl)
+        except Exception as e:
+            cache_errors_total.inc(backend=self.name, op="set")
+            logger.warning(f"Cache set {key} failed: {e}")
+
+    def delete(self, key):
+        try:
+            self._delete(key)
+        except Exception as e:
+            cache_errors_total.inc(backend=self.name, op="delete")
+            logger.warning(f"Cache delete {key} failed: {e}")
+
+    def get_json(self, key):
+        value = self.get(key)
+        if value is None:
+            return None
+        try:
+            return json.loads(value)
+        except ValueError:
+            logger.warning(f"Discarding undecodable cache entry {key}")
+            self.delete(key)
+            return None
+
+    def set_json(self, key, obj, ttl=None, default=None):
+        self.set(key, json.dumps(obj, default=default).encode("utf-8"), ttl)
+
+    def stats(self):
+        return {"backend": self.name}
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def _delete(self, key):
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """
+    Per-process LRU cache; the fallback when no Redis is configured. Bounded by
+    entry count and, when `max_bytes` is set, by the total size of the values.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries=2000, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, expires_at or None)
+        self._bytes = 0
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= len(value)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key, value, ttl):
+        expires_at = time.monotonic() + ttl if ttl else None
+        value = bytes(value)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[0])
+            if self.max_bytes is not None and len(value) > self.max_bytes:
+                return  # too big to keep; the old value is dropped rather than left stale
+            self._entries[key] = (value, expires_at)
+            self._bytes += len(value)
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def _delete(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= len(entry[0])
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": self.name,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+# Refill-and-take on a token bucket stored as a hash, atomically and on the
+# server's clock. ARGV: rate (tokens/s), capacity, op (take|block|peek), hold
+# seconds for block. Returns {taken, seconds until a token is due, tokens};
+# floats go back as strings because Lua numbers are truncated to integers.
+TOKEN_BUCKET_SCRIPT = """
+local rate, capacity, op, hold = tonumber(ARGV[1]), tonumber(ARGV[2]), ARGV[3], tonumber(ARGV[4])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated', 'blocked_until')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+local blocked_until = tonumber(state[3]) or 0
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local taken, wait = 0, 0
+if op == 'block' then
+    tokens = 0
+    blocked_until = math.max(blocked_until, now + hold)
+elseif now < blocked_until then
+    wait = blocked_until - now
+elseif op == 'take' then
+    if tokens >= 1 then
+        tokens = tokens - 1
+        taken = 1
+    else
+        wait = (1 - tokens) / rate
+    end
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now, 'blocked_until', blocked_until)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate + math.max(0, blocked_until - now)) + 60)
+return {taken, tostring(wait), tostring(tokens)}
+"""
+
+
+class RedisCache(CacheBackend):
+    """Redis (or any RESP-compatible server) shared by every worker and instance"""
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, url, prefix="tradevision:", socket_timeout=0.5):
+        import redis  # only needed when a cache URL is configured
+
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(
+            url,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_timeout,
+            health_check_interval=30,
+        )
+        self._token_bucket = self._client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def _get(self, key):
+        return self._client.get(self.prefix + key)
+
+    def _set(self, key, value, ttl):
+        self._client.set(self.prefix + key, value, ex=max(1, int(ttl)) if ttl else None)
+
+    def _delete(self, key):
+        self._client.delete(self.prefix + key)
+
+    def token_bucket(self, key, rate, capacity, op="take", hold=0.0):
+        """
+        Apply `op` to the token bucket under key: "take" one token, "block"
+        (drain it and refuse tokens for `hold` seconds) or "peek". Returns
+        (taken, seconds until the next token is due, tokens left). Unlike
+        get/set, errors are raised so the caller can pick its own fallback.
+        """
+        taken, wait, tokens = self._token_bucket(keys=[self.prefix + key], args=[rate, capacity, op, hold])
+        return bool(taken), float(wait), float(tokens)
+
+    def stats(self):
+        try:
+            info = self._client.info("memory")
+            return {"backend": self.name, "used_memory": info.get("used_memory_human")}
+        except Exception as e:
+            return {"backend": self.name, "error": str(e)}
+
+
+def create_cache(url=None, max_entries=2000, max_bytes=None):
+    """Redis when `url` is set and the client is installed, otherwise in-memory (bounded by both limits)"""
+    if url:
+        try:
+            return RedisCache(url)
+        except ImportError:
+            logger.warning("CACHE_URL is set but the redis package is not installed; using in-memory cache")
+    return MemoryCache(max_entries=max_entries, max_bytes=max_bytes)
@@ -0,0 +1,200 @@
+"""Registry of long-lived upstream clients with pooled keep-alive HTTP sessions"""
+import logging
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+requests_in_flight = metrics.gauge(
+    "http_pool_requests_in_flight",
+    "Upstream HTTP requests currently using a pooled connection",
+)
+requests_total = metrics.counter(
+    "http_pool_requests_total",
+    "Upstream HTTP requests sent through a pooled session",
+)
+
+
+def rewrite_upstream_url(url):
+    """
+    With Config.UPSTREAM_OVERRIDE set (benchmarks), send https://host/path?q
+    to <override>/host/path?q so a local stub server can answer for every
+    upstream. Otherwise the URL is returned unchanged.
+    """
+    override = Config.UPSTREAM_OVERRIDE
+    if not override or url.startswith(override):
+        return url
+    parts = urlsplit(url)
+    rewritten = f"{override.rstrip('/')}/{parts.netloc}{parts.path}"
+    return f"{rewritten}?{parts.query}" if parts.query else rewritten
+
+
+class InstrumentedAdapter(HTTPAdapter):
+    """HTTPAdapter that records pool usage for its session"""
+
+    def __init__(self, pool_name, **kwargs):
+        self.pool_name = pool_name
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        request.url = rewrite_upstream_url(request.url)
+        requests_in_flight.inc(pool=self.pool_name)
+        requests_total.inc(pool=self.pool_name)
+        try:
+            return super().send(request, **kwargs)
+        finally:
+            requests_in_flight.dec(pool=self.pool_name)
+
+    def pool_stats(self):
+        """Connections opened and requests served per host pool"""
+        stats = {}
+        for key in list(self.poolmanager.pools.keys()):
+            pool = self.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            stats[pool.host] = {
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+                "idle": pool.pool.qsize() if pool.pool is not None else 0,
+            }
+        return stats
+
+
+class TimeoutSession(requests.Session):
+    """requests.Session that applies default connect/read timeouts to every call"""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.default_timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.default_timeout)
+        return super().request(method, url, **kwargs)
+
+
+class ClientRegistry:
+    """Lazily built, process-wide upstream clients.
+
+    Thread-safe clients (requests sessions, Finnhub, OpenAI) are shared by
+    every thread. Clients that are not thread-safe (PRAW, curl_cffi) are
+    kept one per thread so each thread still reuses its own connections.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._shared = {}
+        self._local = threading.local()
+        self.timeout = (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT)
+
+    def _get_shared(self, name, factory):
+        client = self._shared.get(name)
+        if client is None:
+            with self._lock:
+                client = self._shared.get(name)
+                if client is None:
+                    client = factory()
+                    self._shared[name] = client
+        return client
+
+    def _get_local(self, name, factory):
+        clients = self._local.__dict__.setdefault("clients", {})
+        client = clients.get(name)
+        if client is None:
+            client = factory()
+            clients[name] = client
+        return client
+
+    def _mount(self, session, name):
+        adapter = InstrumentedAdapter(
+            name,
+            pool_connections=Config.HTTP_POOL_CONNECTIONS,
+            pool_maxsize=Config.HTTP_POOL_SIZE,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def http(self, name="default"):
+        """Pooled keep-alive session; use one name per upstream for separate metrics"""
+        return self._get_shared(f"http:{name}", lambda: self._mount(TimeoutSession(self.timeout), name))
+
+    def finnhub(self):
+        def build():
+            import finnhub
+            client = finnhub.Client(api_key=os.environ.get("FINNHUB_API_KEY"))
+            # The client keeps one requests.Session; give it the instrumented pool
+            session = getattr(client, "_session", None)
+            if session is not None:
+                self._mount(session, "finnhub")
+            return client
+        return self._get_shared("finnhub", build)
+
+    def openai(self):
+        def build():
+            import openai
+            return openai.OpenAI(
+                api_key=os.environ.get("OPENAI_API_KEY"),
+                base_url=rewrite_upstream_url("https://api.openai.com/v1") if Config.UPSTREAM_OVERRIDE else None,
+                timeout=Config.HTTP_READ_TIMEOUT * 3,
+                max_retries=1,
+            )
+        return self._get_shared("openai", build)
+
+    def reddit(self):
+        def build():
+            import praw
+            return praw.Reddit(
+                client_id=os.environ.get("REDDIT_CLIENT_ID"),
+                client_secret=os.environ.get("REDDIT_CLIENT_SECRET"),
+                user_agent=os.environ.get("REDDIT_USER_AGENT"),
+                requestor_kwargs={"session": self._mount(requests.Session(), "reddit")},
+                timeout=Config.HTTP_READ_TIMEOUT,
+            )
+        return self._get_local("reddit", build)
+
+    def yahoo(self):
+        def build():
+            from curl_cffi import requests as curl_requests
+
+            class YahooSession(curl_requests.Session):
+                def request(self, method, url, *args, **kwargs):
+                    return super().request(method, rewrite_upstream_url(url), *args, **kwargs)
+
+            session = YahooSession(
+                impersonate="chrome110",
+                timeout=30,
+                verify=True
+            )
+            # Configure headers to mimic a real browser
+            session.headers.update({
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36',
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+                'Accept-Language': 'en-US,en;q=0.5',
+                'Connection': 'keep-alive',
+            })
+            return session
+        return self._get_local("yahoo", build)
+
+    def pool_stats(self):
+        """Per-session connection pool usage, for /health"""
+        stats = {}
+        with self._lock:
+            shared = dict(self._shared)
+        for name, client in shared.items():
+            session = client if isinstance(client, requests.Session) else getattr(client, "_session", None)
+            if session is None:
+                continue
+            adapter = session.get_adapter("https://")
+            if isinstance(adapter, InstrumentedAdapter):
+                stats[adapter.pool_name] = adapter.pool_stats()
+        return stats
+
+
+clients = ClientRegistry()
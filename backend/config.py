@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-key-for-tradevision'
@@ -6,3 +7,129 @@ class Config:
     
     # Add other configuration variables as needed
     CACHE_TIMEOUT = 300  # 5 minutes in seconds
+
+    # Live price stream: one shared upstream poll per symbol, fanned out to viewers
+    PRICE_STREAM_INTERVAL = float(os.environ.get('PRICE_STREAM_INTERVAL', 5))
+    SSE_HEARTBEAT = 15  # seconds between SSE keep-alive comments on idle streams
+
+    # Admission control for full pipeline runs (per worker). Cache hits bypass it.
+    MAX_CONCURRENT_PIPELINES = int(os.environ.get('MAX_CONCURRENT_PIPELINES', 2))
+    MAX_QUEUED_PIPELINES = int(os.environ.get('MAX_QUEUED_PIPELINES', 10))
+    QUEUE_UPDATE_INTERVAL = 5  # seconds between `queued` position events
+
+    # Storage: "auto" uses MySQL when DATABASE_URL/SQL_HOST is set, else embedded
+    # SQLite; "mysql" or "sqlite" force one. SQLITE_FALLBACK=1 also switches to
+    # SQLite when the configured MySQL can't be reached at startup.
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'auto').lower()
+    SQLITE_PATH = os.environ.get('SQLITE_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tradevision.db')
+    SQLITE_FALLBACK = os.environ.get('SQLITE_FALLBACK', '0').lower() in ('1', 'true', 'yes')
+
+    # Bumped whenever the shape of a stored result changes; part of response ETags
+    RESULT_SCHEMA_VERSION = 1
+
+    # Large JSON columns in `data` are stored compressed (zstd if installed, else gzip)
+    PAYLOAD_CODEC = os.environ.get('PAYLOAD_CODEC', 'zstd')
+    PAYLOAD_COMPRESS_MIN_SIZE = 1024  # characters; smaller values stay plain
+
+    # Shared cache (analysis results, quotes, overviews, OpenAI expansions).
+    # Redis when CACHE_URL/REDIS_URL is set, otherwise per-process memory.
+    CACHE_URL = os.environ.get('CACHE_URL') or os.environ.get('REDIS_URL')
+    MEMORY_CACHE_MAX_ENTRIES = 2000
+    # Results and profiles run to hundreds of KB each, so the entry count alone doesn't bound memory
+    MEMORY_CACHE_MAX_BYTES = int(os.environ.get('MEMORY_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+    OVERVIEW_CACHE_TTL = 24 * 3600
+    EXPANSION_CACHE_TTL = 24 * 3600
+    LEADERBOARD_CACHE_TTL = int(os.environ.get('LEADERBOARD_CACHE_TTL', 300))  # seconds between batch rescorings
+    RESCORE_BATCH_SIZE = int(os.environ.get('RESCORE_BATCH_SIZE', 200))  # tickers scored and updated per transaction
+    SCORE_GENERATION_CHECK_INTERVAL = 5  # seconds a worker may serve scores cached before another process's rescore
+
+    # Extracted article content (text, keywords, entities) by canonical
+    # URL: an in-process LRU bounded by size, over the article_content table
+    ARTICLE_CACHE_MEMORY_BYTES = int(os.environ.get('ARTICLE_CACHE_MEMORY_BYTES', 32 * 1024 * 1024))
+    ARTICLE_CACHE_MAX_ROWS = int(os.environ.get('ARTICLE_CACHE_MAX_ROWS', 50000))
+    ARTICLE_CACHE_MAX_AGE = 30 * 86400  # seconds before an article is fetched and analyzed again
+    ARTICLE_TEXT_MAX_CHARS = 5000  # text kept per article; also all spaCy is given
+
+    # Write-behind persistence of fresh results to the `data` table. Each
+    # worker spools into its own subdirectory of WRITE_BEHIND_SPOOL_DIR
+    WRITE_BEHIND_SPOOL_DIR = os.environ.get('WRITE_BEHIND_SPOOL_DIR') or os.path.join(tempfile.gettempdir(), 'analysis-spool')
+    WRITE_BEHIND_BATCH_SIZE = int(os.environ.get('WRITE_BEHIND_BATCH_SIZE', 20))
+    WRITE_BEHIND_FLUSH_INTERVAL = 1.0  # seconds to let a batch fill before writing
+    WRITE_BEHIND_MAX_RETRIES = int(os.environ.get('WRITE_BEHIND_MAX_RETRIES', 5))
+
+    # Background analysis jobs (POST /jobs)
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))
+    JOB_EVENT_BUFFER = 500  # progress events kept per job for Last-Event-ID replay
+    JOB_RETENTION = 3600  # seconds a finished job stays retrievable
+
+    # Hot-path debug output goes through category loggers (debug_log.py).
+    # Raise a category with LOG_LEVELS=financial=DEBUG,upstream=DEBUG and keep
+    # a fraction of its debug/info records with LOG_SAMPLE_RATES=financial=0.05
+    LOG_LEVEL_DEFAULT = os.environ.get('LOG_LEVEL_DEFAULT', 'INFO')
+    LOG_LEVELS = dict(
+        item.split('=', 1) for item in os.environ.get('LOG_LEVELS', '').split(',') if '=' in item
+    )
+    LOG_SAMPLE_RATES = dict(
+        item.split('=', 1) for item in os.environ.get('LOG_SAMPLE_RATES', '').split(',') if '=' in item
+    )
+
+    # Admin-only endpoints and opt-in per-request profiling (?profile=1 or
+    # X-Profile: 1) require X-Admin-Token to match; both are off when unset
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+    PROFILE_SAMPLE_INTERVAL = float(os.environ.get('PROFILE_SAMPLE_INTERVAL', 0.005))  # seconds between stack samples
+    PROFILE_MAX_STORED = 20  # most recent profiles kept per worker
+    PROFILE_TTL = 86400  # seconds a profile stays in the shared cache
+
+    # Benchmarks only: route every upstream call to a stub server as
+    # <UPSTREAM_OVERRIDE>/<original host><path> (see benchmarks/e2e)
+    UPSTREAM_OVERRIDE = os.environ.get('UPSTREAM_OVERRIDE')
+
+    # Upstream quotas as (calls per minute, burst) for the whole deployment.
+    # Override per provider with e.g. RATE_LIMIT_FINNHUB=30/5. With CACHE_URL
+    # the buckets live in Redis and every worker and instance shares them;
+    # without it each of the WEB_CONCURRENCY workers (the gunicorn worker
+    # count) gets 1/WEB_CONCURRENCY of every quota. Several instances without
+    # Redis still need their quotas divided by hand.
+    RATE_LIMITS = {
+        provider: tuple(float(x) for x in os.environ.get(f"RATE_LIMIT_{provider.upper()}", default).split('/'))
+        for provider, default in {
+            "finnhub": "60/10",
+            "alpha_vantage": "5/5",
+            "newsapi": "10/5",
+            "openai": "60/10",
+            "reddit": "90/20",
+            "bluesky": "300/30",
+            "yahoo": "60/10",
+        }.items()
+    }
+    RATE_LIMIT_MAX_WAIT = float(os.environ.get('RATE_LIMIT_MAX_WAIT', 30))
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+    # Shared upstream HTTP sessions
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 5))
+    HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 20))
+    HTTP_POOL_CONNECTIONS = 10  # distinct hosts kept per session
+    HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 10))  # connections per host
+
+    # End-to-end analysis deadline, split into per-stage budgets (seconds).
+    # A stage that overruns is marked degraded and the pipeline moves on.
+    ANALYZE_DEADLINE = float(os.environ.get('ANALYZE_DEADLINE', 240))
+    STAGE_BUDGETS = {
+        "company_info": 15,
+        "financial_data": 30,
+        "news": 90,
+        "keywords": 30,
+        "social": 90,
+    }
+    # Native threads that run stages. A stage that overruns keeps its thread
+    # until its own HTTP timeouts end it; once MAX_ABANDONED_STAGES threads are
+    # held that way, new stages are skipped instead of queueing behind them.
+    STAGE_POOL_SIZE = int(os.environ.get('STAGE_POOL_SIZE', 16))
+    MAX_ABANDONED_STAGES = int(os.environ.get('MAX_ABANDONED_STAGES', 12))
+    # Unified market-data store: how stale a stored quote/bar set may be before refetching
+    QUOTE_MAX_AGE = float(os.environ.get('QUOTE_MAX_AGE', 5))
+    BARS_MAX_AGE = float(os.environ.get('BARS_MAX_AGE', 300))
+    MARKET_DATA_MAX_SYMBOLS = 500
+
+    BREAKER_FAILURE_THRESHOLD = 5
+    BREAKER_RESET_TIMEOUT = 60
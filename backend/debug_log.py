@@ -0,0 +1,91 @@
+"""Category loggers for hot-path debug output: lazy formatting, per-category levels and sampling"""
+import json
+import logging
+import random
+import threading
+
+ROOT = "tradevision"
+
+_lock = threading.Lock()
+_loggers = {}
+_levels = {}
+_sample_rates = {}
+_default_level = logging.INFO
+
+
+class Lazy:
+    """Defers building a log argument until a handler actually formats the record"""
+
+    __slots__ = ("_build",)
+
+    def __init__(self, build):
+        self._build = build
+
+    def __str__(self):
+        try:
+            return str(self._build())
+        except Exception as e:
+            return f"<unformattable: {e}>"
+
+    __repr__ = __str__
+
+
+def lazy_json(obj, **kwargs):
+    """json.dumps(obj, **kwargs), run only if the record is emitted"""
+    kwargs.setdefault("default", str)
+    return Lazy(lambda: json.dumps(obj, **kwargs))
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a `rate` fraction of records below WARNING; warnings and errors always pass"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+def _parse_level(value):
+    if isinstance(value, int):
+        return value
+    level = logging.getLevelName(str(value).strip().upper())
+    return level if isinstance(level, int) else logging.INFO
+
+
+def _apply(category, log):
+    log.setLevel(_levels.get(category, _default_level))
+    for existing in [f for f in log.filters if isinstance(f, SamplingFilter)]:
+        log.removeFilter(existing)
+    rate = _sample_rates.get(category)
+    if rate is not None and rate < 1:
+        log.addFilter(SamplingFilter(rate))
+
+
+def configure(levels=None, sample_rates=None, default_level="INFO"):
+    """
+    Set category levels ({"financial": "DEBUG"}) and sample rates
+    ({"upstream": 0.1}); categories without an entry use default_level and
+    are not sampled. Applies to loggers already handed out.
+    """
+    global _default_level
+    with _lock:
+        _default_level = _parse_level(default_level)
+        _levels.clear()
+        _levels.update({category: _parse_level(level) for category, level in (levels or {}).items()})
+        _sample_rates.clear()
+        _sample_rates.update({category: float(rate) for category, rate in (sample_rates or {}).items()})
+        for category, log in _loggers.items():
+            _apply(category, log)
+
+
+def get(category):
+    """Logger for one category ("financial", "scoring", "upstream", ...), named tradevision.<category>"""
+    with _lock:
+        log = _loggers.get(category)
+        if log is None:
+            log = logging.getLogger(f"{ROOT}.{category}")
+            _apply(category, log)
+            _loggers[category] = log
+        return log
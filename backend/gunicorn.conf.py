@@ -0,0 +1,38 @@
+"""
+Gunicorn settings.
+
+An /analyze SSE response stays open for the whole multi-minute pipeline, so
+plain sync workers (one request per process) saturate after a handful of
+analyses. We run gevent workers instead: each stream is a greenlet waiting
+on cooperative I/O, while the blocking/CPU-heavy pipeline stages (spaCy,
+curl_cffi, newspaper) run on gevent's native thread pool via
+resilience.run_with_timeout. If gevent isn't installed we fall back to
+threaded workers, which still hold one stream per thread rather than per
+process.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5001')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+
+
+def _default_worker_class():
+    try:
+        import gevent  # noqa: F401
+        return "gevent"
+    except ImportError:
+        return "gthread"
+
+
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", _default_worker_class())
+
+# gevent: concurrent connections (SSE streams) per worker
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 200))
+# gthread: concurrent requests per worker
+threads = int(os.environ.get("GUNICORN_THREADS", 32))
+
+# Async/threaded workers heartbeat independently of request length, so this
+# only reaps genuinely stuck workers, not long-running streams
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+graceful_timeout = 30
+keepalive = 75
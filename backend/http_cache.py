@@ -0,0 +1,72 @@
+"""Conditional GET (ETag / If-None-Match) and gzip/br negotiation for JSON responses"""
+import gzip
+import hashlib
+import json
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_COMPRESS_SIZE = 1024  # bytes; smaller bodies aren't worth the CPU or headers
+
+
+def make_etag(*parts):
+    """Stable validator from the values that determine a response (e.g. last_run + schema version)"""
+    return hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:32]
+
+
+def negotiate_encoding(accept_encoding):
+    """Best content coding we can produce for an Accept-Encoding header, or None"""
+    offered = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            offered[coding.strip().lower()] = quality
+    for coding in (("br", "gzip") if brotli is not None else ("gzip",)):
+        if offered.get(coding, offered.get("*", 0)) > 0:
+            return coding
+    return None
+
+
+def _compress(body, coding):
+    if coding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def conditional_json(build_payload, etag, max_age=0, default=None):
+    """
+    JSON response guarded by a weak ETag.
+
+    `build_payload` is only called when the client's If-None-Match doesn't
+    match, so a 304 skips loading, serializing and compressing the body.
+    The tag is weak because the same representation is sent gzip-, br- or
+    un-encoded.
+    """
+    headers = {
+        "Cache-Control": f"private, max-age={max_age}, must-revalidate",
+        "Vary": "Accept-Encoding",
+    }
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304, headers=headers)
+        response.set_etag(etag, weak=True)
+        return response
+
+    body = json.dumps(build_payload(), default=default).encode("utf-8")
+    coding = negotiate_encoding(request.headers.get("Accept-Encoding")) if len(body) >= MIN_COMPRESS_SIZE else None
+    if coding:
+        body = _compress(body, coding)
+        headers["Content-Encoding"] = coding
+
+    response = Response(body, mimetype="application/json", headers=headers)
+    response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,128 @@
+"""Background analysis jobs with replayable, resumable progress events"""
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("complete", "error")
+
+
+class Job:
+    """One analysis run. Events get sequential ids so clients can resume with Last-Event-ID."""
+
+    def __init__(self, ticker, force_refresh, buffer_size):
+        self.id = uuid.uuid4().hex
+        self.ticker = ticker
+        self.force_refresh = force_refresh
+        self.status = "queued"
+        self.created_at = time.time()
+        self.finished_at = None
+        self.result = None
+        self._events = deque(maxlen=buffer_size)  # (event_id, event dict)
+        self._next_id = 1
+        self._cond = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in TERMINAL_STATUSES
+
+    def append(self, event):
+        with self._cond:
+            self._events.append((self._next_id, event))
+            self._next_id += 1
+            self._cond.notify_all()
+
+    def finish(self, status, result=None):
+        with self._cond:
+            self.status = status
+            self.result = result
+            self.finished_at = time.time()
+            self._cond.notify_all()
+
+    def events_after(self, last_event_id, timeout=None):
+        """
+        Events with id > last_event_id, waiting up to `timeout` for new ones.
+
+        Returns an empty list on timeout or once the job has finished and
+        everything has been delivered. Events older than the replay buffer
+        are gone; the client then resumes from the oldest one still held.
+        """
+        with self._cond:
+            if not self.finished and (not self._events or self._events[-1][0] <= last_event_id):
+                self._cond.wait(timeout)
+            return [(event_id, event) for event_id, event in self._events if event_id > last_event_id]
+
+    def last_event_id(self):
+        with self._cond:
+            return self._events[-1][0] if self._events else 0
+
+    def summary(self):
+        return {
+            "job_id": self.id,
+            "ticker": self.ticker,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "last_event_id": self.last_event_id()
+        }
+
+
+class JobManager:
+    """Runs analysis jobs on a worker pool, independent of any client connection"""
+
+    def __init__(self, runner, max_workers=4, buffer_size=500, retention_seconds=3600):
+        self.runner = runner
+        self.buffer_size = buffer_size
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._active_by_ticker = {}
+
+    def submit(self, ticker, force_refresh=False):
+        """Start a job, or join the one already running for this ticker"""
+        self._expire()
+        with self._lock:
+            active_id = self._active_by_ticker.get(ticker)
+            active = self._jobs.get(active_id)
+            if active is not None and not active.finished and not force_refresh:
+                return active, False
+            job = Job(ticker, force_refresh, self.buffer_size)
+            self._jobs[job.id] = job
+            self._active_by_ticker[ticker] = job.id
+        self._executor.submit(self._run, job)
+        return job, True
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job):
+        job.status = "running"
+        result = None
+        try:
+            for event in self.runner(job.ticker, job.force_refresh):
+                job.append(event)
+                if event.get("step") == "complete" and event.get("status") == "success":
+                    result = event.get("data")
+            job.finish("complete" if result is not None else "error", result)
+        except Exception as e:
+            logger.error(f"Job {job.id} for {job.ticker} failed: {e}")
+            job.append({"step": "complete", "status": "error", "message": f"Error in pipeline: {str(e)}"})
+            job.finish("error")
+        finally:
+            with self._lock:
+                if self._active_by_ticker.get(job.ticker) == job.id:
+                    del self._active_by_ticker[job.ticker]
+
+    def _expire(self):
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
@@ -0,0 +1,106 @@
+"""Per-symbol in-memory store for the latest quote and recent daily bars"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class SymbolData:
+    __slots__ = ("quote", "quote_source", "quote_at", "bars", "bars_source", "bars_at", "details")
+
+    def __init__(self):
+        self.quote = None
+        self.quote_source = None
+        self.quote_at = 0.0
+        self.bars = None
+        self.bars_source = None
+        self.bars_at = 0.0
+        self.details = {}
+
+
+def quote_from_bars(ticker, bars):
+    """Derive a get_current_price-shaped quote from the two most recent daily bars"""
+    dates = sorted(bars)
+    if len(dates) < 2:
+        return None
+    latest, prev = bars[dates[-1]], bars[dates[-2]]
+    return {
+        "ticker": ticker,
+        "current_price": float(latest["Close"]),
+        "change": float((latest["Close"] - prev["Close"]) / prev["Close"] * 100),
+        "high": float(latest["High"]),
+        "low": float(latest["Low"]),
+        "open": float(latest["Open"]),
+        "previous_close": float(prev["Close"])
+    }
+
+
+class MarketDataStore:
+    """
+    Latest quote and recent bars per symbol, fed by whichever source fetched last.
+
+    Yahoo bars (from get_financial_data) also refresh the quote, and Finnhub
+    quotes (from get_current_price) are kept alongside, so /api/price and the
+    analysis pipeline answer from the same numbers instead of refetching them.
+    """
+
+    def __init__(self, max_symbols=500):
+        self.max_symbols = max_symbols
+        self._lock = threading.Lock()
+        self._symbols = OrderedDict()
+
+    def _entry(self, ticker):
+        entry = self._symbols.get(ticker)
+        if entry is None:
+            entry = SymbolData()
+            self._symbols[ticker] = entry
+            while len(self._symbols) > self.max_symbols:
+                self._symbols.popitem(last=False)
+        else:
+            self._symbols.move_to_end(ticker)
+        return entry
+
+    def update_quote(self, ticker, quote, source, fetched_at=None):
+        fetched_at = fetched_at or time.time()
+        with self._lock:
+            entry = self._entry(ticker)
+            if fetched_at >= entry.quote_at:
+                entry.quote = dict(quote)
+                entry.quote_source = source
+                entry.quote_at = fetched_at
+
+    def update_bars(self, ticker, bars, source, fetched_at=None, **details):
+        """Store daily bars ({date: OHLCV}); the newest bar also becomes the latest quote"""
+        fetched_at = fetched_at or time.time()
+        quote = quote_from_bars(ticker, bars)
+        with self._lock:
+            entry = self._entry(ticker)
+            if fetched_at < entry.bars_at:
+                return
+            entry.bars = dict(bars)
+            entry.bars_source = source
+            entry.bars_at = fetched_at
+            entry.details.update({k: v for k, v in details.items() if v is not None})
+            if quote and fetched_at >= entry.quote_at:
+                entry.quote = quote
+                entry.quote_source = source
+                entry.quote_at = fetched_at
+
+    def latest_quote(self, ticker, max_age):
+        """Quote no older than max_age seconds, or None"""
+        with self._lock:
+            entry = self._symbols.get(ticker)
+            if entry is None or entry.quote is None or time.time() - entry.quote_at > max_age:
+                return None
+            return dict(entry.quote)
+
+    def recent_bars(self, ticker, max_age):
+        """(bars, details) no older than max_age seconds, or (None, {})"""
+        with self._lock:
+            entry = self._symbols.get(ticker)
+            if entry is None or entry.bars is None or time.time() - entry.bars_at > max_age:
+                return None, {}
+            return dict(entry.bars), dict(entry.details)
+
+    def stats(self):
+        with self._lock:
+            return {"symbols": len(self._symbols)}
@@ -0,0 +1,133 @@
+"""Processed news articles per subject, with watermarks so each run only processes what it hasn't seen"""
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from storage import add_missing_columns, ensure_indexes, longtext_dtype_map, table_exists
+
+logger = logging.getLogger(__name__)
+
+TABLE = "news_articles"
+
+
+def parse_published(value):
+    """NewsAPI's "...Z" and Finnhub's naive local ISO times as aware UTC datetimes"""
+    if not value:
+        return None
+    try:
+        published = value if isinstance(value, datetime) else datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    # Naive values come from datetime.fromtimestamp, i.e. local time
+    return published.astimezone(timezone.utc)
+
+
+class Watermark:
+    """Newest publish time and the URLs already processed for one subject and provider"""
+
+    def __init__(self):
+        self.latest = None
+        self.urls = set()
+
+    def add(self, url, published):
+        self.urls.add(url)
+        if published is not None and (self.latest is None or published > self.latest):
+            self.latest = published
+
+    def is_new(self, url, published):
+        """Unseen URL published no earlier than the watermark (same-second articles are told apart by URL)"""
+        if not url or url in self.urls:
+            return False
+        return self.latest is None or published is None or published >= self.latest
+
+
+def select_new(articles, mark, limit, url_of, published_of):
+    """
+    Up to `limit` of `articles` that are new against `mark`. Once there is a
+    watermark they are taken oldest first: the next watermark is the newest
+    article processed, so whatever is left over (past the limit, or after a
+    deadline cuts processing short) is newer than it and fetched next run.
+    """
+    new = [article for article in articles if mark.is_new(url_of(article), published_of(article))]
+    if mark.latest is not None:
+        new.sort(key=lambda article: published_of(article) or mark.latest)
+    return new[:limit]
+
+
+def load_recent(conn, subject, since):
+    """
+    Articles already processed for `subject` and published since `since`,
+    newest first, as (provider, article, all_keywords). Rows written before
+    keywords and entities were stored can't be merged and are ignored.
+    """
+    if not table_exists(conn, TABLE):
+        return []
+    columns = {col["name"] for col in inspect(conn).get_columns(TABLE)}
+    if not {"subject", "provider", "keywords", "entities"} <= columns:
+        return []
+    rows = conn.execute(
+        text(f"SELECT * FROM {TABLE} WHERE subject = :subject AND published_at >= :since_day AND keywords IS NOT NULL"),
+        # Publish times are stored as text in mixed formats: narrow by day in SQL, compare exactly below
+        {"subject": subject, "since_day": (since - timedelta(days=1)).strftime("%Y-%m-%d")},
+    ).mappings().fetchall()
+
+    latest_by_url = {}
+    for row in rows:
+        published = parse_published(row["published_at"])
+        if published is None or published < since:
+            continue
+        keywords = json.loads(row["keywords"])
+        latest_by_url[row["url"]] = (published, row["provider"], {
+            "title": row["title"],
+            "ticker": row["ticker"],
+            "company_name": row["company_name"],
+            "url": row["url"],
+            "published_at": row["published_at"],
+            "source": row["source"],
+            "keywords": keywords[:10],
+            "entities": [tuple(entity) for entity in json.loads(row["entities"] or "[]")],
+            "sentiment": {
+                "neg": row["sentiment_neg"],
+                "neu": row["sentiment_neu"],
+                "pos": row["sentiment_pos"],
+                "compound": row["sentiment_compound"],
+            },
+        }, keywords)
+    ordered = sorted(latest_by_url.values(), key=lambda item: item[0], reverse=True)
+    return [(provider, article, keywords) for _, provider, article, keywords in ordered]
+
+
+def watermarks(stored):
+    """{provider: Watermark} over load_recent() output"""
+    marks = {}
+    for provider, article, _ in stored:
+        marks.setdefault(provider, Watermark()).add(article["url"], parse_published(article["published_at"]))
+    return marks
+
+
+def save(conn, subject, provider, article, all_keywords):
+    """Append one processed article, with everything needed to merge it into later runs"""
+    df = pd.DataFrame([{
+        "title": article["title"],
+        "ticker": article["ticker"],
+        "company_name": article["company_name"],
+        "url": article["url"],
+        "published_at": article["published_at"],
+        "source": article["source"],
+        "sentiment_neg": article["sentiment"]["neg"],
+        "sentiment_neu": article["sentiment"]["neu"],
+        "sentiment_pos": article["sentiment"]["pos"],
+        "sentiment_compound": article["sentiment"]["compound"],
+        "subject": subject,
+        "provider": provider,
+        "keywords": json.dumps(all_keywords),
+        "entities": json.dumps(article["entities"]),
+    }])
+    existed = table_exists(conn, TABLE)
+    added = add_missing_columns(conn, TABLE, df) if existed else []
+    df.to_sql(TABLE, con=conn, if_exists="append", index=False, dtype=longtext_dtype_map(conn, df))
+    if added or not existed:
+        ensure_indexes(conn, TABLE)
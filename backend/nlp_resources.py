@@ -0,0 +1,69 @@
+"""Lazily loaded NLP models and NLTK data, shared by every request in a worker"""
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+# (nltk.data.find path, download package)
+NLTK_RESOURCES = [
+    ("tokenizers/punkt", "punkt"),
+    ("sentiment/vader_lexicon", "vader_lexicon"),
+    ("taggers/averaged_perceptron_tagger", "averaged_perceptron_tagger"),
+    ("chunkers/maxent_ne_chunker", "maxent_ne_chunker"),
+    ("corpora/words", "words"),
+]
+SPACY_MODEL = "en_core_web_lg"
+
+# Configure NLTK data directory for serverless environment
+nltk_data_dir = os.getenv('NLTK_DATA', tempfile.gettempdir())
+
+_lock = threading.Lock()
+_nltk_ready = False
+_nlp = None
+_sia = None
+
+
+def ensure_nltk_data():
+    """Resolve NLTK data once per process, downloading anything the image didn't bake in"""
+    global _nltk_ready
+    if _nltk_ready:
+        return
+    with _lock:
+        if _nltk_ready:
+            return
+        import nltk
+        if nltk_data_dir not in nltk.data.path:
+            nltk.data.path.append(nltk_data_dir)
+        for path, package in NLTK_RESOURCES:
+            try:
+                nltk.data.find(path)
+            except LookupError:
+                logger.info(f"Downloading NLTK resource {package}")
+                nltk.download(package, download_dir=nltk_data_dir)
+        _nltk_ready = True
+
+
+def get_sentiment_analyzer():
+    """Shared VADER analyzer (read-only after construction, safe across threads)"""
+    global _sia
+    if _sia is None:
+        ensure_nltk_data()
+        with _lock:
+            if _sia is None:
+                from nltk.sentiment.vader import SentimentIntensityAnalyzer
+                _sia = SentimentIntensityAnalyzer()
+    return _sia
+
+
+def get_nlp():
+    """spaCy pipeline, loaded once per process instead of on every news run"""
+    global _nlp
+    if _nlp is None:
+        with _lock:
+            if _nlp is None:
+                import spacy
+                logger.info(f"Loading spaCy model {SPACY_MODEL}")
+                _nlp = spacy.load(SPACY_MODEL)
+    return _nlp
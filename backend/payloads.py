@@ -0,0 +1,108 @@
+"""
+Compressed framing for large text payloads stored in LONGTEXT columns.
+
+A framed value is ASCII so it fits the existing text columns:
+
+    TVZ<version>:<codec>:<base64 of the compressed UTF-8 text>
+
+Values without the prefix are legacy plain JSON and are passed through.
+zstd is used when the `zstandard` package is installed, gzip otherwise;
+decoding handles either regardless of which codec is configured.
+"""
+import base64
+import gzip
+import json
+
+FORMAT_VERSION = 1
+PREFIX = "TVZ"
+HEADER = f"{PREFIX}{FORMAT_VERSION}:"
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def available_codecs():
+    return ("zstd", "gzip") if zstandard is not None else ("gzip",)
+
+
+def _compress(raw, codec):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=6).compress(raw)
+    return gzip.compress(raw, compresslevel=6)
+
+
+def _decompress(data, codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("payload is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "gzip":
+        return gzip.decompress(data)
+    raise ValueError(f"unknown payload codec {codec!r}")
+
+
+def is_encoded(value):
+    return isinstance(value, str) and value.startswith(PREFIX)
+
+
+def encode(text, codec="zstd"):
+    """Compress and frame text; falls back to gzip if zstd isn't available"""
+    if codec == "zstd" and zstandard is None:
+        codec = "gzip"
+    data = _compress(text.encode("utf-8"), codec)
+    return f"{HEADER}{codec}:{base64.b64encode(data).decode('ascii')}"
+
+
+def decode(value):
+    """Inverse of encode(); plain (legacy) strings come back unchanged"""
+    if not is_encoded(value):
+        return value
+    header, codec, body = value.split(":", 2)
+    version = int(header[len(PREFIX):])
+    if version != FORMAT_VERSION:
+        raise ValueError(f"unsupported payload format version {version}")
+    return _decompress(base64.b64decode(body), codec).decode("utf-8")
+
+
+class LazyPayload:
+    """
+    A stored payload that is only decompressed (and optionally JSON-parsed)
+    when something asks for its value, e.g. when it is serialized into a
+    response. Parts of a cached result the caller never touches stay packed.
+    """
+
+    __slots__ = ("encoded", "as_json", "_value", "_resolved")
+
+    def __init__(self, encoded, as_json=False):
+        self.encoded = encoded
+        self.as_json = as_json
+        self._value = None
+        self._resolved = False
+
+    def value(self):
+        if not self._resolved:
+            text = decode(self.encoded)
+            self._value = json.loads(text) if self.as_json else text
+            self._resolved = True
+        return self._value
+
+    def __len__(self):
+        return len(self.encoded)
+
+    def __repr__(self):
+        return f"LazyPayload({len(self.encoded)} bytes{', json' if self.as_json else ''})"
+
+
+def compress_columns(row, min_size=1024, codec="zstd"):
+    """Frame every string value of a flattened row that is at least min_size characters"""
+    return {
+        key: encode(value, codec) if isinstance(value, str) and len(value) >= min_size and not is_encoded(value) else value
+        for key, value in row.items()
+    }
+
+
+def resolve(value):
+    """The plain value behind a LazyPayload (anything else is returned as is)"""
+    return value.value() if isinstance(value, LazyPayload) else value
@@ -0,0 +1,306 @@
+"""Write-behind queue that persists analysis results off the request path"""
+import atexit
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows): each process only replays its own spool
+    fcntl = None
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+write_queue_depth = metrics.gauge("write_behind_queue_depth", "Results waiting to be written to the database")
+write_lag_seconds = metrics.histogram(
+    "write_behind_lag_seconds",
+    "Time from a result being queued to it being committed",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+write_failures_total = metrics.counter("write_behind_failures_total", "Failed batch write attempts")
+write_abandoned_total = metrics.counter(
+    "write_behind_abandoned_total",
+    "Results given up on after all retries (left in the spool for the next start)",
+)
+
+
+class _Entry:
+    __slots__ = ("key", "payload", "enqueued_at", "attempts")
+
+    def __init__(self, key, payload, enqueued_at=None):
+        self.key = key
+        self.payload = payload
+        self.enqueued_at = enqueued_at or time.time()
+        self.attempts = 0
+
+
+class WriteBehindQueue:
+    """
+    Coalescing write-behind queue.
+
+    `writer` is called with a list of (key, payload) pairs and must write
+    them atomically. Only the newest payload per key is kept. Each payload
+    is also spooled to disk until committed, so a crash or failed retries
+    lose nothing: the spool is replayed the next time the queue starts.
+
+    Each process spools into its own subdirectory of `spool_dir`, holding
+    an flock on it while alive. On start a queue claims only the
+    directories whose lock is free, i.e. whose process has exited, so
+    workers sharing `spool_dir` never replay each other's in-flight results.
+    """
+
+    def __init__(self, writer, spool_dir=None, batch_size=20, flush_interval=1.0,
+                 max_retries=5, retry_backoff=2.0, json_default=None):
+        self.writer = writer
+        self.spool_dir = spool_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.json_default = json_default
+        self._cond = threading.Condition()
+        self._pending = OrderedDict()  # key -> _Entry, waiting
+        self._inflight = {}  # key -> _Entry, being written
+        self._thread = None
+        self._last_error = None
+        self._spool_lock = threading.Lock()
+        self._own_dir = None
+        self._own_lock = None  # open lock file, held for the life of the process
+        self._own_pid = None
+
+    def start(self):
+        """Start the writer thread (idempotent), replaying anything left in the spool"""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._claim_orphans()
+            for entry in self._load_spool():
+                self._pending.setdefault(entry.key, entry)
+            write_queue_depth.set(len(self._pending))
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+        atexit.register(self.flush, 10)
+
+    def submit(self, key, payload):
+        """Queue payload for writing; never raises, never blocks on the database"""
+        entry = _Entry(key, payload)
+        self._spool(entry)
+        with self._cond:
+            self._pending.pop(key, None)
+            self._pending[key] = entry
+            write_queue_depth.set(len(self._pending))
+            self._cond.notify_all()
+        self.start()
+
+    def pending(self, key):
+        """The newest not-yet-committed payload for key, if any"""
+        with self._cond:
+            entry = self._pending.get(key) or self._inflight.get(key)
+            return entry.payload if entry else None
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is written (or given up on)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while self._pending or self._inflight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stats(self):
+        with self._cond:
+            oldest = min((e.enqueued_at for e in self._pending.values()), default=None)
+            return {
+                "queued": len(self._pending),
+                "in_flight": len(self._inflight),
+                "oldest_age_seconds": round(time.time() - oldest, 3) if oldest else 0,
+                "last_error": self._last_error
+            }
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # Give concurrent results a moment to join the batch
+                if len(self._pending) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                batch = []
+                while self._pending and len(batch) < self.batch_size:
+                    _, entry = self._pending.popitem(last=False)
+                    self._inflight[entry.key] = entry
+                    batch.append(entry)
+                write_queue_depth.set(len(self._pending))
+
+            try:
+                self.writer([(entry.key, entry.payload) for entry in batch])
+            except Exception as e:
+                write_failures_total.inc()
+                self._last_error = str(e)
+                logger.error(f"Write-behind batch of {len(batch)} failed: {e}")
+                delay = self._requeue(batch)
+                if delay:
+                    time.sleep(delay)
+                continue
+
+            now = time.time()
+            with self._cond:
+                for entry in batch:
+                    write_lag_seconds.observe(now - entry.enqueued_at)
+                    del self._inflight[entry.key]
+                    if entry.key not in self._pending:
+                        self._unspool(entry.key)
+                self._last_error = None
+                self._cond.notify_all()
+
+    def _requeue(self, batch):
+        """Put a failed batch back at the front of the queue; returns the backoff delay"""
+        with self._cond:
+            retry = []
+            for entry in batch:
+                del self._inflight[entry.key]
+                entry.attempts += 1
+                if entry.key in self._pending:
+                    continue  # superseded by a newer result
+                if entry.attempts >= self.max_retries:
+                    write_abandoned_total.inc()
+                    logger.error(f"Giving up on writing {entry.key} after {entry.attempts} attempts; kept in spool")
+                    continue
+                retry.append(entry)
+            for entry in reversed(retry):
+                self._pending[entry.key] = entry
+                self._pending.move_to_end(entry.key, last=False)
+            write_queue_depth.set(len(self._pending))
+            self._cond.notify_all()
+            if not retry:
+                return 0
+            attempts = max(entry.attempts for entry in retry)
+            return min(60.0, self.retry_backoff * 2 ** (attempts - 1))
+
+    def _spool_dir(self):
+        """This process's spool directory, created and locked on first use"""
+        with self._spool_lock:
+            # A forked worker must not share its parent's directory (or flock)
+            if self._own_dir is None or self._own_pid != os.getpid():
+                name = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+                # Locked under a hidden name first, so no other process can
+                # see it unlocked and take it for an orphan
+                staging = os.path.join(self.spool_dir, f".{name}")
+                os.makedirs(staging)
+                lock = open(os.path.join(staging, ".lock"), "w")
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                path = os.path.join(self.spool_dir, name)
+                os.rename(staging, path)
+                self._own_dir, self._own_lock, self._own_pid = path, lock, os.getpid()
+            return self._own_dir
+
+    def _spool_path(self, key):
+        return os.path.join(self._spool_dir(), re.sub(r"[^A-Za-z0-9._-]", "_", key) + ".json")
+
+    def _claim_orphans(self):
+        """Move the spool files of exited processes into this process's directory"""
+        if not self.spool_dir or not os.path.isdir(self.spool_dir):
+            return
+        try:
+            own = self._spool_dir()
+        except OSError as e:
+            logger.warning(f"Could not create a spool directory in {self.spool_dir}: {e}")
+            return
+        for name in os.listdir(self.spool_dir):
+            path = os.path.join(self.spool_dir, name)
+            if path == own or name.startswith("."):
+                continue
+            if name.endswith(".json"):
+                # Flat layout from before per-process directories
+                self._adopt(path, own)
+                continue
+            if fcntl is None or not os.path.isdir(path):
+                continue
+            try:
+                lock = open(os.path.join(path, ".lock"), "a")
+            except OSError:
+                continue  # already claimed and removed by another worker
+            with lock:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue  # its process is still running
+                for spooled in os.listdir(path):
+                    if spooled.endswith(".json"):
+                        self._adopt(os.path.join(path, spooled), own)
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _adopt(self, path, own):
+        """Claim one orphaned spool file, unless this process already spooled a newer result for the key"""
+        target = os.path.join(own, os.path.basename(path))
+        claimed = f"{target}.claimed"
+        try:
+            os.rename(path, claimed)  # atomic: exactly one worker gets each file
+        except FileNotFoundError:
+            return  # claimed by another worker first
+        except OSError as e:
+            logger.warning(f"Could not claim spool file {path}: {e}")
+            return
+        try:
+            os.link(claimed, target)  # fails instead of overwriting
+        except FileExistsError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not claim spool file {path}: {e}")
+            return
+        os.remove(claimed)
+
+    def _spool(self, entry):
+        if not self.spool_dir:
+            return
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            path = self._spool_path(entry.key)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"key": entry.key, "enqueued_at": entry.enqueued_at, "payload": entry.payload},
+                          f, default=self.json_default)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            # Still written from memory; only crash-safety is lost
+            logger.warning(f"Could not spool {entry.key}: {e}")
+
+    def _unspool(self, key):
+        if not self.spool_dir:
+            return
+        try:
+            os.remove(self._spool_path(key))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove spooled {key}: {e}")
+
+    def _load_spool(self):
+        if not self.spool_dir or self._own_dir is None:
+            return []
+        entries = []
+        for name in sorted(os.listdir(self._own_dir)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self._own_dir, name)) as f:
+                    record = json.load(f)
+                entries.append(_Entry(record["key"], record["payload"], record.get("enqueued_at")))
+            except Exception as e:
+                logger.warning(f"Skipping unreadable spool file {name}: {e}")
+        if entries:
+            logger.info(f"Replaying {len(entries)} spooled result(s)")
+        entries.sort(key=lambda entry: entry.enqueued_at)
+        return entries
@@ -0,0 +1,110 @@
+"""Live price streaming with one shared upstream poller per symbol"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PriceSubscription:
+    """A single viewer's view of a symbol's quote stream.
+
+    Updates are coalesced: if the consumer falls behind, pending field changes
+    are merged so it always receives the latest value of every changed field
+    instead of an ever-growing backlog.
+    """
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+        self._pending = {}
+        self._cond = threading.Condition()
+
+    def push(self, changes):
+        with self._cond:
+            self._pending.update(changes)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Wait for the next batch of changed fields, or None on timeout"""
+        with self._cond:
+            if not self._pending:
+                self._cond.wait(timeout)
+            if not self._pending:
+                return None
+            changes, self._pending = self._pending, {}
+            return changes
+
+
+class PriceStreamHub:
+    """Fans quotes out to subscribers so upstream calls scale with symbols, not viewers"""
+
+    def __init__(self, fetch_quote, interval=5.0):
+        self.fetch_quote = fetch_quote
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._subscribers = {}  # ticker -> set of PriceSubscription
+        self._snapshots = {}  # ticker -> last full quote dict
+        self._pollers = {}  # ticker -> Thread
+
+    def subscribe(self, ticker):
+        subscription = PriceSubscription(ticker)
+        with self._lock:
+            self._subscribers.setdefault(ticker, set()).add(subscription)
+            # Late joiners get the full current quote immediately. Pushed under
+            # the lock so it can't land after (and overwrite) a newer poller update.
+            snapshot = self._snapshots.get(ticker)
+            if snapshot:
+                subscription.push(snapshot)
+            if ticker not in self._pollers:
+                poller = threading.Thread(
+                    target=self._poll, args=(ticker,), name=f"price-poller-{ticker}", daemon=True
+                )
+                self._pollers[ticker] = poller
+                poller.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.ticker)
+            if subscribers:
+                subscribers.discard(subscription)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "symbols": len(self._pollers),
+                "subscribers": sum(len(s) for s in self._subscribers.values())
+            }
+
+    def _poll(self, ticker):
+        logger.info(f"Starting shared price poller for {ticker}")
+        while True:
+            with self._lock:
+                if not self._subscribers.get(ticker):
+                    # Last viewer left; tear down so idle symbols cost nothing
+                    self._subscribers.pop(ticker, None)
+                    self._snapshots.pop(ticker, None)
+                    self._pollers.pop(ticker, None)
+                    logger.info(f"Stopping shared price poller for {ticker}")
+                    return
+
+            try:
+                quote = self.fetch_quote(ticker)
+            except Exception as e:
+                quote = {"ticker": ticker, "error": str(e)}
+
+            with self._lock:
+                previous = self._snapshots.get(ticker, {})
+                changes = {k: v for k, v in quote.items() if previous.get(k) != v}
+                # Fields that disappeared (e.g. a cleared error) are sent as null
+                changes.update({k: None for k in previous if k not in quote})
+                self._snapshots[ticker] = quote
+                subscribers = list(self._subscribers.get(ticker, ()))
+
+            if changes:
+                changes["ticker"] = ticker
+                changes["timestamp"] = time.time()
+                for subscription in subscribers:
+                    subscription.push(changes)
+
+            time.sleep(self.interval)
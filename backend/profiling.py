@@ -0,0 +1,225 @@
+"""Opt-in per-request profiling: sampled stacks (collapsed, flamegraph-ready) and tracemalloc peaks per stage"""
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+
+logger = logging.getLogger(__name__)
+
+REQUEST_STAGE = "request"
+MAX_STACK_DEPTH = 128
+
+
+def _original(module, name):
+    """
+    `module.name` as it was before any gevent monkey-patching. Under gevent
+    workers threading.get_ident() returns greenlet ids, which never match
+    the OS thread ids sys._current_frames() is keyed by, and a patched
+    Thread is a greenlet that only runs when the request yields.
+    """
+    try:
+        from gevent import monkey
+    except ImportError:
+        return getattr(sys.modules.get(module) or __import__(module), name)
+    return monkey.get_original(module, name)
+
+
+_get_ident = _original("_thread", "get_ident")
+_start_new_thread = _original("_thread", "start_new_thread")
+_allocate_lock = _original("_thread", "allocate_lock")
+_sleep = _original("time", "sleep")
+
+# tracemalloc is process-wide; it runs while at least one profile does
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_started_here = False
+
+
+def _start_tracing():
+    global _tracing_users, _tracing_started_here
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_started_here = True
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    global _tracing_users, _tracing_started_here
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_started_here:
+            tracemalloc.stop()
+            _tracing_started_here = False
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class ProfileSession:
+    """
+    Samples the stacks of the threads working on one request.
+
+    The request thread is attached for the whole request; each stage wrapped
+    with wrap() attaches whichever (pool) thread runs it. A daemon sampler
+    reads sys._current_frames() every `interval` seconds and counts stacks
+    rooted at their stage name, so collapsed() is directly usable by
+    flamegraph.pl, speedscope or inferno.
+    """
+
+    def __init__(self, label, interval=0.005):
+        self.id = uuid.uuid4().hex
+        self.label = label
+        self.interval = interval
+        self.started_at = None
+        self.finished_at = None
+        self.stages = []
+        self._stacks = Counter()
+        self._threads = {}  # OS thread id -> stage name
+        # Native primitives throughout: the sampler is a real OS thread even under gevent
+        self._lock = _allocate_lock()
+        self._stopping = False
+        self._sampler_done = _allocate_lock()
+
+    def start(self):
+        self.started_at = time.time()
+        _start_tracing()
+        self._sampler_done.acquire()
+        _start_new_thread(self._sample_loop, ())
+        return self
+
+    def finish(self):
+        if self.finished_at is not None:
+            return
+        self._stopping = True
+        if self._sampler_done.acquire(timeout=1):
+            self._sampler_done.release()
+        _stop_tracing()
+        self.finished_at = time.time()
+
+    def _attach(self, stage):
+        ident = _get_ident()
+        with self._lock:
+            previous = self._threads.get(ident)
+            self._threads[ident] = stage
+        return ident, previous
+
+    def _detach(self, ident, previous):
+        with self._lock:
+            if previous is None:
+                self._threads.pop(ident, None)
+            else:
+                self._threads[ident] = previous
+
+    def attach_request(self):
+        """Sample the calling thread as REQUEST_STAGE until finish()"""
+        self._attach(REQUEST_STAGE)
+
+    def wrap(self, stage, fn):
+        """fn, run as `stage`: its thread is sampled and its duration and memory peak recorded"""
+        @functools.wraps(fn)
+        def profiled(*args, **kwargs):
+            ident, previous = self._attach(stage)
+            baseline = tracemalloc.get_traced_memory()[0]
+            # The peak is process-wide, so concurrent requests inflate it; exact when this is the only one running
+            tracemalloc.reset_peak()
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                peak = tracemalloc.get_traced_memory()[1]
+                self._detach(ident, previous)
+                with self._lock:
+                    self.stages.append({
+                        "stage": stage,
+                        "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+                        "peak_memory_bytes": max(0, peak - baseline),
+                    })
+        return profiled
+
+    def _sample_loop(self):
+        try:
+            while True:
+                _sleep(self.interval)
+                if self._stopping:
+                    return
+                with self._lock:
+                    threads = dict(self._threads)
+                frames = sys._current_frames()
+                for ident, stage in threads.items():
+                    frame = frames.get(ident)
+                    if frame is None:
+                        continue
+                    stack = []
+                    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    stack.append(stage)
+                    key = ";".join(reversed(stack))
+                    with self._lock:
+                        self._stacks[key] += 1
+        finally:
+            self._sampler_done.release()
+
+    def collapsed(self):
+        """Brendan Gregg's collapsed-stack format: one "frame;frame;frame count" line per stack"""
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+    def to_dict(self, include_stacks=True):
+        with self._lock:
+            samples = sum(self._stacks.values())
+            stages = list(self.stages)
+        profile = {
+            "id": self.id,
+            "label": self.label,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_ms": round(((self.finished_at or time.time()) - self.started_at) * 1000, 1) if self.started_at else None,
+            "sample_interval_ms": self.interval * 1000,
+            "samples": samples,
+            "stages": stages,
+        }
+        if include_stacks:
+            profile["collapsed"] = self.collapsed()
+        return profile
+
+
+class ProfileStore:
+    """Most recent finished profiles in this worker, mirrored to the shared cache for the others"""
+
+    def __init__(self, max_entries=20, cache=None, ttl=86400):
+        self.max_entries = max_entries
+        self.cache = cache
+        self.ttl = ttl
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, session):
+        profile = session.to_dict()
+        with self._lock:
+            self._profiles[session.id] = profile
+            while len(self._profiles) > self.max_entries:
+                self._profiles.popitem(last=False)
+        if self.cache is not None:
+            self.cache.set_json(f"profile:{session.id}", profile, ttl=self.ttl)
+        logger.info(f"Stored profile {session.id} for {session.label} ({profile['samples']} samples)")
+
+    def get(self, profile_id):
+        with self._lock:
+            profile = self._profiles.get(profile_id)
+        if profile is None and self.cache is not None:
+            profile = self.cache.get_json(f"profile:{profile_id}")
+        return profile
+
+    def recent(self):
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [{key: value for key, value in profile.items() if key != "collapsed"} for profile in reversed(profiles)]
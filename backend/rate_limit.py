@@ -0,0 +1,234 @@
+"""Per-provider token-bucket rate limiting shared by every upstream call site"""
+import contextlib
+import contextvars
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Lower value is served first
+INTERACTIVE = 0
+BATCH = 10
+
+# A context variable (not a thread-local) so the priority follows work
+# handed to stage threads via contextvars.copy_context()
+_priority = contextvars.ContextVar("upstream_priority", default=INTERACTIVE)
+
+wait_seconds = metrics.histogram(
+    "upstream_rate_limit_wait_seconds",
+    "Time spent queued for an upstream rate-limit token",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60),
+)
+remaining_tokens = metrics.gauge(
+    "upstream_rate_limit_remaining",
+    "Tokens currently available in each provider's bucket",
+)
+rejected_total = metrics.counter(
+    "upstream_rate_limit_rejected_total",
+    "Requests that gave up waiting for a rate-limit token",
+)
+throttled_total = metrics.counter(
+    "upstream_throttled_total",
+    "Upstream responses that reported a quota or 429",
+)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call could not get a token within its wait budget"""
+
+
+@contextlib.contextmanager
+def request_priority(priority):
+    """Run the enclosed upstream calls at the given priority (e.g. BATCH for prewarm work)"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    return _priority.get()
+
+
+class ProviderLimiter:
+    """
+    Token bucket with a priority wait queue for a single upstream provider.
+
+    The wait queue is per process. The bucket is too unless `shared` (a
+    cache backend with token_bucket(), i.e. Redis) is given: then every
+    worker and instance takes from one bucket, falling back to the local
+    one while the shared store is unreachable.
+    """
+
+    def __init__(self, name, per_minute, burst, shared=None):
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.shared = shared
+        self._shared_down = False
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._seq = itertools.count()
+        remaining_tokens.set(self.tokens, provider=name)
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _shared_bucket(self, op, hold=0.0):
+        """(taken, wait, tokens) from the shared bucket, or None to use the local one"""
+        if self.shared is None:
+            return None
+        try:
+            outcome = self.shared.token_bucket(f"ratelimit:{self.name}", self.rate, self.capacity, op, hold)
+        except Exception as e:
+            if not self._shared_down:
+                logger.warning(f"Shared rate limit for {self.name} unavailable, limiting per process: {e}")
+                self._shared_down = True
+            return None
+        if self._shared_down:
+            logger.info(f"Shared rate limit for {self.name} restored")
+            self._shared_down = False
+        return outcome
+
+    def _take(self, now):
+        """Take a token if one is free; returns 0, or the seconds until one may be"""
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        shared = self._shared_bucket("take")
+        if shared is not None:
+            taken, wait, self.tokens = shared
+            return 0 if taken else max(wait, 0.001)
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def acquire(self, priority=None, timeout=30.0):
+        """Take one token, waiting behind higher-priority callers. Returns False on timeout."""
+        if priority is None:
+            priority = current_priority()
+        start = time.monotonic()
+        deadline = start + timeout if timeout is not None else None
+        ticket = (priority, next(self._seq))
+
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    # Only the head of the queue tries the bucket; the rest wait their turn
+                    if self._waiters[0] == ticket:
+                        next_token = self._take(now)
+                    else:
+                        next_token = max((1 - self.tokens) / self.rate, self._blocked_until - now)
+                    if next_token == 0 and self._waiters[0] == ticket:
+                        heapq.heappop(self._waiters)
+                        remaining_tokens.set(self.tokens, provider=self.name)
+                        wait_seconds.observe(now - start, provider=self.name, priority=str(priority))
+                        self._cond.notify_all()
+                        return True
+
+                    if deadline is not None and now >= deadline:
+                        self._waiters.remove(ticket)
+                        heapq.heapify(self._waiters)
+                        rejected_total.inc(provider=self.name)
+                        self._cond.notify_all()
+                        return False
+
+                    next_token = max(next_token, 0.001)
+                    if deadline is not None:
+                        next_token = min(next_token, deadline - now)
+                    self._cond.wait(next_token)
+            except BaseException:
+                if ticket in self._waiters:
+                    self._waiters.remove(ticket)
+                    heapq.heapify(self._waiters)
+                raise
+
+    def throttled(self, retry_after=None):
+        """Provider told us to back off: drain the bucket and hold new calls"""
+        with self._cond:
+            hold = retry_after if retry_after is not None else 1 / self.rate
+            self.tokens = 0.0
+            self._blocked_until = max(self._blocked_until, time.monotonic() + hold)
+            # Every other worker backs off too
+            self._shared_bucket("block", hold)
+            remaining_tokens.set(0, provider=self.name)
+            self._cond.notify_all()
+        throttled_total.inc(provider=self.name)
+        logger.warning(f"{self.name} reported throttling; holding calls for {hold:.1f}s")
+
+    def remaining(self):
+        with self._cond:
+            shared = self._shared_bucket("peek")
+            if shared is not None:
+                self.tokens = shared[2]
+            else:
+                self._refill(time.monotonic())
+            remaining_tokens.set(self.tokens, provider=self.name)
+            return self.tokens
+
+
+class RateLimiter:
+    """
+    Registry of provider limiters built from Config.RATE_LIMITS, which are
+    quotas for the whole deployment. With a shared cache (Redis) the buckets
+    live there and every worker draws from them. Otherwise each of the
+    `processes` workers gets an equal share of every quota, so together
+    they stay under it.
+    """
+
+    def __init__(self, limits, cache=None, processes=1):
+        shared = cache if cache is not None and cache.shared else None
+        share = 1 if shared is not None else max(1, processes)
+        self.mode = "shared" if shared is not None else "per_process"
+        self._limiters = {
+            name: ProviderLimiter(name, per_minute / share, max(1.0, burst / share), shared=shared)
+            for name, (per_minute, burst) in limits.items()
+        }
+
+    def acquire(self, provider, priority=None, timeout=30.0):
+        """Block until `provider` has capacity; raise RateLimitExceeded if the wait is too long"""
+        limiter = self._limiters.get(provider)
+        if limiter is None:
+            return
+        if not limiter.acquire(priority=priority, timeout=timeout):
+            raise RateLimitExceeded(f"Rate limit wait exceeded for {provider}")
+
+    def throttled(self, provider, retry_after=None):
+        limiter = self._limiters.get(provider)
+        if limiter is not None:
+            limiter.throttled(retry_after)
+
+    def observe_response(self, provider, response):
+        """Back off when an HTTP response is a 429, honouring Retry-After when present"""
+        if getattr(response, "status_code", None) != 429:
+            return
+        retry_after = None
+        try:
+            retry_after = float(response.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            pass
+        self.throttled(provider, retry_after)
+
+    def remaining(self):
+        return {name: round(limiter.remaining(), 2) for name, limiter in self._limiters.items()}
+
+
+def is_alpha_vantage_throttled(payload):
+    """Alpha Vantage reports quota exhaustion as a 200 with a Note/Information body"""
+    if not isinstance(payload, dict):
+        return False
+    message = payload.get("Note") or payload.get("Information") or ""
+    return "call frequency" in message or "rate limit" in message.lower()
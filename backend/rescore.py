@@ -0,0 +1,43 @@
+"""
+Recompute stored scores after a scoring change, without rerunning pipelines.
+
+Reads every cached ticker's financial, news and social data from `data`,
+scores them in batches with the current formulas (scoring.SCORING_VERSION)
+and updates the score columns in place:
+
+    python rescore.py            # only rows scored by an older version
+    python rescore.py --force    # every row
+
+Running workers stop serving cached results and leaderboards with the old
+scores within SCORE_GENERATION_CHECK_INTERVAL seconds, whatever the cache
+backend. Only the database is touched: results spooled by live workers are
+left for them to write.
+"""
+import argparse
+import json
+import logging
+import sys
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("rescore")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--force", action="store_true", help="rescore rows already at the current version")
+    arg_parser.add_argument("--batch-size", type=int, help="tickers per transaction (default RESCORE_BATCH_SIZE)")
+    args = arg_parser.parse_args()
+
+    import app
+
+    # Database only: starting write-behind here would adopt live workers' spooled results
+    if not app.use_database_only():
+        logger.error("Database unavailable; nothing to rescore")
+        return 1
+    summary = app.rescore_cached(batch_size=args.batch_size, force=args.force)
+    print(json.dumps(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
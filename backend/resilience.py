@@ -0,0 +1,222 @@
+"""Deadlines, stage budgets and per-provider circuit breakers for the pipeline"""
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+breaker_state = metrics.gauge(
+    "upstream_circuit_open",
+    "1 while a provider's circuit breaker is open",
+)
+stage_timeouts_total = metrics.counter(
+    "pipeline_stage_timeouts_total",
+    "Pipeline stages that overran their budget and were degraded",
+)
+stages_abandoned = metrics.gauge(
+    "pipeline_stages_abandoned",
+    "Stages given up on after their budget that are still running on the stage pool",
+)
+stages_refused_total = metrics.counter(
+    "pipeline_stages_refused_total",
+    "Stages skipped because abandoned stages held too much of the stage pool",
+)
+
+# Stages run here so the caller can stop waiting when a budget runs out.
+# Overrunning calls finish in the background (their HTTP timeouts bound
+# them) but keep their pool thread until then, so they are tracked, and new
+# stages are refused once they hold `_max_abandoned` of the `_pool_size`
+# threads rather than queueing behind them until their own budget expires.
+_stage_executor = None
+_executor_lock = threading.Lock()
+_pool_size = 16
+_max_abandoned = 12
+_abandoned = set()
+
+
+def configure_stage_pool(size, max_abandoned):
+    """Size the stage pool; call before the first stage runs"""
+    global _pool_size, _max_abandoned
+    _pool_size = size
+    _max_abandoned = min(max_abandoned, size - 1)
+
+
+def _gevent_patched():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("threading")
+
+
+def stage_executor():
+    """
+    Pool that runs pipeline stages.
+
+    Under gevent workers a patched ThreadPoolExecutor would only spawn
+    greenlets, so CPU-bound stages (spaCy) and non-patchable I/O (curl_cffi)
+    would stall every stream in the worker. gevent's own executor runs them
+    on native threads while the SSE greenlet waits cooperatively.
+    """
+    global _stage_executor
+    if _stage_executor is None:
+        with _executor_lock:
+            if _stage_executor is None:
+                if _gevent_patched():
+                    from gevent.threadpool import ThreadPoolExecutor as GeventThreadPoolExecutor
+                    _stage_executor = GeventThreadPoolExecutor(max_workers=_pool_size)
+                else:
+                    _stage_executor = ThreadPoolExecutor(max_workers=_pool_size, thread_name_prefix="stage")
+    return _stage_executor
+
+
+def abandoned_stages():
+    """How many timed-out stages still hold a pool thread"""
+    with _executor_lock:
+        _abandoned.difference_update([future for future in _abandoned if future.done()])
+        count = len(_abandoned)
+    stages_abandoned.set(count)
+    return count
+
+
+def stage_pool_stats():
+    return {"size": _pool_size, "abandoned": abandoned_stages(), "max_abandoned": _max_abandoned}
+
+
+class Deadline:
+    """End-to-end time budget for one analysis"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def budget(self, stage_seconds):
+        """A stage gets its own budget, capped by what's left of the whole deadline"""
+        return min(stage_seconds, self.remaining())
+
+
+class StageTimeout(Exception):
+    """Raised when a stage overruns its budget"""
+
+
+class StagePoolSaturated(StageTimeout):
+    """Raised instead of queueing a stage behind too many abandoned ones"""
+
+
+def run_with_timeout(fn, timeout, *args, **kwargs):
+    """Run fn in the stage pool and wait at most `timeout` seconds for it"""
+    name = getattr(fn, "__name__", "stage")
+    abandoned = abandoned_stages()
+    if abandoned >= _max_abandoned:
+        stages_refused_total.inc()
+        raise StagePoolSaturated(f"{name} refused: {abandoned} abandoned stages still running")
+    # Carry context (e.g. rate-limit priority) over to the worker thread
+    ctx = contextvars.copy_context()
+    future = stage_executor().submit(ctx.run, fn, *args, **kwargs)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        if not future.cancel():
+            with _executor_lock:
+                _abandoned.add(future)
+        raise StageTimeout(f"{name} exceeded {timeout:.1f}s")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Opens after consecutive failures; lets one trial call through after a
+    cool-down. A trial that never reports back (neither success, failure nor
+    release_trial) stops blocking further trials after another cool-down.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_timeout:
+                return False
+            if self._trial_in_flight and now - self._trial_started < self.reset_timeout:
+                return False
+            # Half-open: let a single probe through
+            self._trial_in_flight = True
+            self._trial_started = now
+            return True
+
+    def release_trial(self):
+        """The half-open probe never reached the provider; let the next caller probe instead"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"Circuit for {self.name} closed")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+        breaker_state.set(0, provider=self.name)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._failures >= self.failure_threshold or self._opened_at is not None:
+                if self._opened_at is None:
+                    logger.warning(f"Circuit for {self.name} opened after {self._failures} failures")
+                self._opened_at = time.monotonic()
+        if self._opened_at is not None:
+            breaker_state.set(1, provider=self.name)
+
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+
+
+class BreakerRegistry:
+    def __init__(self, failure_threshold=5, reset_timeout=60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._breakers = {}
+
+    def get(self, name):
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name, self.failure_threshold, self.reset_timeout)
+                self._breakers[name] = breaker
+            return breaker
+
+    def states(self):
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {b.name: b.state() for b in breakers}
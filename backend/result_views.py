@@ -0,0 +1,96 @@
+"""Field selection and paginated sub-resources over a stored analysis result"""
+import json
+
+from payloads import resolve
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 200
+
+
+def parse_fields(raw):
+    """`fields` from a query string ("a,b.c") or JSON body (list); None means everything"""
+    if raw is None:
+        return None
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    fields = [str(field).strip() for field in raw if str(field).strip()]
+    return fields or None
+
+
+def _pick(source, path, target):
+    head, _, rest = path.partition(".")
+    if not isinstance(source, dict) or head not in source:
+        return
+    if not rest:
+        target[head] = source[head]
+        return
+    child = resolve(source[head])
+    if isinstance(child, dict):
+        _pick(child, rest, target.setdefault(head, {}))
+
+
+def select_fields(result, fields):
+    """
+    Copy of result with only the dotted `fields` paths (e.g. "scores",
+    "news_data.top_keywords"). Unselected sections, including compressed
+    ones, are never touched.
+    """
+    if not fields or not isinstance(result, dict):
+        return result
+    selected = {}
+    for path in fields:
+        _pick(result, path, selected)
+    return selected
+
+
+def as_list(value):
+    """A list section as stored: a list, its JSON string (cached rows) or a lazy payload"""
+    value = resolve(value)
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return []
+    return value if isinstance(value, list) else []
+
+
+def section(result, path):
+    current = result
+    for part in path.split("."):
+        current = resolve(current)
+        if not isinstance(current, dict):
+            return None
+        current = current.get(part)
+    return current
+
+
+def compact_post(post):
+    """Reddit posts repeat title + description as `text`; drop the copy"""
+    if not isinstance(post, dict) or "text" not in post:
+        return post
+    joined = f"{post.get('title', '')} {post.get('description', '')}"
+    if post["text"] == joined:
+        post = {key: value for key, value in post.items() if key != "text"}
+    return post
+
+
+def bars_list(historical_data, start=None, end=None):
+    """{date: OHLCV} as a date-ordered list, optionally bounded by ISO dates (inclusive)"""
+    historical_data = resolve(historical_data)
+    if isinstance(historical_data, str):
+        historical_data = json.loads(historical_data)
+    if not isinstance(historical_data, dict):
+        return []
+    return [
+        {"date": day, **values}
+        for day, values in sorted(historical_data.items())
+        if (start is None or day[:10] >= start) and (end is None or day[:10] <= end)
+    ]
+
+
+def paginate(items, offset=0, limit=DEFAULT_PAGE_SIZE):
+    offset = max(0, offset)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    page = items[offset:offset + limit]
+    next_offset = offset + limit if offset + limit < len(items) else None
+    return {"items": page, "total": len(items), "offset": offset, "limit": limit, "next_offset": next_offset}
@@ -0,0 +1,166 @@
+"""Append-only score history: one compact row per (ticker, run or rescore), read back with one indexed range scan"""
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from scoring import SCORE_NAMES
+from storage import is_sqlite, table_exists
+
+logger = logging.getLogger(__name__)
+
+TABLE = "score_history"
+
+# Bucket widths in seconds; "raw" returns every stored run
+RESOLUTIONS = {"raw": None, "hour": 3600, "day": 86400, "week": 7 * 86400}
+MAX_POINTS = 500  # "auto" picks the finest resolution that stays under this many buckets
+_WEEK_ORIGIN = 4 * 86400  # 1970-01-05, a Monday, so weekly buckets start on Mondays
+
+
+def ensure_table(conn):
+    """
+    Create score_history if it's missing. The primary key (ticker, recorded_at)
+    is the range-scan index; on both engines rows are clustered by it.
+    """
+    if table_exists(conn, TABLE):
+        return
+    logger.info(f"Creating {TABLE} table")
+    if is_sqlite(conn):
+        score_columns = ", ".join(f"{name} REAL" for name in SCORE_NAMES)
+        conn.execute(text(f"""
+            CREATE TABLE {TABLE} (
+                ticker VARCHAR(16) NOT NULL,
+                recorded_at DATETIME NOT NULL,
+                {score_columns},
+                scoring_version INTEGER,
+                PRIMARY KEY (ticker, recorded_at)
+            ) WITHOUT ROWID
+        """))
+    else:
+        score_columns = ", ".join(f"{name} FLOAT" for name in SCORE_NAMES)
+        conn.execute(text(f"""
+            CREATE TABLE {TABLE} (
+                ticker VARCHAR(16) NOT NULL,
+                recorded_at DATETIME(6) NOT NULL,
+                {score_columns},
+                scoring_version SMALLINT,
+                PRIMARY KEY (ticker, recorded_at)
+            )
+        """))
+
+
+def _as_utc_naive(value):
+    """Timestamps are stored as naive UTC (MySQL DATETIME has no zone)"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def append(conn, entries):
+    """
+    Record (ticker, recorded_at, scores, scoring_version) entries. Idempotent:
+    a retried write of the same run is ignored rather than failing the batch.
+    """
+    rows = []
+    for ticker, recorded_at, scores, scoring_version in entries:
+        if not ticker or not recorded_at or not isinstance(scores, dict):
+            continue
+        rows.append({
+            "ticker": ticker,
+            "recorded_at": _as_utc_naive(recorded_at),
+            "scoring_version": scoring_version,
+            **{name: scores.get(name) for name in SCORE_NAMES},
+        })
+    if not rows:
+        return 0
+    verb = "INSERT OR IGNORE" if is_sqlite(conn) else "INSERT IGNORE"
+    columns = ("ticker", "recorded_at", *SCORE_NAMES, "scoring_version")
+    conn.execute(
+        text(f"{verb} INTO {TABLE} ({', '.join(columns)}) VALUES ({', '.join(f':{c}' for c in columns)})"),
+        rows,
+    )
+    return len(rows)
+
+
+def fetch(conn, ticker, start, end, scoring_version=None):
+    """Runs for ticker with start <= recorded_at < end (and scored by scoring_version, if given), oldest first"""
+    params = {"ticker": ticker, "start": _as_utc_naive(start), "end": _as_utc_naive(end)}
+    version_filter = ""
+    if scoring_version is not None:
+        version_filter = " AND scoring_version = :scoring_version"
+        params["scoring_version"] = scoring_version
+    result = conn.execute(
+        text(
+            f"SELECT recorded_at, {', '.join(SCORE_NAMES)}, scoring_version FROM {TABLE} "
+            f"WHERE ticker = :ticker AND recorded_at >= :start AND recorded_at < :end{version_filter} ORDER BY recorded_at"
+        ),
+        params,
+    )
+    rows = []
+    for row in result.mappings():
+        row = dict(row)
+        recorded_at = row["recorded_at"]
+        if isinstance(recorded_at, str):
+            recorded_at = datetime.fromisoformat(recorded_at)
+        row["recorded_at"] = recorded_at.replace(tzinfo=timezone.utc)
+        rows.append(row)
+    return rows
+
+
+def pick_resolution(start, end, max_points=MAX_POINTS):
+    span = (end - start).total_seconds()
+    for name in ("hour", "day", "week"):
+        if span / RESOLUTIONS[name] <= max_points:
+            return name
+    return "week"
+
+
+def downsample(rows, resolution):
+    """
+    Average each score over fixed UTC buckets. Points carry the bucket start
+    as `t`, the number of runs averaged as `n` and their `scoring_version`.
+    Scores from different versions aren't comparable, so a bucket holding
+    runs of several versions yields one point per version.
+    """
+    size = RESOLUTIONS[resolution]
+    if size is None:
+        return [
+            {
+                "t": row["recorded_at"].isoformat(), "n": 1, "scoring_version": row["scoring_version"],
+                **{name: row[name] for name in SCORE_NAMES},
+            }
+            for row in rows
+        ]
+    origin = _WEEK_ORIGIN if resolution == "week" else 0
+    points = []
+    bucket, versions = None, {}  # scoring_version -> (sums, counts) within the current bucket
+    for row in rows:
+        key = (int(row["recorded_at"].timestamp()) - origin) // size
+        if key != bucket:
+            points.extend(_points(bucket, size, origin, versions))
+            bucket, versions = key, {}
+        sums, counts = versions.setdefault(row["scoring_version"], ({}, {}))
+        counts["n"] = counts.get("n", 0) + 1
+        for name in SCORE_NAMES:
+            if row[name] is not None:
+                sums[name] = sums.get(name, 0.0) + row[name]
+                counts[name] = counts.get(name, 0) + 1
+    points.extend(_points(bucket, size, origin, versions))
+    return points
+
+
+def _points(bucket, size, origin, versions):
+    if bucket is None:
+        return []
+    start = datetime.fromtimestamp(bucket * size + origin, timezone.utc).isoformat()
+    return [
+        {
+            "t": start,
+            "n": counts["n"],
+            "scoring_version": version,
+            **{name: round(sums[name] / counts[name], 4) if name in sums else None for name in SCORE_NAMES},
+        }
+        for version, (sums, counts) in sorted(versions.items(), key=lambda item: (item[0] is None, item[0] or 0))
+    ]
@@ -0,0 +1,203 @@
+"""Vectorized hype scoring over many tickers at once; calculate_metrics is the batch-of-one case"""
+import json
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+import debug_log
+from payloads import resolve
+
+log = debug_log.get("scoring")
+
+# pct_change(20) needs 21 closes; the volume ratio averages the last 20 bars
+BAR_WINDOW = 21
+
+# Bump with any change to a formula or weight below, then run rescore.py (or
+# POST /admin/rescore) to bring stored scores up to date without new pipeline runs
+SCORING_VERSION = 1
+
+HYPE_WEIGHTS = {"financial_momentum": 0.6, "news_sentiment": 0.2, "social_buzz": 0.2}
+SCORE_NAMES = ("financial_momentum", "news_sentiment", "social_buzz", "hype_index", "sentiment_price_divergence")
+
+
+def _loaded(value):
+    """A stored section as a Python object: lazy payloads are unpacked, JSON strings parsed"""
+    value = resolve(value)
+    if isinstance(value, (str, bytes)):
+        value = json.loads(value)
+    return value
+
+
+def _post_time(post):
+    """
+    A post's created_at as the live scorer sees it, or None. Bluesky posts
+    carry pd.Timestamps live and ISO strings once stored; Reddit's were ISO
+    strings all along and have never counted as recent.
+    """
+    created_at = post.get("created_at")
+    if isinstance(created_at, str) and post.get("platform") == "Bluesky":
+        try:
+            created_at = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return created_at if isinstance(created_at, datetime) else None
+
+
+def _bound(values, low, high):
+    """Vectorized min(high, max(low, x)), including its NaN -> low behaviour"""
+    return np.where(np.isnan(values), low, np.clip(values, low, high))
+
+
+class ScoringInputs:
+    """
+    Per-ticker scoring inputs stacked into arrays, one row per ticker.
+
+    Bars are right-aligned in (n, BAR_WINDOW) close/volume arrays and
+    NaN-padded on the left, so "5 bars ago" is column -6 for every ticker.
+    Articles and posts are reduced to the counts, sums and means the
+    scores use. A row whose section can't be read is flagged and scored
+    with calculate_metrics' historical fallbacks.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.close = np.full((size, BAR_WINDOW), np.nan)
+        self.volume = np.full((size, BAR_WINDOW), np.nan)
+        self.has_bars = np.zeros(size, dtype=bool)
+        self.volatility = np.full(size, 0.01)
+        self.momentum_ok = np.zeros(size, dtype=bool)
+        self.article_count = np.zeros(size)
+        self.compound_sum = np.zeros(size)
+        self.news_ok = np.ones(size, dtype=bool)
+        self.post_count = np.zeros(size)
+        self.total_posts = np.zeros(size)
+        self.avg_sentiment = np.zeros(size)
+        self.recent_posts = np.zeros(size)
+        self.engagement_sum = np.zeros(size)
+        self.social_ok = np.ones(size, dtype=bool)
+
+    @classmethod
+    def stack(cls, rows, now=None):
+        """
+        From (financial_data, news_data, social_data) triples, as produced by
+        the pipeline or read from the cache. `now` is when the rows are scored
+        as of (posts from the 24 hours before it are recent): one datetime for
+        every row, or one per row, e.g. each stored result's last_run, so
+        stored results score as they did live. Defaults to the current time.
+        """
+        rows = list(rows)
+        inputs = cls(len(rows))
+        if now is None or isinstance(now, datetime):
+            now = [now] * len(rows)
+        current = datetime.now(timezone.utc)
+        for i, ((financial_data, news_data, social_data), as_of) in enumerate(zip(rows, now)):
+            inputs._add_financial(i, financial_data or {})
+            inputs._add_news(i, news_data or {})
+            inputs._add_social(i, social_data or {}, (as_of or current) - timedelta(hours=24))
+        return inputs
+
+    def _add_financial(self, i, financial_data):
+        try:
+            bars = _loaded(financial_data["historical_data"])
+            window = [bars[day] for day in sorted(bars)[-BAR_WINDOW:]]
+            if window:
+                self.close[i, -len(window):] = [bar["Close"] for bar in window]
+                self.volume[i, -len(window):] = [bar["Volume"] for bar in window]
+                self.has_bars[i] = True
+            volatility = financial_data.get("volatility", 0.01)
+            self.volatility[i] = volatility
+            # Without bars, or with a zero volatility, the one-ticker scorer fell back to 50
+            self.momentum_ok[i] = self.has_bars[i] and volatility != 0
+        except Exception as e:
+            log.error("Error reading financial data for scoring: %r", e)
+            log.debug("Financial data structure: %s", debug_log.lazy_json(financial_data, indent=2))
+
+    def _add_news(self, i, news_data):
+        try:
+            articles = _loaded(news_data.get("articles")) or []
+            self.compound_sum[i] = sum(article["sentiment"]["compound"] for article in articles)
+            self.article_count[i] = len(articles)
+        except Exception as e:
+            log.error("Error reading news data for scoring: %r", e)
+            self.news_ok[i] = False
+
+    def _add_social(self, i, social_data, recent_cutoff):
+        try:
+            posts = _loaded(social_data.get("posts")) or []
+            if posts:
+                self.avg_sentiment[i] = social_data["avg_sentiment"]
+                self.total_posts[i] = social_data["total_posts"]
+            post_times = (_post_time(post) for post in posts)
+            self.recent_posts[i] = sum(
+                1 for created_at in post_times
+                if created_at is not None and created_at.replace(tzinfo=timezone.utc) > recent_cutoff
+            )
+            self.engagement_sum[i] = sum(post.get("engagement", 0) for post in posts)
+            self.post_count[i] = len(posts)
+        except Exception as e:
+            log.error("Error reading social data for scoring: %r", e)
+            self.social_ok[i] = False
+
+
+class ScoreBatch:
+    """Score arrays for a batch, in ScoringInputs row order"""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns["hype_index"])
+
+    def row(self, i):
+        return {name: float(self.columns[name][i]) for name in SCORE_NAMES}
+
+
+def score_batch(inputs, weights=HYPE_WEIGHTS):
+    """Momentum, news sentiment, social buzz, hype index and divergence for every row in one pass"""
+    close, volume = inputs.close, inputs.volume
+    last_close = close[:, -1]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # 1. Financial momentum: recent price/volume performance plus a volatility adjustment
+        change_5d = (last_close / close[:, -6] - 1) * 100
+        change_20d = (last_close / close[:, -21] - 1) * 100
+        recent_volume = volume[:, -20:]
+        mean_volume = np.nansum(recent_volume, axis=1) / np.sum(~np.isnan(recent_volume), axis=1)
+        volume_ratio = volume[:, -1] / mean_volume
+        volatility_score = np.fmin(50, (1 / inputs.volatility) * 10)
+        momentum = _bound(change_5d * 3 + change_20d * 2 + volume_ratio * 10 + volatility_score, 0, 100)
+        momentum = np.where(inputs.momentum_ok, momentum, 50.0)
+
+        # 2. News sentiment: mean compound scaled to 0-100, adjusted by article count
+        avg_compound = inputs.compound_sum / np.maximum(inputs.article_count, 1)
+        count_factor = _bound(inputs.article_count / 10, 0.5, 1.5)
+        news = _bound((avg_compound + 1) * 50 * count_factor, 0, 100)
+        news = np.where(inputs.news_ok & (inputs.article_count > 0), news, 50.0)
+
+        # 3. Social buzz: sentiment scaled by volume, recency and engagement
+        social_sentiment = (inputs.avg_sentiment + 1) * 50
+        post_volume = _bound(inputs.total_posts / 50, 0.5, 2.0)
+        recency = _bound(inputs.recent_posts / np.maximum(inputs.post_count, 1) * 3, 0.5, 1.5)
+        engagement = _bound(inputs.engagement_sum / np.maximum(inputs.post_count, 1) / 10, 0.5, 2.0)
+        buzz = _bound(social_sentiment * post_volume * recency * engagement, 0, 100)
+        buzz = np.where(inputs.social_ok & (inputs.post_count > 0), buzz, 0.0)
+
+        # 4. Hype index
+        hype = (
+            momentum * weights["financial_momentum"]
+            + news * weights["news_sentiment"]
+            + buzz * weights["social_buzz"]
+        )
+
+        # 5. Sentiment-price divergence: positive when price runs ahead of sentiment
+        change_3d = (last_close / close[:, -4] - 1) * 100
+        norm_price = _bound((change_3d + 10) * 5, 0, 100)
+        divergence = np.where(inputs.has_bars, norm_price - (news + buzz) / 2, 0.0)
+
+    return ScoreBatch({
+        "financial_momentum": momentum,
+        "news_sentiment": news,
+        "social_buzz": buzz,
+        "hype_index": hype,
+        "sentiment_price_divergence": divergence,
+    })
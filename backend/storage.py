@@ -0,0 +1,116 @@
+"""Database engines (MySQL, or embedded SQLite in WAL mode) and dialect-aware table helpers"""
+import logging
+import os
+
+import pandas as pd
+from sqlalchemy import Text, create_engine, event, inspect, text
+from sqlalchemy.dialects.mysql import LONGTEXT
+
+logger = logging.getLogger(__name__)
+
+# (index name, table, columns). MySQL can only index TEXT columns by prefix,
+# and to_sql creates string columns as LONGTEXT, hence the lengths.
+INDEXES = (
+    ("idx_data_ticker_last_run", "data", (("company_info.ticker", 16), ("last_run", 32))),
+    ("idx_news_articles_ticker_published", "news_articles", (("ticker", 16), ("published_at", 32))),
+    ("idx_news_articles_subject_published", "news_articles", (("subject", 64), ("published_at", 32))),
+    ("idx_company_info_ticker", "company_info", (("ticker", 16),)),
+)
+
+
+def create_mysql_engine(conn_string):
+    return create_engine(conn_string, pool_recycle=3600, pool_pre_ping=True)
+
+
+def create_sqlite_engine(path):
+    """File-backed SQLite in WAL mode: concurrent readers alongside one writer, across processes"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+
+    @event.listens_for(engine, "connect")
+    def _configure(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=30000")
+        cursor.close()
+
+    logger.info(f"Using embedded SQLite database at {path}")
+    return engine
+
+
+def is_sqlite(conn):
+    return conn.dialect.name == "sqlite"
+
+
+def table_exists(conn, table_name):
+    """Check if a table exists in the current database"""
+    if is_sqlite(conn):
+        query = "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = :table_name"
+    else:
+        query = """
+            SELECT COUNT(*)
+            FROM information_schema.tables
+            WHERE table_schema = DATABASE()
+            AND table_name = :table_name
+            """
+    return bool(conn.execute(text(query), {"table_name": table_name}).scalar())
+
+
+def add_missing_columns(conn, table_name, df):
+    """
+    Add columns for newly introduced result fields so appends don't fail on an
+    older table. Returns the names of the columns added.
+    """
+    existing = {col["name"] for col in inspect(conn).get_columns(table_name)}
+    added = []
+    for col in df.columns:
+        if col in existing:
+            continue
+        if pd.api.types.is_bool_dtype(df[col]):
+            col_type = "BOOLEAN"
+        elif pd.api.types.is_integer_dtype(df[col]):
+            col_type = "BIGINT"
+        elif pd.api.types.is_float_dtype(df[col]):
+            col_type = "DOUBLE"
+        else:
+            col_type = "LONGTEXT"
+        logger.info(f"Adding column `{col}` to {table_name}")
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN `{col}` {col_type} NULL"))
+        added.append(col)
+    return added
+
+
+def longtext_dtype_map(conn, df):
+    """Map object columns to LONGTEXT (MySQL) or TEXT (SQLite) for JSON/text payloads"""
+    text_type = Text if is_sqlite(conn) else LONGTEXT
+    return {col: text_type() for col in df.columns if df[col].dtype == object}
+
+
+def ensure_indexes(conn, table_name):
+    """Create the lookup indexes for table_name if they're missing"""
+    wanted = [(name, columns) for name, table, columns in INDEXES if table == table_name]
+    if not wanted or not table_exists(conn, table_name):
+        return
+    table_columns = {col["name"]: col["type"] for col in inspect(conn).get_columns(table_name)}
+    existing = {index["name"] for index in inspect(conn).get_indexes(table_name)}
+    for name, columns in wanted:
+        if name in existing or any(col not in table_columns for col, _ in columns):
+            continue
+        if is_sqlite(conn):
+            column_sql = ", ".join(f"`{col}`" for col, _ in columns)
+        else:
+            column_sql = ", ".join(
+                f"`{col}`({length})" if isinstance(table_columns[col], Text) else f"`{col}`"
+                for col, length in columns
+            )
+        logger.info(f"Creating index {name} on {table_name}")
+        conn.execute(text(f"CREATE INDEX {name} ON {table_name} ({column_sql})"))
+
+
+def ensure_all_indexes(conn):
+    for table_name in dict.fromkeys(table for _, table, _ in INDEXES):
+        ensure_indexes(conn, table_name)
@@ -0,0 +1,86 @@
+"""
+Shared fixtures: the app module on a throwaway SQLite database with an
+in-memory shared cache and no upstream credentials.
+
+Run from backend/:
+    python -m pytest tests
+"""
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    for dependency in ("flask", "flask_cors", "pandas", "numpy", "sqlalchemy", "dotenv"):
+        pytest.importorskip(dependency)
+    workdir = tmp_path_factory.mktemp("app")
+    # Everything the app reads at import time; set before `import app`
+    os.environ.update({
+        "STORAGE_BACKEND": "sqlite",
+        "SQLITE_PATH": str(workdir / "test.db"),
+        "WRITE_BEHIND_SPOOL_DIR": str(workdir / "spool"),
+    })
+    os.environ.pop("CACHE_URL", None)
+    os.environ.pop("REDIS_URL", None)
+    import app
+    assert app.ensure_database_ready()
+    return app
+
+
+@pytest.fixture
+def fresh_caches(app_module, monkeypatch):
+    """Empty shared cache and market-data store, so lookups reach the database"""
+    from cache import create_cache
+    from market_data import MarketDataStore
+
+    monkeypatch.setattr(app_module, "shared_cache", create_cache(None))
+    monkeypatch.setattr(app_module, "market_data", MarketDataStore())
+
+
+def daily_bars(days=25, now=None, start_price=100.0):
+    """{YYYY-MM-DD: OHLCV} for the last `days` days, gently trending up"""
+    now = now or datetime.now(timezone.utc)
+    bars = {}
+    for i in range(days):
+        day = (now - timedelta(days=days - 1 - i)).strftime("%Y-%m-%d")
+        close = start_price * (1 + 0.01 * i)
+        bars[day] = {"Open": close - 1, "High": close + 1, "Low": close - 2, "Close": close, "Volume": 1e6 + i * 1e4}
+    return bars
+
+
+def sample_result(ticker, now=None, description="Example Corp makes examples.", bars=None, posts=None, articles=None):
+    """A pipeline result shaped like run_pipeline's, without any upstream calls"""
+    now = now or datetime.now(timezone.utc)
+    bars = bars if bars is not None else daily_bars(now=now)
+    closes = [bar["Close"] for bar in bars.values()]
+    return {
+        "company_info": {"ticker": ticker, "name": "Example Corp", "sector": "Technology", "industry": "Software"},
+        "financial_data": {
+            "ticker": ticker,
+            "current_price": closes[-1],
+            "price_change": (closes[-1] / closes[-2] - 1) * 100,
+            "volatility": 0.2,
+            "historical_data": bars,
+            "description": description,
+        },
+        "news_data": {
+            "articles": articles if articles is not None else [
+                {"title": "Example Corp beats estimates", "url": "https://example.com/a",
+                 "published_at": now.isoformat(), "sentiment": {"neg": 0.0, "neu": 0.5, "pos": 0.5, "compound": 0.6}},
+            ],
+            "top_keywords": [["examples", 3]],
+            "top_entities": [["Example Corp", 2]],
+        },
+        "social_data": {
+            "posts": posts if posts is not None else [],
+            "total_posts": len(posts or []),
+            "avg_sentiment": 0.3 if posts else 0,
+        },
+        "last_run": now.isoformat(),
+    }
@@ -0,0 +1,48 @@
+"""Results read back from the `data` table must be as writable as fresh ones"""
+from datetime import datetime, timezone
+
+import pytest
+
+from payloads import LazyPayload
+from conftest import sample_result
+
+LONG_DESCRIPTION = "Example Corp designs, manufactures and sells example products worldwide. " * 30
+
+
+def test_flatten_resolves_lazy_payloads(app_module):
+    from payloads import encode
+
+    flat = app_module.flatten_nested_dict({
+        "financial_data": {
+            "description": LazyPayload(encode(LONG_DESCRIPTION)),
+            "historical_data": LazyPayload(encode('{"2024-01-02": {"Close": 1.0}}'), as_json=True),
+        }
+    })
+    assert flat["financial_data.description"] == LONG_DESCRIPTION
+    assert flat["financial_data.historical_data"] == '{"2024-01-02": {"Close": 1.0}}'
+
+
+def test_force_refresh_after_database_hit_persists(app_module, fresh_caches):
+    pd = pytest.importorskip("pandas")
+    ticker = "LAZYD"
+    app_module.save_analyses([(ticker, sample_result(ticker, description=LONG_DESCRIPTION))])
+
+    # A database hit (the long description comes back compressed) seeds the market-data store
+    events = list(app_module.analysis_events(ticker))
+    assert events[-1]["step"] == "complete" and events[-1]["status"] == "success"
+    assert isinstance(events[-1]["data"]["financial_data"]["description"], LazyPayload)
+
+    # ...which the next forced pipeline run takes its bars and description from
+    financial_data = app_module.get_financial_data(ticker)
+    assert financial_data["description"] == LONG_DESCRIPTION
+
+    refreshed = sample_result(ticker, now=datetime.now(timezone.utc))
+    refreshed["financial_data"] = financial_data
+    app_module.save_analyses([(ticker, refreshed)])
+
+    with app_module.engine.connect() as conn:
+        stored = pd.read_sql(
+            "SELECT `financial_data.description` FROM data WHERE `company_info.ticker` = :ticker",
+            conn, params={"ticker": ticker},
+        )
+    assert len(stored) == 1
@@ -0,0 +1,29 @@
+"""Incremental news ingestion never skips articles past the watermark"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("pandas")
+import news_store  # noqa: E402
+
+
+def test_truncated_pages_leave_only_newer_articles_for_the_next_run():
+    now = datetime.now(timezone.utc)
+    mark = news_store.Watermark()
+    mark.add("https://example.com/old", now - timedelta(hours=10))
+
+    # Newest first, as a provider returns them; more than one run may process
+    articles = [{"url": f"https://example.com/{hours}", "published": now - timedelta(hours=hours)} for hours in (1, 3, 5, 7)]
+
+    def select():
+        return news_store.select_new(
+            articles, mark, 2, url_of=lambda article: article["url"], published_of=lambda article: article["published"]
+        )
+
+    first = select()
+    assert [article["url"] for article in first] == ["https://example.com/7", "https://example.com/5"]
+    for article in first:
+        mark.add(article["url"], article["published"])
+
+    # The watermark moved only past what was processed, so the rest is still new
+    assert [article["url"] for article in select()] == ["https://example.com/3", "https://example.com/1"]
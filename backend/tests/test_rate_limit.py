@@ -0,0 +1,51 @@
+"""Provider quotas hold for the whole deployment, not for each worker"""
+import time
+
+import pytest
+
+from cache import TOKEN_BUCKET_SCRIPT, RedisCache
+from rate_limit import RateLimiter, RateLimitExceeded
+
+
+def redis_cache(server):
+    """A RedisCache on a fakeredis server, standing in for one worker's connection"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis runs Lua scripts through lupa
+    cache = RedisCache.__new__(RedisCache)
+    cache.prefix = "test:"
+    cache._client = fakeredis.FakeRedis(server=server)
+    cache._token_bucket = cache._client.register_script(TOKEN_BUCKET_SCRIPT)
+    return cache
+
+
+def take_all(limiters, provider, attempts):
+    taken = 0
+    for i in range(attempts):
+        try:
+            limiters[i % len(limiters)].acquire(provider, timeout=0.05)
+            taken += 1
+        except RateLimitExceeded:
+            pass
+    return taken
+
+
+def test_workers_without_a_shared_cache_split_the_quota():
+    limiter = RateLimiter({"finnhub": (60, 8)}, processes=4)
+    assert limiter.mode == "per_process"
+    assert take_all([limiter], "finnhub", 4) == 2
+
+
+def test_workers_share_one_bucket_through_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    workers = [RateLimiter({"finnhub": (60, 3)}, cache=redis_cache(server), processes=2) for _ in range(2)]
+    assert workers[0].mode == "shared"
+
+    # The full burst once across both workers, not once each
+    assert take_all(workers, "finnhub", 6) == 3
+
+    # A 429 seen by one worker holds the other back too
+    workers[0].throttled("finnhub", retry_after=0.5)
+    started = time.monotonic()
+    workers[1].acquire("finnhub", timeout=2)
+    assert time.monotonic() - started >= 0.45
@@ -0,0 +1,47 @@
+"""Rescores never clobber newer results, and retire cached scores in every worker"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from conftest import sample_result
+
+pd = pytest.importorskip("pandas")
+
+
+def stored_row(app_module, ticker):
+    with app_module.engine.connect() as conn:
+        return pd.read_sql(
+            "SELECT last_run, `scores.hype_index`, scoring_version FROM data WHERE `company_info.ticker` = :ticker",
+            conn, params={"ticker": ticker},
+        ).to_dict("records")
+
+
+def test_rescore_skips_rows_rewritten_since_they_were_read(app_module, fresh_caches, monkeypatch):
+    stale = sample_result("RACE", now=datetime.now(timezone.utc) - timedelta(hours=2))
+    stale["scores"] = {name: 0.0 for name in app_module.SCORE_NAMES}
+    app_module.save_analyses([("RACE", stale)])
+    snapshot = [row for row in app_module.load_scoring_rows() if row["company_info"]["ticker"] == "RACE"]
+
+    # A fresh run lands between the rescore's read and its update
+    fresh = sample_result("RACE")
+    fresh["scores"] = {name: 42.0 for name in app_module.SCORE_NAMES}
+    fresh["scoring_version"] = app_module.SCORING_VERSION
+    app_module.save_analyses([("RACE", fresh)])
+
+    monkeypatch.setattr(app_module, "load_scoring_rows", lambda: snapshot)
+    summary = app_module.rescore_cached(force=True)
+    assert summary["skipped"] == 1 and summary["rescored"] == 0
+    assert [row["scores.hype_index"] for row in stored_row(app_module, "RACE")] == [42.0]
+
+
+def test_rescore_in_another_process_retires_cached_results(app_module, fresh_caches):
+    app_module.cache_analysis("GEN", sample_result("GEN"))
+    assert app_module.shared_cache.get(app_module.analysis_key("GEN")) is not None
+
+    # What rescore.py does from its own process: only the database is shared
+    with app_module.engine.begin() as conn:
+        conn.execute(app_module.text("UPDATE score_generation SET generation = generation + 1 WHERE id = 1"))
+        conn.execute(app_module.text("INSERT INTO score_generation (id, generation) SELECT 1, 1 WHERE NOT EXISTS (SELECT 1 FROM score_generation)"))
+    app_module._score_generation["checked_at"] = None  # as if SCORE_GENERATION_CHECK_INTERVAL had passed
+
+    assert app_module.shared_cache.get(app_module.analysis_key("GEN")) is None
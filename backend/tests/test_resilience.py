@@ -0,0 +1,70 @@
+"""Breakers recover from a half-open probe that never reached the provider; timed-out stages stay bounded"""
+import threading
+import time
+
+import pytest
+
+from rate_limit import RateLimiter, RateLimitExceeded
+from resilience import BreakerRegistry, CircuitOpenError, StagePoolSaturated, StageTimeout
+
+
+@pytest.fixture
+def upstream(app_module, monkeypatch):
+    """A breaker that opens on the first failure and half-opens after 50ms, and a one-token bucket"""
+    monkeypatch.setattr(app_module, "breakers", BreakerRegistry(failure_threshold=1, reset_timeout=0.05))
+    monkeypatch.setattr(app_module, "rate_limiter", RateLimiter({"finnhub": (1, 1)}))
+    monkeypatch.setattr(app_module.Config, "RATE_LIMIT_MAX_WAIT", 0.01)
+    return app_module
+
+
+def test_half_open_probe_survives_rate_limit_timeout(upstream, monkeypatch):
+    breaker = upstream.breakers.get("finnhub")
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        upstream.acquire_upstream("finnhub")
+
+    # Half-open, but the only token is gone: the probe gives up waiting for it
+    time.sleep(0.06)
+    upstream.rate_limiter.acquire("finnhub")
+    with pytest.raises(RateLimitExceeded):
+        with upstream.upstream_call("finnhub"):
+            pass
+    assert breaker.state() == "half_open"
+
+    # The next caller gets to probe, and its success closes the circuit
+    monkeypatch.setattr(upstream, "rate_limiter", RateLimiter({"finnhub": (60, 1)}))
+    with upstream.upstream_call("finnhub"):
+        pass
+    assert breaker.state() == "closed"
+
+
+def test_unreported_probe_expires(upstream):
+    breaker = upstream.breakers.get("finnhub")
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    # The probe never came back; after another cool-down someone else may try
+    time.sleep(0.06)
+    assert breaker.allow()
+
+
+def test_abandoned_stages_are_counted_and_bounded(monkeypatch):
+    import resilience
+
+    monkeypatch.setattr(resilience, "_max_abandoned", 1)
+    release = threading.Event()
+    with pytest.raises(StageTimeout):
+        resilience.run_with_timeout(release.wait, 0.01, 5)
+    assert resilience.abandoned_stages() == 1
+
+    # The pool is busy with a stage nobody is waiting for; new stages are refused, not queued
+    with pytest.raises(StagePoolSaturated):
+        resilience.run_with_timeout(lambda: "never runs", 1)
+
+    release.set()
+    deadline = time.monotonic() + 2
+    while resilience.abandoned_stages() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert resilience.run_with_timeout(lambda: "ran", 1) == "ran"
@@ -0,0 +1,23 @@
+"""Every run reaches score_history, even when write-behind coalesces the results"""
+from datetime import datetime, timedelta, timezone
+
+import score_history
+from conftest import sample_result
+from persistence import WriteBehindQueue
+
+
+def test_runs_in_one_flush_window_each_get_a_history_point(app_module, monkeypatch):
+    queue = WriteBehindQueue(app_module.write_queued, flush_interval=0.5)
+    monkeypatch.setattr(app_module, "write_behind", queue)
+
+    first_run = datetime.now(timezone.utc) - timedelta(minutes=1)
+    for run_at, hype in ((first_run, 10.0), (first_run + timedelta(seconds=30), 20.0)):
+        result = sample_result("TWICE", now=run_at)
+        result["scores"] = {name: hype for name in app_module.SCORE_NAMES}
+        result["scoring_version"] = app_module.SCORING_VERSION
+        app_module.persist_analysis("TWICE", result)
+    assert queue.flush(timeout=10)
+
+    with app_module.engine.connect() as conn:
+        points = score_history.fetch(conn, "TWICE", first_run - timedelta(hours=1), first_run + timedelta(hours=1))
+    assert [point["hype_index"] for point in points] == [10.0, 20.0]
@@ -0,0 +1,62 @@
+"""Stored results must score exactly as they did live when the formulas haven't changed"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from conftest import sample_result
+
+pd = pytest.importorskip("pandas")
+
+
+def live_result(app_module, ticker, run_at):
+    """A result scored the way _analysis_steps scores it, with Bluesky posts recent at run time only"""
+    posts = [
+        {"platform": "Bluesky", "text": "loving the new examples", "engagement": 0,
+         "created_at": pd.Timestamp((run_at - timedelta(hours=hours)).isoformat().replace("+00:00", "Z"))}
+        for hours in (1, 2, 30)
+    ] + [
+        {"platform": "Reddit", "text": "examples are up", "engagement": 12,
+         "created_at": pd.to_datetime((run_at - timedelta(hours=1)).timestamp(), unit="s").isoformat()},
+    ]
+    result = sample_result(ticker, now=run_at, posts=posts)
+    result["scores"] = app_module.calculate_metrics(
+        result["financial_data"], result["news_data"], result["social_data"], now=run_at
+    )
+    result["scoring_version"] = app_module.SCORING_VERSION
+    return result
+
+
+# A fresh run, and one from almost a day ago whose posts were recent then but aren't any more
+RUN_AGES = pytest.mark.parametrize("run_age", [timedelta(0), timedelta(hours=23)], ids=["fresh", "day_old"])
+
+
+@RUN_AGES
+def test_round_trip_scores_match_live(app_module, run_age):
+    from scoring import ScoringInputs, score_batch
+
+    run_at = datetime.now(timezone.utc) - run_age
+    result = live_result(app_module, "PARITY", run_at)
+    row = app_module.compress_columns(
+        app_module.flatten_nested_dict(result), app_module.Config.PAYLOAD_COMPRESS_MIN_SIZE
+    )
+    stored = app_module.reconstruct_cached_result(row)
+
+    batch = score_batch(ScoringInputs.stack(
+        [(stored["financial_data"], stored["news_data"], stored["social_data"])],
+        now=[app_module.parse_timestamp(stored["last_run"])],
+    ))
+    assert batch.row(0) == pytest.approx(result["scores"])
+
+
+@RUN_AGES
+def test_forced_rescore_and_leaderboard_keep_live_scores(app_module, fresh_caches, run_age):
+    run_at = datetime.now(timezone.utc) - run_age
+    result = live_result(app_module, "PARITY2", run_at)
+    app_module.save_analyses([("PARITY2", result)])
+
+    leaderboard = {entry["ticker"]: entry for entry in app_module.build_leaderboard()}
+    assert leaderboard["PARITY2"]["scores"] == pytest.approx(result["scores"])
+
+    app_module.rescore_cached(force=True)
+    _, _, scores = app_module.find_cached_result("PARITY2")
+    assert scores == pytest.approx(result["scores"])
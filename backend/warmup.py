@@ -0,0 +1,36 @@
+"""
+Resolve NLP data ahead of serving traffic.
+
+Run at image build time (see Dockerfile) so workers never download NLTK data
+or discover a missing spaCy model on their first request:
+
+    NLTK_DATA=/app/nltk_data python warmup.py
+"""
+import logging
+import sys
+import time
+
+from nlp_resources import ensure_nltk_data, get_nlp, get_sentiment_analyzer, nltk_data_dir
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("warmup")
+
+
+def main():
+    start = time.perf_counter()
+    ensure_nltk_data()
+    get_sentiment_analyzer()
+    logger.info(f"NLTK data ready in {nltk_data_dir} ({time.perf_counter() - start:.2f}s)")
+
+    start = time.perf_counter()
+    try:
+        get_nlp()
+    except OSError as e:
+        logger.error(f"spaCy model unavailable: {e}")
+        return 1
+    logger.info(f"spaCy model loaded ({time.perf_counter() - start:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())